@@ -1,23 +1,53 @@
 import bpy
 import sys
 import importlib
-import inspect
 from pathlib import Path
 
 from .lib import props
 
 # モジュール読み込み
+# 登録するクラスを定義するモジュールと、その読み込みに必要な軽いモジュールだけを読み込む
 module_names = [
     "utils",
+    "lazy",
+    "profiling",
     "library",
-    "lacing_base",
-    "lacing_bow_tie",
-    "lacing_display",
-    "lacing_list",
+    "preferences",
     "props",
+    "link",
+    "lacing_list",
     "ops",
+    "handlers",
     "panel",
 ]
+
+# NumPy や bmesh を使うモジュールは lazy 経由で最初に使うときに読み込む
+# 再読み込み時は、読み込み済みのものだけをこの順で読み込み直す
+lazy_module_names = [
+    "cache",
+    "core",
+    "mesh_grid",
+    "mesh_adapter",
+    "lacing_pattern",
+    "lacing_base",
+    "lacing_bow_tie",
+    "lacing_display",
+    "lacing_ladder",
+    "lacing_straight_bar",
+    "writeback",
+    "sweep",
+    "clearance",
+    "regenerate",
+    "eyelet",
+    "live",
+    "bake",
+    "binding",
+]
+for name in lazy_module_names:
+    fullname = '{}.{}.{}'.format(__package__, "lib", name)
+    if fullname in sys.modules:
+        importlib.reload(sys.modules[fullname])
+
 namespace = globals()
 for name in module_names:
     fullname = '{}.{}.{}'.format(__package__, "lib", name)
@@ -42,20 +72,39 @@ bl_info = {
 }
 
 
+# 登録するクラス (登録順)
 classes = [
+    props.ShoeLacingKnotProps,
+    props.ShoeLacingSettings,
+    props.ShoeLacing_OT_Add,
+    props.ShoeLacing_OT_Down,
+    props.ShoeLacing_OT_Remove,
+    props.ShoeLacing_OT_Up,
+    props.VIEW3D_UL_ShoeLacing,
+    preferences.TareminShoeLacesKnotDirectory,
+    preferences.TareminShoeLaces_OT_AddKnotDirectory,
+    preferences.TareminShoeLaces_OT_RemoveKnotDirectory,
+    preferences.TareminShoeLaces_OT_UpdateKnotLibrary,
+    preferences.TareminShoeLacesPreferences,
+    ops.OBJECT_OT_TareminShoeLacesBake,
+    ops.OBJECT_OT_TareminShoeLacesCreateCurve,
+    ops.OBJECT_OT_TareminShoeLacesPunchEyelets,
+    ops.OBJECT_OT_TareminShoeLacesRegenerate,
+    ops.OBJECT_OT_TareminShoeLacesToggleBinding,
+    ops.OBJECT_OT_TareminShoeLacesToggleLive,
+    panel.VIEW3D_PT_TareminShoeLacesPanel,
 ]
-for module in module_names:
-    for module_class in [obj for name, obj in inspect.getmembers(namespace[module], inspect.isclass) if hasattr(obj, "bl_rna")]:
-        classes.append(module_class)
 
 
 def register():
     for value in classes:
         bpy.utils.register_class(value)
     bpy.types.Scene.taremin_shoelace = bpy.props.PointerProperty(type=props.ShoeLacingSettings)
+    handlers.register()
 
 
 def unregister():
+    handlers.unregister()
     for value in classes:
         bpy.utils.unregister_class(value)
     del bpy.types.Scene.taremin_shoelace
@@ -0,0 +1,139 @@
+# アドオンの読み込み(import)と登録(register)にかかる時間を、新しい Blender のプロセスごとに計測する
+#
+#   python benchmarks/bench_import.py --blender /path/to/blender --repeat 5 --budget 0.05
+#
+# 中央値が予算(秒)を超えた場合と、登録の時点で NumPy・bmesh や lazy で読み込むはずのモジュールが
+# 読み込まれていた場合は終了コード 1 を返す
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RESULT_PREFIX = "TAREMIN_SHOELACES_IMPORT "
+
+# 読み込みと登録を合わせた時間の予算 (秒)
+DEFAULT_BUDGET = 0.05
+
+# 登録の時点で読み込まれていてはいけないモジュール
+HEAVY_MODULES = ("numpy", "bmesh")
+
+
+def get_script_args(argv):
+    if "--" in argv:
+        return argv[argv.index("--") + 1:]
+    return argv[1:]
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(prog="bench_import.py")
+    parser.add_argument("--blender", default="blender")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="許容する時間(秒)")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+
+    # ワーカー用
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+
+    return parser
+
+
+# --------------------------------------------------------------------------
+# ワーカー (Blender 内で実行される)
+
+def run_worker():
+    addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    before = set(sys.modules)
+
+    start = time.perf_counter()
+    addon = importlib.import_module(os.path.basename(addon_dir))
+    imported = time.perf_counter()
+    addon.register()
+    registered = time.perf_counter()
+
+    loaded = set(sys.modules) - before
+    lazy_loaded = [
+        name for name in addon.lazy_module_names
+        if "{}.lib.{}".format(addon.__name__, name) in loaded
+    ]
+
+    print(RESULT_PREFIX + json.dumps({
+        "import": imported - start,
+        "register": registered - imported,
+        "total": registered - start,
+        "heavy_modules": [name for name in HEAVY_MODULES if name in loaded],
+        "lazy_modules": lazy_loaded,
+    }))
+    sys.stdout.flush()
+
+
+# --------------------------------------------------------------------------
+# コントローラ
+
+def run_once(blender):
+    command = [
+        blender, "-b", "--factory-startup", "--python-exit-code", "1",
+        "--python", os.path.abspath(__file__), "--", "--worker",
+    ]
+    process = subprocess.run(
+        command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+
+    raise RuntimeError("計測結果がありません:\n{}".format(process.stdout))
+
+
+def run_controller(args):
+    results = [run_once(args.blender) for _ in range(args.repeat)]
+
+    report = {
+        "budget": args.budget,
+        "results": results,
+    }
+    for name in ("import", "register", "total"):
+        values = [r[name] for r in results]
+        report[name] = {"min": min(values), "median": statistics.median(values)}
+        print("{:10} min {:8.2f} ms  median {:8.2f} ms".format(
+            name, min(values) * 1000.0, statistics.median(values) * 1000.0))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    failed = False
+    if report["total"]["median"] > args.budget:
+        print("予算超過: {:.2f} ms > {:.2f} ms".format(
+            report["total"]["median"] * 1000.0, args.budget * 1000.0))
+        failed = True
+
+    modules = sorted(set(m for r in results for m in r["heavy_modules"] + r["lazy_modules"]))
+    if modules:
+        print("登録時に読み込まれたモジュール: {}".format(", ".join(modules)))
+        failed = True
+
+    if not failed:
+        print("予算内: 問題なし")
+
+    return 1 if failed else 0
+
+
+def main(argv):
+    args = create_parser().parse_args(get_script_args(argv))
+
+    if args.worker:
+        run_worker()
+        return 0
+
+    return run_controller(args)
+
+
+if __name__ == "__main__":
+    code = main(sys.argv)
+    if code:
+        sys.exit(code)
@@ -0,0 +1,319 @@
+# 靴紐の生成処理の段階ごとの処理時間を、グリッドの大きさを変えて計測する
+#
+#   python benchmarks/bench_lacing.py --output result.json
+#   python benchmarks/bench_lacing.py --baseline benchmarks/baseline.json --threshold 2.0
+#   python benchmarks/bench_lacing.py --sizes 3x4,200x400 --shapes flat --save-baseline benchmarks/baseline.json
+#
+# Blender なしで実行できるよう、bpy に依存しない lib 以下のモジュールだけを使う
+# (writeback は foreach_set の前までの配列の組み立てと座標変換を計測する)
+#
+# 計測する段階 (profiling.profiler で記録する)
+#   validation    頂点ごとの面の数からカド頂点を求める
+#   topology      グリッドの2次元配列を作る
+#   crossings     対角線の制御点 (ShoeLacing.calc_cross_points)
+#   center_points 中心の制御点 (ShoeLacing.calc_center_points)
+#   side_points   両端の制御点 (ShoeLacing.calc_side_points)
+#   knot_fitting  一番上の行と結び目 (ShoeLacing.get_top_points)
+#   writeback     制御点の配列化と座標変換
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lib import core, lacing_list, mesh_adapter, mesh_grid, profiling, writeback  # noqa: E402
+import panels  # noqa: E402
+
+STAGES = (
+    "validation",
+    "topology",
+    "crossings",
+    "center_points",
+    "side_points",
+    "knot_fitting",
+    "writeback",
+)
+
+# 計測する内容が変わるので、基準値と一致しない場合は比較しない meta の項目
+REQUIRED_META = ("is_simple_curve", "memory", "settings")
+
+DEFAULT_SIZES = "3x4,10x20,50x100,200x400"
+
+
+# オペレータのプロパティの代わり (デフォルト値は OBJECT_OT_TareminShoeLacesCreateCurve と同じ)
+class Settings:
+    def __init__(self, **kwargs):
+        self.offset = 0
+        self.bevel_depth = 0.01
+        self.side_handle_length = 0.1
+        self.center_handle_length_ratio = 0.5
+        self.is_simple_curve = True
+        self.use_center_offset = True
+        self.is_reverse_knot = False
+        self.__dict__.update(kwargs)
+
+
+def parse_size(text):
+    width, sep, height = text.lower().partition("x")
+    if sep == "":
+        raise argparse.ArgumentTypeError("WxH の形式で指定してください: {}".format(text))
+    return int(width), int(height)
+
+
+def parse_list(text):
+    return [item.strip() for item in text.split(",") if item.strip()]
+
+
+def get_case_name(shape, width, height, method, use_knot):
+    return "{}-{}x{}-{}-{}".format(shape, width, height, method, "knot" if use_knot else "noknot")
+
+
+def create_knot():
+    left, right = panels.create_knot_arrays()
+    return core.KnotSplines(left, right, 0.01)
+
+
+def run_once(mesh, method, settings, knot):
+    profiler = profiling.profiler
+    profiler.begin()
+    topology = mesh.get_topology()
+
+    with profiler.measure("validation"):
+        face_count = numpy.bincount(topology.loop_verts, minlength=topology.num_verts)
+        err, corner_vertices = mesh_grid.check_corner_vertices(face_count)
+    if err is not None:
+        raise ValueError(corner_vertices)
+
+    # 隣接頂点の表は MeshTopology が保持するので、毎回作り直して計測する
+    with profiler.measure("topology"):
+        topology = mesh_grid.MeshTopology(
+            topology.num_verts, topology.edges, topology.loop_verts, topology.loop_edges)
+        vertices2d = topology.to_array2d(corner_vertices, settings.offset)
+
+    lacing = lacing_list.ShoeLacingMethods[method](mesh, vertices2d, settings, {}, knot)
+    points, cyclic = lacing.create_curve_points()
+
+    with profiler.measure("writeback"):
+        writeback.transform_arrays(points, numpy.identity(4))
+        hole_arrays = writeback.transform_arrays(points, numpy.identity(4))
+        writeback.get_side_handles(hole_arrays)
+
+    report = profiler.end()
+    return {stage["name"]: stage for stage in report["stages"]}, len(points)
+
+
+def run_case(shape, width, height, method, use_knot, settings, repeat):
+    co, faces = panels.create_panel(shape, width, height)
+    mesh = mesh_adapter.ArrayMesh(co, faces)
+    knot = create_knot() if use_knot else None
+
+    # 1回目は import 直後の初期化などを含むので捨てる
+    # 各段階・合計とも repeat 回のうちの最小値を使う
+    run_once(mesh, method, settings, knot)
+    best = {stage: None for stage in STAGES}
+    calls = {}
+    peak_bytes = {}
+    total = None
+    num_points = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stages, num_points = run_once(mesh, method, settings, knot)
+        elapsed = time.perf_counter() - start
+
+        total = elapsed if total is None else min(total, elapsed)
+        for stage in STAGES:
+            stats = stages.get(stage, {"seconds": 0.0, "calls": 0, "peak_bytes": 0})
+            seconds = stats["seconds"]
+            best[stage] = seconds if best[stage] is None else min(best[stage], seconds)
+            calls[stage] = stats["calls"]
+            peak_bytes[stage] = max(peak_bytes.get(stage, 0), stats["peak_bytes"])
+
+    return {
+        "case": get_case_name(shape, width, height, method, use_knot),
+        "shape": shape,
+        "width": width,
+        "height": height,
+        "method": method,
+        "knot": use_knot,
+        "points": num_points,
+        "total": total,
+        "stages": {
+            stage: {
+                "seconds": best[stage],
+                "calls": calls[stage],
+                "peak_bytes": peak_bytes[stage],
+            }
+            for stage in STAGES
+        },
+    }
+
+
+def run_benchmarks(args):
+    settings = Settings(is_simple_curve=not args.detailed)
+
+    # メモリの計測は処理時間に影響するので、指定した場合のみ行う
+    profiling.profiler.enabled = True
+    profiling.profiler.trace_memory = args.memory
+    results = []
+
+    for width, height in args.sizes:
+        for shape in args.shapes:
+            for method in args.methods:
+                for use_knot in args.knots:
+                    result = run_case(shape, width, height, method, use_knot, settings, args.repeat)
+                    results.append(result)
+                    if not args.quiet:
+                        print("{:<48} {:>6} points {:>9.2f} ms".format(
+                            result["case"], result["points"], result["total"] * 1000.0))
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "is_simple_curve": settings.is_simple_curve,
+            "memory": args.memory,
+            "settings": dict(vars(settings)),
+        },
+        "results": results,
+    }
+
+
+# 基準値の meta と比べて (比較できない項目, 実行環境などの異なる項目) を返す
+# 基準値に記録されていない項目は比べない
+def compare_meta(meta, baseline_meta):
+    mismatches = []
+    differences = []
+    for key, value in meta.items():
+        if key not in baseline_meta or baseline_meta[key] == value:
+            continue
+        (mismatches if key in REQUIRED_META else differences).append(
+            (key, value, baseline_meta[key]))
+    return mismatches, differences
+
+
+# 基準値と比べて threshold 倍を超え、かつ min_delta 秒以上遅くなったものを返す
+def compare(report, baseline, threshold, min_delta):
+    baseline_results = {r["case"]: r for r in baseline["results"]}
+    regressions = []
+
+    for result in report["results"]:
+        base = baseline_results.get(result["case"])
+        if base is None:
+            continue
+
+        items = [("total", result["total"], base["total"])]
+        for stage in STAGES:
+            if stage in base["stages"]:
+                items.append((
+                    stage,
+                    result["stages"][stage]["seconds"],
+                    base["stages"][stage]["seconds"]))
+
+        for stage, current, previous in items:
+            if current - previous < min_delta:
+                continue
+            ratio = current / previous if previous > 0.0 else float("inf")
+            if ratio > threshold:
+                regressions.append({
+                    "case": result["case"],
+                    "stage": stage,
+                    "seconds": current,
+                    "baseline": previous,
+                    "ratio": ratio,
+                })
+
+    return regressions
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(prog="bench_lacing.py")
+    parser.add_argument(
+        "--sizes", type=lambda text: [parse_size(s) for s in parse_list(text)],
+        default=[parse_size(s) for s in parse_list(DEFAULT_SIZES)],
+        help="WxH をカンマ区切りで指定 (デフォルト: {})".format(DEFAULT_SIZES))
+    parser.add_argument(
+        "--shapes", type=parse_list, default=list(panels.SHAPES),
+        help="{} から選択".format(",".join(panels.SHAPES)))
+    parser.add_argument(
+        "--methods", type=parse_list, default=list(lacing_list.ShoeLacingMethods),
+        help="結び方のクラス名")
+    parser.add_argument(
+        "--knots", type=lambda text: [s == "knot" for s in parse_list(text)],
+        default=[False, True], help="noknot,knot から選択")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--detailed", action="store_true", help="シンプルなカーブを無効にして計測する")
+    parser.add_argument(
+        "--memory", action="store_true", help="段階ごとのメモリ確保量のピークも計測する")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    parser.add_argument("--baseline", help="比較する基準値のJSONファイル")
+    parser.add_argument("--save-baseline", help="結果を基準値として書き出すJSONファイル")
+    parser.add_argument("--threshold", type=float, default=2.0, help="基準値に対する許容倍率")
+    parser.add_argument(
+        "--min-delta", type=float, default=0.001,
+        help="これより小さい差(秒)は誤差として無視する")
+    parser.add_argument("--quiet", action="store_true")
+    return parser
+
+
+def main(argv):
+    args = create_parser().parse_args(argv)
+
+    for method in args.methods:
+        if method not in lacing_list.ShoeLacingMethods:
+            print("不明な結び方: {}".format(method), file=sys.stderr)
+            return 2
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    report = run_benchmarks(args)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    code = 0
+    if baseline is not None:
+        mismatches, differences = compare_meta(report["meta"], baseline.get("meta", {}))
+        for key, value, base in differences:
+            print("WARNING 実行環境が基準値と異なります {}: {} (基準値 {})".format(key, value, base))
+
+        if mismatches:
+            for key, value, base in mismatches:
+                print("計測の設定が基準値と異なるため比較できません {}: {} (基準値 {})".format(
+                    key, value, base), file=sys.stderr)
+            code = 2
+        else:
+            regressions = compare(report, baseline, args.threshold, args.min_delta)
+            report["regressions"] = regressions
+
+            for r in regressions:
+                print("REGRESSION {} {}: {:.2f} ms (基準値 {:.2f} ms, {:.2f}倍)".format(
+                    r["case"], r["stage"], r["seconds"] * 1000.0, r["baseline"] * 1000.0, r["ratio"]))
+            if regressions:
+                code = 1
+            else:
+                print("基準値との比較: 問題なし")
+
+    # 比較した結果 (regressions) も含めて書き出す
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
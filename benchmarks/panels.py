@@ -0,0 +1,86 @@
+# ベンチマーク用の四角形グリッドのパネル(靴紐を通す部分)を生成する
+#
+#   flat     平面
+#   cylinder 半円筒に巻き付けたもの
+#   twisted  下から上に向かって90度ねじったもの
+#   noisy    平面の頂点をランダムにずらしたもの
+import math
+import numpy
+
+SHAPES = ("flat", "cylinder", "twisted", "noisy")
+
+# 穴の間隔
+SPACING = 0.01
+
+
+def create_grid_coordinates(width, height, spacing=SPACING):
+    x, y = numpy.meshgrid(
+        numpy.arange(width, dtype=numpy.float64) * spacing,
+        numpy.arange(height, dtype=numpy.float64) * spacing)
+    return numpy.stack((x.ravel(), y.ravel(), numpy.zeros(width * height)), axis=1)
+
+
+# 頂点 index は y * width + x (行ごと)
+def create_grid_faces(width, height):
+    x, y = numpy.meshgrid(numpy.arange(width - 1), numpy.arange(height - 1))
+    v = (y * width + x).ravel()
+    return numpy.stack((v, v + 1, v + 1 + width, v + width), axis=1)
+
+
+def bend_cylinder(co, width, spacing=SPACING):
+    panel_width = (width - 1) * spacing
+    radius = panel_width / math.pi
+    angle = co[:, 0] / panel_width * math.pi if panel_width > 0.0 else co[:, 0]
+
+    result = co.copy()
+    result[:, 0] = -radius * numpy.cos(angle)
+    result[:, 2] = radius * numpy.sin(angle)
+    return result
+
+
+def twist(co, width, height, spacing=SPACING):
+    center_x = (width - 1) * spacing / 2.0
+    angle = co[:, 1] / max((height - 1) * spacing, spacing) * (math.pi / 2.0)
+
+    result = co.copy()
+    x = co[:, 0] - center_x
+    result[:, 0] = center_x + x * numpy.cos(angle)
+    result[:, 2] = x * numpy.sin(angle)
+    return result
+
+
+def add_noise(co, seed=0, spacing=SPACING):
+    rng = numpy.random.RandomState(seed)
+    return co + rng.normal(scale=spacing * 0.2, size=co.shape)
+
+
+def create_panel(shape, width, height, seed=0):
+    if width < 3 or height < 2:
+        raise ValueError("width >= 3, height >= 2 で指定してください")
+
+    co = create_grid_coordinates(width, height)
+    if shape == "cylinder":
+        co = bend_cylinder(co, width)
+    elif shape == "twisted":
+        co = twist(co, width, height)
+    elif shape == "noisy":
+        co = add_noise(co, seed)
+    elif shape != "flat":
+        raise ValueError("不明な形状: {}".format(shape))
+
+    return co, create_grid_faces(width, height)
+
+
+# X 軸に沿った左右2本のスプラインからなる合成の結び目 (knots.blend の結び目の代わり)
+def create_knot_arrays(num_points=8, radius=0.05):
+    t = numpy.linspace(0.0, math.pi, num_points)
+    co = numpy.stack((
+        -radius * (1.0 - numpy.cos(t)),
+        radius * 0.5 * numpy.sin(2.0 * t),
+        radius * numpy.sin(t),
+    ), axis=1)
+    tangent = numpy.gradient(co, axis=0) * 0.5
+
+    left = {"co": co, "handle_left": co - tangent, "handle_right": co + tangent}
+    right = {name: value * (-1.0, 1.0, 1.0) for name, value in left.items()}
+    return left, right
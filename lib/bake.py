@@ -0,0 +1,173 @@
+# アーマチュアなどで変形するメッシュに合わせて、フレームごとの制御点をシェイプキーかキャッシュファイルに焼き込む
+#
+# グリッドの解析と結び目の読み込みは最初に1回だけ行い、フレームごとには評価後のメッシュの
+# 頂点座標と法線を foreach_get で一括取得して制御点を計算し直す
+# (対角線は頂点座標に依存するので、フレームごとに求め直す)
+import os
+import numpy
+import bpy
+
+from . import cache, core, handlers, lacing_list, library, link, mesh_adapter, writeback
+
+SHAPE_KEY_BASIS = "Basis"
+SHAPE_KEY_NAME = "ShoeLaces_{:04d}"
+# シェイプキーはフレームごとに1つのキーと3つのキーフレームになり、評価のたびに全てのキーを合成するので、
+# 焼き込めるフレーム数を制限する (長いアニメーションはキャッシュファイルに焼き込む)
+SHAPE_KEY_MAX_FRAMES = 100
+
+# キャッシュファイルの書式が変わったら上げる
+CACHE_VERSION = 1
+
+
+def get_default_cache_path(curve_obj):
+    return "//{}.shoelaces.npz".format(bpy.path.clean_name(curve_obj.name))
+
+
+# フレームごとの制御点 (フレーム数, 制御点の数) をカーブのローカル座標で求める
+def calc_frame_arrays(context, source, curve_obj, vertices2d, settings, frames):
+    scene = context.scene
+    shoe_lacing = lacing_list.ShoeLacingMethods[settings.lacing_method]
+    knot = library.get_knot(context, settings)
+    num_verts = len(source.data.vertices)
+
+    current_frame = scene.frame_current
+    frame_arrays = []
+    cyclic = False
+    try:
+        # 焼き込むフレームを順に設定する間は、結び付けたカーブや焼き込んだカーブを更新しない
+        # (元のフレームに戻すときは通常どおり更新する)
+        with handlers.suspend_frame_change():
+            for frame in frames:
+                scene.frame_set(frame)
+                evaluated = source.evaluated_get(context.evaluated_depsgraph_get())
+                mesh = evaluated.to_mesh()
+                try:
+                    if len(mesh.vertices) != num_verts:
+                        return True, "{} フレームで頂点の数が変わっています".format(frame)
+                    local_arrays, cyclic = shoe_lacing(
+                        mesh_adapter.BlenderMeshAdapter(mesh), vertices2d, settings, None, knot
+                    ).create_curve_points()
+                finally:
+                    evaluated.to_mesh_clear()
+
+                if len(frame_arrays) > 0 and len(local_arrays) != len(frame_arrays[0]):
+                    return True, "{} フレームで制御点の数が変わっています".format(frame)
+
+                # 元のメッシュのオブジェクト自体が動く場合もあるので、変換はフレームごとに求める
+                frame_arrays.append(writeback.transform_arrays(
+                    local_arrays, writeback.get_transform(source, curve_obj)))
+    finally:
+        scene.frame_set(current_frame)
+
+    return None, (numpy.stack(frame_arrays), cyclic)
+
+
+# --------------------------------------------------------------------------
+# シェイプキー
+
+# カーブのシェイプキーを作り直し、フレームごとのキーをそのフレームだけ値が 1 になるようにキーフレームを打つ
+# (短い範囲向け。フレーム数は SHAPE_KEY_MAX_FRAMES まで)
+def write_shape_keys(curve_obj, frames, baked, cyclic):
+    curve_obj.shape_key_clear()
+    writeback.update_bezier_spline(curve_obj.data.splines, baked[0], cyclic)
+    curve_obj.shape_key_add(name=SHAPE_KEY_BASIS, from_mix=False)
+
+    for frame, arrays in zip(frames, baked):
+        key_block = curve_obj.shape_key_add(name=SHAPE_KEY_NAME.format(frame), from_mix=False)
+        for name in ("co", "handle_left", "handle_right"):
+            key_block.data.foreach_set(
+                name, numpy.ascontiguousarray(arrays[name], dtype=numpy.float32).ravel())
+
+        for key_frame, value in ((frame - 1, 0.0), (frame, 1.0), (frame + 1, 0.0)):
+            key_block.value = value
+            key_block.keyframe_insert("value", frame=key_frame)
+
+
+# --------------------------------------------------------------------------
+# キャッシュファイル
+
+class BakeCacheEntry:
+    def __init__(self, frames, arrays, types, handle_types, cyclic):
+        self.frames = frames
+        # "co", "handle_left", "handle_right" -> (フレーム数, 制御点の数, 3)
+        self.arrays = arrays
+        self.types = types
+        self.handle_types = handle_types
+        self.cyclic = cyclic
+
+
+# 座標は float32 で保存する (RNA の座標と同じ精度)
+def save_cache(path, frames, baked, cyclic):
+    directory = os.path.dirname(path)
+    if directory != "":
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, "wb") as f:
+        numpy.savez_compressed(
+            f,
+            version=numpy.int32(CACHE_VERSION),
+            frames=numpy.asarray(frames, dtype=numpy.int32),
+            co=baked["co"].astype(numpy.float32),
+            handle_left=baked["handle_left"].astype(numpy.float32),
+            handle_right=baked["handle_right"].astype(numpy.float32),
+            type=baked["type"][0],
+            handle_type=baked["handle_type"][0],
+            cyclic=numpy.bool_(cyclic),
+        )
+    cache.bake_cache.discard_if(lambda key: key[0] == path)
+
+
+# 読み込んだキャッシュファイルは更新日時が変わるまで使い回す (読み込めない場合は None)
+def load_cache(path):
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    cache_key = (path, mtime)
+    entry = cache.bake_cache.get(cache_key)
+    if entry is None:
+        try:
+            with numpy.load(path) as data:
+                if int(data["version"]) != CACHE_VERSION:
+                    return None
+                entry = BakeCacheEntry(
+                    data["frames"],
+                    {name: data[name] for name in ("co", "handle_left", "handle_right")},
+                    data["type"], data["handle_type"], bool(data["cyclic"]))
+        except (OSError, ValueError, KeyError):
+            return None
+        cache.bake_cache.discard_if(lambda key: key[0] == path)
+        cache.bake_cache.set(cache_key, entry)
+
+    return entry
+
+
+# 指定したフレームの制御点 (フレームの間は前後のフレームを線形補間し、範囲外は端のフレーム)
+def get_cache_arrays(entry, frame):
+    frames = entry.frames
+    i = int(numpy.clip(numpy.searchsorted(frames, frame, side='right') - 1, 0, len(frames) - 1))
+    j = min(i + 1, len(frames) - 1)
+    s = 0.0
+    if j > i:
+        s = min(max((frame - frames[i]) / (frames[j] - frames[i]), 0.0), 1.0)
+
+    arrays = numpy.zeros(len(entry.types), dtype=core.POINT_DTYPE)
+    arrays["type"] = entry.types
+    arrays["handle_type"] = entry.handle_types
+    for name, value in entry.arrays.items():
+        arrays[name] = value[i] * (1.0 - s) + value[j] * s
+
+    return arrays
+
+
+# キャッシュファイルを焼き込んだカーブに、現在のフレームの制御点を書き込む
+# (書き込んだ制御点の数、キャッシュファイルを読み込めない場合は None)
+def update_curve(scene, curve_obj):
+    if curve_obj.type != 'CURVE':
+        return None
+    entry = load_cache(bpy.path.abspath(link.get_bake_cache(curve_obj)))
+    if entry is None:
+        return None
+    return writeback.update_bezier_spline(
+        curve_obj.data.splines, get_cache_arrays(entry, scene.frame_current_final), entry.cyclic)
@@ -0,0 +1,275 @@
+# バックグラウンドの Blender で複数の .blend ファイルに靴紐を一括生成する
+#
+#   blender -b --python lib/batch.py -- \
+#       --file shoe_a.blend Lace_L Lace_R \
+#       --file shoe_b.blend Lace \
+#       --workers 4 --lacing-method DisplayShoeLacing --knot-type 2 \
+#       --param bevel_depth=0.005 --report result.json
+#
+# ファイルごとに `blender -b <file> --python lib/batch.py -- --worker ...` を起動し、
+# 指定した数のプロセスで並列に処理する(このスクリプト自体は bpy なしの Python でも実行できる)
+import argparse
+import ast
+import concurrent.futures
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+RESULT_PREFIX = "TAREMIN_SHOELACES_RESULT "
+
+
+def get_script_args(argv):
+    if "--" in argv:
+        return argv[argv.index("--") + 1:]
+    return argv[1:]
+
+
+# 値は文字列のままワーカーに渡し、ワーカーでオペレータのプロパティの型に合わせて変換する (coerce_params)
+def parse_param(text):
+    name, sep, value = text.partition("=")
+    if sep == "":
+        raise argparse.ArgumentTypeError("name=value の形式で指定してください: {}".format(text))
+    return name, value
+
+
+# パラメータをオペレータのプロパティの型 (RNA の type) に合わせる
+# 文字列と列挙型のプロパティはそのまま文字列にし (knot_type=2 などを数値にすると TypeError になる)、
+# それ以外の型の文字列は Python のリテラルとして解釈する (--jobs の JSON で型が付いている値はそのまま)
+def coerce_params(params, property_types):
+    result = {}
+    for name, value in params.items():
+        prop_type = property_types.get(name)
+        if prop_type in ('STRING', 'ENUM'):
+            value = value if isinstance(value, str) else str(value)
+        elif prop_type is not None and isinstance(value, str):
+            try:
+                value = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                pass
+        result[name] = value
+    return result
+
+
+def get_operator_property_types():
+    import bpy
+    rna_type = bpy.ops.taremin.shoelaces_create_curve.get_rna_type()
+    return {prop.identifier: prop.type for prop in rna_type.properties}
+
+
+def get_default_blender():
+    try:
+        import bpy
+        return bpy.app.binary_path
+    except ImportError:
+        return "blender"
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(prog="batch.py")
+    parser.add_argument(
+        "--file", nargs="+", action="append", default=[], metavar=("BLEND", "OBJECT"),
+        help="処理する .blend ファイルと対象のメッシュオブジェクト名")
+    parser.add_argument(
+        "--jobs", help="[{\"file\": ..., \"objects\": [...]}] 形式のJSONファイル")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--blender", default=get_default_blender())
+    parser.add_argument("--timeout", type=float, default=None)
+    parser.add_argument(
+        "--in-place", action="store_true",
+        help="結果を元のファイルに保存する(指定しない場合は <名前>.laces.blend に保存)")
+    parser.add_argument("--suffix", default=".laces")
+    parser.add_argument("--report", help="結果を書き出すJSONファイル")
+
+    # オペレータのパラメータ
+    parser.add_argument("--lacing-method")
+    parser.add_argument("--offset", type=int)
+    parser.add_argument("--knot-type")
+    parser.add_argument(
+        "--param", type=parse_param, action="append", default=[],
+        help="その他のオペレータのプロパティ (name=value)")
+
+    # ワーカー用
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--task", help=argparse.SUPPRESS)
+
+    return parser
+
+
+def get_operator_params(args):
+    params = {}
+    if args.lacing_method is not None:
+        params["lacing_method"] = args.lacing_method
+    if args.offset is not None:
+        params["offset"] = args.offset
+    if args.knot_type is not None:
+        params["knot_type"] = str(args.knot_type)
+    params.update(dict(args.param))
+    return params
+
+
+def get_jobs(args):
+    jobs = [{"file": f[0], "objects": f[1:]} for f in args.file]
+    if args.jobs:
+        with open(args.jobs, encoding="utf-8") as f:
+            jobs.extend(json.load(f))
+    return jobs
+
+
+def get_output_path(path, in_place, suffix):
+    if in_place:
+        return path
+    root, ext = os.path.splitext(path)
+    return root + suffix + ext
+
+
+# --------------------------------------------------------------------------
+# ワーカー (Blender 内で実行される)
+
+def register_addon():
+    addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    addon = importlib.import_module(os.path.basename(addon_dir))
+    addon.register()
+    return addon
+
+
+def run_worker(task):
+    import bpy
+
+    register_addon()
+
+    context = bpy.context
+    view_layer = context.view_layer
+    params = coerce_params(task["params"], get_operator_property_types())
+    results = []
+
+    for name in task["objects"]:
+        start = time.perf_counter()
+        obj = bpy.data.objects.get(name)
+        if obj is None:
+            results.append({"name": name, "status": "ERROR", "message": "オブジェクトがありません", "seconds": 0.0})
+            continue
+
+        for other in view_layer.objects:
+            other.select_set(False)
+        obj.select_set(True)
+        view_layer.objects.active = obj
+
+        try:
+            result = bpy.ops.taremin.shoelaces_create_curve(**params)
+            status = "OK" if "FINISHED" in result else "ERROR"
+            message = ""
+        except (RuntimeError, TypeError) as e:
+            status = "ERROR"
+            message = str(e).strip()
+
+        results.append({
+            "name": name,
+            "status": status,
+            "message": message,
+            "seconds": time.perf_counter() - start,
+        })
+
+    output = task["output"]
+    if any(r["status"] == "OK" for r in results):
+        if output == bpy.data.filepath:
+            bpy.ops.wm.save_mainfile()
+        else:
+            bpy.ops.wm.save_as_mainfile(filepath=output, copy=True)
+
+    print(RESULT_PREFIX + json.dumps(results, ensure_ascii=False))
+    sys.stdout.flush()
+
+
+# --------------------------------------------------------------------------
+# コントローラ
+
+def run_job(args, job, params):
+    path = os.path.abspath(job["file"])
+    task = {
+        "objects": job["objects"],
+        "params": dict(params, **job.get("params", {})),
+        "output": os.path.abspath(get_output_path(path, args.in_place, args.suffix)),
+    }
+    command = [
+        args.blender, "-b", "--factory-startup", "--python-exit-code", "1", path,
+        "--python", os.path.abspath(__file__),
+        "--", "--worker", "--task", json.dumps(task),
+    ]
+
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(
+            command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True, timeout=args.timeout)
+        returncode = process.returncode
+        log = process.stdout
+    except subprocess.TimeoutExpired as e:
+        returncode = None
+        # タイムアウトした場合の出力は universal_newlines を指定しても bytes のまま
+        log = e.output or ""
+        if isinstance(log, bytes):
+            log = log.decode(errors="replace")
+
+    objects = []
+    for line in log.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            objects = json.loads(line[len(RESULT_PREFIX):])
+
+    return {
+        "file": path,
+        "output": task["output"],
+        "returncode": returncode,
+        "seconds": time.perf_counter() - start,
+        "objects": objects,
+        "log": log if returncode != 0 or len(objects) == 0 else "",
+    }
+
+
+def run_controller(args):
+    jobs = get_jobs(args)
+    params = get_operator_params(args)
+    results = []
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = [executor.submit(run_job, args, job, params) for job in jobs]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results.append(result)
+
+            ok = sum(1 for o in result["objects"] if o["status"] == "OK")
+            print("{}: {}/{} ({:.2f}s)".format(
+                result["file"], ok, len(result["objects"]), result["seconds"]))
+            for o in result["objects"]:
+                if o["status"] != "OK":
+                    print("  {}: {} {}".format(o["name"], o["status"], o["message"]))
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    failed = [
+        r for r in results
+        if r["returncode"] != 0 or len(r["objects"]) == 0 or
+        any(o["status"] != "OK" for o in r["objects"])
+    ]
+    return 1 if failed else 0
+
+
+def main(argv):
+    args = create_parser().parse_args(get_script_args(argv))
+
+    if args.worker:
+        run_worker(json.loads(args.task))
+        return 0
+
+    return run_controller(args)
+
+
+if __name__ == "__main__":
+    code = main(sys.argv)
+    if code:
+        sys.exit(code)
@@ -0,0 +1,223 @@
+# 生成したカーブの制御点を元のメッシュのグリッドの四角形に結び付け、変形に合わせて動かす
+#
+# 制御点とハンドルの位置ごとに
+#   最も近いグリッドの頂点に接する四角形へ投影した双線形補間の (u, v) と、
+#   その位置の正規直交基底(u 方向, v 方向, 法線)で表したずれ
+# を記録しておき、再生時は評価後のメッシュの頂点座標だけから位置を求め直す
+# (グリッドの解析や制御点の計算はしない)
+import time
+import numpy
+import bpy
+
+from . import cache, core, link, mesh_adapter, writeback
+
+# 最も近いグリッドの頂点を総当たりで探すときに、一度に距離を求める点の数
+NEAREST_CHUNK_SIZE = 256
+
+# 四角形に投影するときの Gauss-Newton 法の反復回数
+PROJECTION_ITERATIONS = 8
+
+
+class Binding:
+    def __init__(self, vertices2d, quad_x, quad_y, u, v, offsets):
+        self.vertices2d = vertices2d
+        self.quad_x = quad_x
+        self.quad_y = quad_y
+        self.u = u
+        self.v = v
+        self.offsets = offsets
+
+
+# 四角形 (quad_x, quad_y) を (u, v) で双線形補間した位置と、u, v 方向の微分
+def eval_quads(co, vertices2d, quad_x, quad_y, u, v):
+    p00 = co[vertices2d[quad_x, quad_y]]
+    p10 = co[vertices2d[quad_x + 1, quad_y]]
+    p01 = co[vertices2d[quad_x, quad_y + 1]]
+    p11 = co[vertices2d[quad_x + 1, quad_y + 1]]
+
+    u = u[:, None]
+    v = v[:, None]
+    a = p10 - p00
+    b = p01 - p00
+    c = p11 - p10 - p01 + p00
+
+    return p00 + a * u + b * v + c * u * v, a + c * v, b + c * u
+
+
+# 行ごとに u 方向・v 方向・法線の正規直交基底 (m, 3, 3)
+def calc_frames(su, sv):
+    normals = core.normalize(numpy.cross(su, sv))
+    tangents = core.normalize(su - normals * numpy.einsum('ij,ij->i', su, normals)[:, None])
+    return numpy.stack((tangents, numpy.cross(normals, tangents), normals), axis=1)
+
+
+def find_nearest_grid_vertices(points, grid_co):
+    squared = numpy.einsum('ij,ij->i', grid_co, grid_co)
+    nearest = numpy.empty(len(points), dtype=numpy.int64)
+    for start in range(0, len(points), NEAREST_CHUNK_SIZE):
+        chunk = points[start:start + NEAREST_CHUNK_SIZE]
+        nearest[start:start + NEAREST_CHUNK_SIZE] = (squared - 2.0 * chunk @ grid_co.T).argmin(axis=1)
+    return nearest
+
+
+# 四角形上で最も近い位置の (u, v) と距離 (四角形の外側は辺上に制限する)
+def project_to_quads(points, co, vertices2d, quad_x, quad_y):
+    u = numpy.full(len(points), 0.5)
+    v = numpy.full(len(points), 0.5)
+
+    for _ in range(PROJECTION_ITERATIONS):
+        s, su, sv = eval_quads(co, vertices2d, quad_x, quad_y, u, v)
+        r = points - s
+        a11 = numpy.einsum('ij,ij->i', su, su)
+        a12 = numpy.einsum('ij,ij->i', su, sv)
+        a22 = numpy.einsum('ij,ij->i', sv, sv)
+        b1 = numpy.einsum('ij,ij->i', su, r)
+        b2 = numpy.einsum('ij,ij->i', sv, r)
+
+        det = a11 * a22 - a12 * a12
+        valid = det > 0.0
+        det = numpy.where(valid, det, 1.0)
+        u = numpy.clip(u + numpy.where(valid, (a22 * b1 - a12 * b2) / det, 0.0), 0.0, 1.0)
+        v = numpy.clip(v + numpy.where(valid, (a11 * b2 - a12 * b1) / det, 0.0), 0.0, 1.0)
+
+    s, _, _ = eval_quads(co, vertices2d, quad_x, quad_y, u, v)
+    return u, v, numpy.linalg.norm(points - s, axis=1)
+
+
+# points (m, 3) を、頂点座標 co のメッシュのグリッド vertices2d に結び付ける
+def bind_points(co, vertices2d, points):
+    width, height = vertices2d.shape
+    grid_x, grid_y = numpy.divmod(
+        find_nearest_grid_vertices(points, co[vertices2d.ravel()]), height)
+
+    # 最も近い頂点に接する(最大)4つの四角形のうち、最も近いものを使う
+    quad_x = numpy.zeros(len(points), dtype=numpy.int64)
+    quad_y = numpy.zeros(len(points), dtype=numpy.int64)
+    u = numpy.zeros(len(points))
+    v = numpy.zeros(len(points))
+    distance = numpy.full(len(points), numpy.inf)
+    for dx in (-1, 0):
+        for dy in (-1, 0):
+            x = numpy.clip(grid_x + dx, 0, width - 2)
+            y = numpy.clip(grid_y + dy, 0, height - 2)
+            candidate_u, candidate_v, candidate_distance = project_to_quads(points, co, vertices2d, x, y)
+
+            better = candidate_distance < distance
+            quad_x[better] = x[better]
+            quad_y[better] = y[better]
+            u[better] = candidate_u[better]
+            v[better] = candidate_v[better]
+            distance[better] = candidate_distance[better]
+
+    s, su, sv = eval_quads(co, vertices2d, quad_x, quad_y, u, v)
+    offsets = numpy.einsum('mij,mj->mi', calc_frames(su, sv), points - s)
+
+    return Binding(vertices2d, quad_x, quad_y, u, v, offsets)
+
+
+# 変形後の頂点座標 co から、結び付けた点の位置を求める
+def evaluate_binding(binding, co):
+    s, su, sv = eval_quads(co, binding.vertices2d, binding.quad_x, binding.quad_y, binding.u, binding.v)
+    return s + numpy.einsum('mij,mi->mj', calc_frames(su, sv), binding.offsets)
+
+
+# --------------------------------------------------------------------------
+# カーブへの保存と再生
+
+# 結び付けた情報 (カーブのカスタムプロパティから復元したもの)
+class BindingCacheEntry:
+    def __init__(self, binding, num_verts, handle_types, cyclic):
+        self.binding = binding
+        self.num_verts = num_verts
+        self.handle_types = handle_types
+        self.cyclic = cyclic
+
+
+# 評価後のメッシュの頂点座標 (元のメッシュのローカル座標)
+def get_evaluated_coordinates(source, depsgraph):
+    evaluated = source.evaluated_get(depsgraph)
+    mesh = evaluated.to_mesh()
+    try:
+        return mesh_adapter.BlenderMeshAdapter(mesh).get_coordinates().copy()
+    finally:
+        evaluated.to_mesh_clear()
+
+
+# カーブの現在の制御点を、現在のフレームの評価後のメッシュに結び付けてカーブに保存する
+def bind_curve(context, curve_obj, vertices2d):
+    source = link.get_source(curve_obj)
+    spline = curve_obj.data.splines[0]
+    arrays = writeback.read_bezier_points(spline.bezier_points)
+    n = len(arrays["co"])
+
+    co = get_evaluated_coordinates(source, context.evaluated_depsgraph_get())
+    if len(co) != len(source.data.vertices):
+        return True, "モディファイアで頂点の数が変わっています"
+
+    points = writeback.transform(
+        writeback.get_transform(curve_obj, source),
+        numpy.concatenate((arrays["co"], arrays["handle_left"], arrays["handle_right"])).astype(numpy.float64))
+    binding = bind_points(co, vertices2d, points)
+
+    link.set_binding(curve_obj, {
+        "stamp": time.time(),
+        "num_verts": len(co),
+        "width": vertices2d.shape[0],
+        "vertices2d": vertices2d.ravel().tolist(),
+        "quads": numpy.stack((binding.quad_x, binding.quad_y), axis=1).ravel().tolist(),
+        "weights": numpy.stack((binding.u, binding.v), axis=1).ravel().tolist(),
+        "offsets": binding.offsets.ravel().tolist(),
+        "handle_types": arrays["handle_type"].tolist(),
+        "cyclic": spline.use_cyclic_u,
+    })
+
+    return None, n
+
+
+# カスタムプロパティの配列を毎フレーム変換しないよう、復元した配列を保持する
+def load_binding(curve_obj):
+    data = link.get_binding(curve_obj)
+    cache_key = (curve_obj.name_full, data["stamp"])
+    entry = cache.binding_cache.get(cache_key)
+
+    if entry is None:
+        def to_array(name, dtype, columns):
+            return numpy.array(data[name].to_list(), dtype=dtype).reshape(-1, columns)
+
+        quads = to_array("quads", numpy.int64, 2)
+        weights = to_array("weights", numpy.float64, 2)
+        binding = Binding(
+            to_array("vertices2d", numpy.int64, 1).reshape(data["width"], -1),
+            quads[:, 0], quads[:, 1], weights[:, 0], weights[:, 1],
+            to_array("offsets", numpy.float64, 3))
+        entry = BindingCacheEntry(
+            binding, data["num_verts"],
+            numpy.array(data["handle_types"].to_list(), dtype=numpy.int32), bool(data["cyclic"]))
+
+        cache.binding_cache.discard_if(lambda key: key[0] == curve_obj.name_full)
+        cache.binding_cache.set(cache_key, entry)
+
+    return entry
+
+
+# 結び付けたカーブを、評価後のメッシュに合わせて動かす (書き込んだ制御点の数、動かせない場合は None)
+def update_curve(curve_obj, depsgraph):
+    source = link.get_source(curve_obj)
+    if source is None or source.type != 'MESH' or curve_obj.type != 'CURVE':
+        return None
+
+    entry = load_binding(curve_obj)
+    co = get_evaluated_coordinates(source, depsgraph)
+    if len(co) != entry.num_verts:
+        return None
+
+    points = evaluate_binding(entry.binding, co)
+    n = len(entry.handle_types)
+    arrays = numpy.zeros(n, dtype=core.POINT_DTYPE)
+    arrays["co"] = points[:n]
+    arrays["handle_left"] = points[n:n*2]
+    arrays["handle_right"] = points[n*2:]
+    arrays["handle_type"] = entry.handle_types
+
+    arrays = writeback.transform_arrays(arrays, writeback.get_transform(source, curve_obj))
+    return writeback.update_bezier_spline(curve_obj.data.splines, arrays, entry.cyclic)
@@ -0,0 +1,101 @@
+import collections
+import hashlib
+import numpy
+
+
+class LRUCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.items = collections.OrderedDict()
+
+    def get(self, key):
+        if key not in self.items:
+            return None
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def set(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def discard_if(self, func):
+        for key in [key for key in self.items if func(key)]:
+            del self.items[key]
+
+    def clear(self):
+        self.items.clear()
+
+    def __len__(self):
+        return len(self.items)
+
+
+# メッシュ解析の結果(ソースメッシュと offset のみに依存する)
+class TopologyCacheEntry:
+    def __init__(self, vertices2d):
+        self.vertices2d = vertices2d
+        # (from_x, from_y, to_x, to_y) -> 対角線上の (co, normal) のリスト2本と中心点の位置
+        self.cross_lines = {}
+
+
+# ライブ更新用のグリッド (頂点・面の数が変わらない限り再解析しない)
+class LiveTopologyEntry:
+    def __init__(self, counts, vertices2d):
+        self.counts = counts
+        self.vertices2d = vertices2d
+
+
+# プリセットの結び目のスプライン(制御点の配列)とベベル深度
+class KnotCacheEntry:
+    def __init__(self, mtime, splines, bevel_depth):
+        self.mtime = mtime
+        self.splines = splines
+        self.bevel_depth = bevel_depth
+
+
+# 頂点座標と辺の並びからメッシュのジオメトリを識別するハッシュを作る
+def get_mesh_fingerprint(mesh):
+    num_verts = len(mesh.vertices)
+    num_edges = len(mesh.edges)
+    num_polygons = len(mesh.polygons)
+
+    co = numpy.empty(num_verts * 3, dtype=numpy.float32)
+    mesh.vertices.foreach_get("co", co)
+    edges = numpy.empty(num_edges * 2, dtype=numpy.int32)
+    mesh.edges.foreach_get("vertices", edges)
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(numpy.array((num_verts, num_edges, num_polygons), dtype=numpy.int64).tobytes())
+    h.update(co.tobytes())
+    h.update(edges.tobytes())
+
+    return h.hexdigest()
+
+
+def get_topology_key(obj, *params):
+    return (obj.data.name_full, get_mesh_fingerprint(obj.data)) + params
+
+
+# poll() やパネルの描画ごとにメッシュを検査しないよう結果を保持する
+# (メッシュが変更されたときに handlers から破棄される)
+def get_validation_key(mesh):
+    return (mesh.name_full, len(mesh.vertices), len(mesh.loops))
+
+
+def invalidate_validation(mesh_name):
+    validation_cache.discard_if(lambda key: key[0] == mesh_name)
+
+
+topology_cache = LRUCache(8)
+# (結び方, 横幅, 高さ) -> lacing_pattern.CompiledPattern
+pattern_cache = LRUCache(32)
+validation_cache = LRUCache(32)
+knot_cache = LRUCache(8)
+# 紐とメッシュの距離を調べるための面の BVH
+bvh_cache = LRUCache(4)
+# (キャッシュファイルのパス, 更新日時) -> bake.BakeCacheEntry
+bake_cache = LRUCache(4)
+# (カーブの名前, 結び付けた時刻) -> binding.BindingCacheEntry
+binding_cache = LRUCache(16)
+live_topology_cache = LRUCache(16)
@@ -0,0 +1,195 @@
+# 生成した紐がメッシュにめり込んでいないか、紐同士がぶつかっていないかを調べて制御点をずらす
+#
+# 紐をサンプリングした点ごとに
+#   メッシュ: 最も近い面上の点と法線から符号付き距離を求め、面から半径 + margin 以内なら
+#             近い方の制御点がある側(表か裏)へ押し出す
+#   紐同士:   空間ハッシュで直径 + margin 以内の点の組を探し、紐に沿って十分離れていれば互いに離す
+# ずらす量は、サンプリングした点に近い方の制御点にハンドルごと加える
+# 穴を通る SIDE の制御点は動かさず、穴に接する区間は面を突き抜けるのでメッシュとの距離は調べない
+import numpy
+
+from . import core, sweep
+
+# 区間ごとのサンプリングの分割数
+SAMPLE_RESOLUTION = 8
+
+# 調べてずらす回数の上限 (最後にずらした結果ももう一度調べる)
+MAX_PASSES = 4
+
+# 紐に沿った距離がこの値 x 直径より近い点同士や、対応する制御点の番号の差がこの値以下の点同士は、
+# 同じ部分(区間内のねじれや穴の前後)なので衝突とみなさない
+PATH_EXCLUSION = 2.0
+INDEX_EXCLUSION = 2
+
+# 27近傍のセルのオフセット
+NEIGHBOR_OFFSETS = numpy.array(
+    [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)], dtype=numpy.int64)
+
+
+# 区間の前半の点は始点、後半の点は終点の制御点に対応させる
+def get_nearest_control_points(span, t, n, cyclic):
+    start, end = sweep.get_spans(n, cyclic)
+    return numpy.where(t < 0.5, start[span], end[span])
+
+
+# 紐に沿った長さ (閉じている場合は短い方の向きで測れるよう全長も返す)
+def calc_path_lengths(points, cyclic):
+    lengths = numpy.linalg.norm(numpy.diff(points, axis=0), axis=1)
+    path = numpy.concatenate(([0.0], numpy.cumsum(lengths)))
+    total = path[-1]
+    if cyclic and len(points) > 1:
+        total += numpy.linalg.norm(points[0] - points[-1])
+    return path, total
+
+
+# find_nearest(points) -> (面上の最も近い点, 面の法線) それぞれ (m, 3)、見つからない点は NaN
+# side: 点ごとにどちら側にあるべきか (表 1, 裏 -1)
+def calc_mesh_offsets(points, side, find_nearest, clearance):
+    nearest, normals = find_nearest(points)
+    signed = numpy.einsum('ij,ij->i', points - nearest, normals)
+
+    depth = clearance - signed * side
+    bad = numpy.isfinite(depth) & (depth > 0.0)
+
+    offsets = numpy.zeros_like(points)
+    offsets[bad] = normals[bad] * (depth[bad] * side[bad])[:, None]
+    return offsets
+
+
+# 空間ハッシュで distance より近い点の組 (i < j) を求める
+def find_close_pairs(points, distance):
+    if len(points) < 2 or distance <= 0.0:
+        return numpy.empty((0, 2), dtype=numpy.int64)
+
+    # セルの座標を、隣のセルがはみ出さないよう1つずつ余白を空けた連番にする
+    cells = numpy.floor(points / distance).astype(numpy.int64)
+    cells -= cells.min(axis=0) - 1
+    dims = cells.max(axis=0) + 2
+    strides = numpy.array((dims[1] * dims[2], dims[2], 1), dtype=numpy.int64)
+    keys = cells @ strides
+
+    # 点をセル順に並べ、空でないセルごとの範囲を求める(近傍の検索はセル単位で行う)
+    order = numpy.argsort(keys, kind='stable')
+    cell_keys, cell_begin, cell_of_point, cell_counts = numpy.unique(
+        keys[order], return_index=True, return_inverse=True, return_counts=True)
+    point_cells = numpy.empty_like(cell_of_point)
+    point_cells[order] = cell_of_point
+
+    pairs = []
+    for offset in NEIGHBOR_OFFSETS @ strides:
+        neighbor = cell_keys + offset
+        found = numpy.minimum(numpy.searchsorted(cell_keys, neighbor), len(cell_keys) - 1)
+        exists = cell_keys[found] == neighbor
+        begin = cell_begin[found][point_cells]
+        counts = numpy.where(exists, cell_counts[found], 0)[point_cells]
+
+        i = numpy.repeat(numpy.arange(len(points)), counts)
+        first = numpy.repeat(begin - (numpy.cumsum(counts) - counts), counts)
+        j = order[first + numpy.arange(len(i))]
+
+        keep = i < j
+        pairs.append(numpy.stack((i[keep], j[keep]), axis=1))
+
+    pairs = numpy.concatenate(pairs)
+    d = numpy.linalg.norm(points[pairs[:, 0]] - points[pairs[:, 1]], axis=1)
+    return pairs[d < distance]
+
+
+# 紐同士の衝突を、点の組ごとに半分ずつ反対向きに離す量として求める
+def calc_lace_offsets(points, cyclic, control_points, n, active, distance):
+    offsets = numpy.zeros_like(points)
+    pairs = find_close_pairs(points, distance)
+
+    path, total = calc_path_lengths(points, cyclic)
+    along = numpy.abs(path[pairs[:, 0]] - path[pairs[:, 1]])
+    index = numpy.abs(control_points[pairs[:, 0]] - control_points[pairs[:, 1]])
+    if cyclic:
+        along = numpy.minimum(along, total - along)
+        index = numpy.minimum(index, n - index)
+    pairs = pairs[
+        (along >= distance * PATH_EXCLUSION) & (index > INDEX_EXCLUSION) &
+        active[pairs[:, 0]] & active[pairs[:, 1]]]
+    if len(pairs) == 0:
+        return offsets, 0
+
+    i = pairs[:, 0]
+    j = pairs[:, 1]
+    delta = points[i] - points[j]
+    d = numpy.linalg.norm(delta, axis=1, keepdims=True)
+    push = core.normalize(delta) * ((distance - d) / 2.0)
+
+    numpy.add.at(offsets, i, push)
+    numpy.add.at(offsets, j, -push)
+    return offsets, len(pairs)
+
+
+# サンプリングした点ごとのずらす量を、制御点ごとに大きさが最大のものにまとめて加える
+def apply_offsets(arrays, control_points, offsets):
+    magnitude = numpy.linalg.norm(offsets, axis=1)
+    moved = magnitude > 0.0
+    if not numpy.any(moved):
+        return numpy.empty(0, dtype=numpy.int64)
+
+    control_points = control_points[moved]
+    offsets = offsets[moved]
+    order = numpy.lexsort((magnitude[moved], control_points))
+    control_points = control_points[order]
+    last = numpy.append(control_points[1:] != control_points[:-1], True)
+
+    indices = control_points[last]
+    offsets = offsets[order][last]
+    for name in ("co", "handle_left", "handle_right"):
+        arrays[name][indices] += offsets
+
+    return indices
+
+
+# 制御点の配列 (core.POINT_DTYPE) を調べてずらした配列と、ずらした制御点の数・残った問題の数を返す
+# find_nearest が None の場合はメッシュとの距離は調べない
+def fix_clearance(arrays, cyclic, radius, margin, find_nearest=None, resolution=SAMPLE_RESOLUTION):
+    arrays = arrays.copy()
+    n = len(arrays)
+    if n < 2:
+        return arrays, 0, 0
+
+    is_side = arrays["type"] == core.POINT_TYPES['SIDE']
+    is_knot = arrays["type"] == core.POINT_TYPES['KNOT']
+
+    # 制御点がメッシュのどちら側にあるかを、ずらす前の位置で決めておく
+    control_side = numpy.ones(n)
+    if find_nearest is not None:
+        nearest, normals = find_nearest(arrays["co"])
+        signed = numpy.einsum('ij,ij->i', arrays["co"] - nearest, normals)
+        control_side = numpy.where(signed < 0.0, -1.0, 1.0)
+
+    fixed = set()
+    for i in range(MAX_PASSES + 1):
+        points, span, t = sweep.sample_bezier(
+            arrays["co"], arrays["handle_left"], arrays["handle_right"], cyclic, resolution)
+        control_points = get_nearest_control_points(span, t, n, cyclic)
+        active = ~is_side[control_points]
+        # 穴に接する区間は面を突き抜けるので、メッシュとの距離は穴に接しない区間だけで調べる
+        start, end = sweep.get_spans(n, cyclic)
+        away_from_holes = ~(is_side[start] | is_side[end])[span]
+
+        offsets = numpy.zeros_like(points)
+        remaining = 0
+        if find_nearest is not None:
+            mesh_offsets = calc_mesh_offsets(
+                points, control_side[control_points], find_nearest, radius + margin)
+            mesh_offsets[~away_from_holes] = 0.0
+            offsets += mesh_offsets
+            remaining += int(numpy.count_nonzero(numpy.any(mesh_offsets != 0.0, axis=1)))
+
+        # 結び目は形が決まっているので、紐同士の衝突は結び目以外で調べる
+        lace_offsets, num_pairs = calc_lace_offsets(
+            points, cyclic, control_points, n, active & ~is_knot[control_points], radius * 2.0 + margin)
+        offsets += lace_offsets
+        remaining += num_pairs
+
+        if remaining == 0 or i == MAX_PASSES:
+            break
+
+        fixed.update(apply_offsets(arrays, control_points, offsets).tolist())
+
+    return arrays, len(fixed), remaining
@@ -0,0 +1,412 @@
+# 靴紐の制御点を計算する処理 (bpy/mathutils に依存せず NumPy の配列だけで計算する)
+#
+# 入力は頂点座標 co (N, 3), 頂点法線 normals (N, 3), グリッド vertices2d (width, height)
+# 制御点は POINT_DTYPE の構造化配列で、各処理は制御点の塊を返し最後に1回だけ連結する
+import math
+import numpy
+
+FLT_EPSILON = 1.1920928955078125e-07
+
+# 制御点の種類
+POINT_TYPES = {
+    'SIDE': 0,
+    'MIDDLE': 1,
+    'KNOT': 2,
+}
+
+# BezierSplinePoint.handle_left_type/handle_right_type の値
+HANDLE_TYPES = {
+    'FREE': 0,
+    'AUTO': 1,
+    'VECTOR': 2,
+    'ALIGNED': 3,
+}
+
+POINT_DTYPE = numpy.dtype([
+    ("type", numpy.int8),
+    ("co", numpy.float64, (3,)),
+    ("handle_left", numpy.float64, (3,)),
+    ("handle_right", numpy.float64, (3,)),
+    ("handle_type", numpy.int32),
+])
+
+
+class KnotSplines:
+    def __init__(self, left, right, bevel_depth):
+        # left/right: {"co", "handle_left", "handle_right"} それぞれ (n, 3) の配列
+        self.left = left
+        self.right = right
+        self.bevel_depth = bevel_depth
+
+
+def normalize(vectors):
+    vectors = numpy.asarray(vectors, dtype=numpy.float64)
+    length = numpy.linalg.norm(vectors, axis=-1, keepdims=True)
+    return numpy.divide(vectors, length, out=numpy.zeros_like(vectors), where=length > 0.0)
+
+
+# 同じ種類の制御点をまとめて作る (co, handle_left, handle_right は (n, 3) か長さ3の配列)
+def make_points(point_type, co, handle_left, handle_right):
+    co = numpy.reshape(co, (-1, 3))
+    points = numpy.empty(len(co), dtype=POINT_DTYPE)
+    points["type"] = POINT_TYPES[point_type]
+    points["co"] = co
+    points["handle_left"] = numpy.reshape(handle_left, (-1, 3))
+    points["handle_right"] = numpy.reshape(handle_right, (-1, 3))
+    # 結び目の制御点はハンドルを自動計算させる
+    points["handle_type"] = HANDLE_TYPES['AUTO' if point_type == 'KNOT' else 'ALIGNED']
+    return points
+
+
+def concatenate_points(chunks):
+    chunks = list(chunks)
+    if len(chunks) == 0:
+        return numpy.empty(0, dtype=POINT_DTYPE)
+    return numpy.concatenate(chunks)
+
+
+# 中心点の制御点のハンドル (center から side2 -> side1 方向へ、side1 との距離に比例した長さ)
+def calc_center_handle(center, side1, side2, length):
+    ratio = (
+        numpy.linalg.norm(side1 - center, axis=-1, keepdims=True) /
+        numpy.linalg.norm(side1 - side2, axis=-1, keepdims=True)
+    )
+    return (side1 - side2) * (ratio * length)
+
+
+# 穴の位置の制御点をまとめて求める (signs: 左の紐は 1, 右の紐は -1)
+def calc_side_point_arrays(co, normals, vertices2d, xs, ys, signs, is_reversed, side_handle_length):
+    index = vertices2d[xs, ys]
+    norm = normalize(normals[index]) * (side_handle_length * numpy.asarray(signs, dtype=numpy.float64))[:, None]
+
+    handle_left = co[index] + norm
+    handle_right = co[index] - norm
+
+    is_reversed = numpy.asarray(is_reversed, dtype=bool)[:, None]
+    return make_points(
+        "SIDE", co[index],
+        numpy.where(is_reversed, handle_right, handle_left),
+        numpy.where(is_reversed, handle_left, handle_right))
+
+
+def calc_side_points(co, normals, vertices2d, left, right, left_x, right_x, y, is_reversed, side_handle_length):
+    points = calc_side_point_arrays(
+        co, normals, vertices2d, [left_x, right_x], [y, y], [1.0, -1.0],
+        [is_reversed, is_reversed], side_handle_length)
+    left.append(points[:1])
+    right.append(points[1:])
+
+
+def calc_center_co_by_length(co, normals):
+    edge_lengths = numpy.linalg.norm(numpy.diff(co, axis=0), axis=1)
+    center_length = edge_lengths.sum() / 2.0
+    current_length = 0.0
+
+    for i, edge_length in enumerate(edge_lengths):
+        tmp_length = current_length + edge_length
+
+        if tmp_length >= center_length:
+            sub = center_length - current_length
+            r1 = normals[i] * (sub / edge_length)
+            r2 = normals[i + 1] * (1 - sub / edge_length)
+            return (
+                co[i] + normalize(co[i + 1] - co[i]) * sub,
+                r1 + r2
+            )
+
+        current_length = tmp_length
+
+    return (None, None)
+
+
+def calc_center_points(co, normals, vertices2d, y, is_reversed, settings):
+    width, height = vertices2d.shape
+    centers = []
+    handles_left = []
+    handles_right = []
+
+    is_simple_curve = settings.is_simple_curve
+    use_center_offset = settings.use_center_offset
+    side_handle_length = settings.side_handle_length
+    center_handle_length_ratio = settings.center_handle_length_ratio
+
+    r = range(1, width-1)
+
+    if is_simple_curve:
+        r = [1]
+    elif is_reversed:
+        r = reversed(r)
+
+    if width < 3:
+        return make_points("MIDDLE", centers, handles_left, handles_right)
+
+    for x in r:
+        co_prev = co[vertices2d[x-1][y]]
+        co_next = co[vertices2d[x+1][y]]
+
+        center = co[vertices2d[x][y]]
+        normal = normals[vertices2d[x][y]]
+
+        if is_simple_curve:
+            row = vertices2d[:, y]
+            center, normal = calc_center_co_by_length(co[row], normals[row])
+            if center is None:
+                raise ValueError("Can't calculate center coordinate")
+            co_next = co[vertices2d[width - 1][y]]
+
+        if use_center_offset:
+            center = center + normal * side_handle_length
+
+        if is_reversed:
+            co_prev, co_next = co_next, co_prev
+
+        centers.append(center)
+        handles_left.append(center + calc_center_handle(
+            center, co_next, co_prev, center_handle_length_ratio))
+        handles_right.append(center + calc_center_handle(
+            center, co_prev, co_next, center_handle_length_ratio))
+
+    # 求めた順とは逆順に並べる
+    return make_points("MIDDLE", centers[::-1], handles_left[::-1], handles_right[::-1])
+
+
+# 上下の行の間の四角形の帯を補間して、対角線上の (co, normal) の配列と中心点の位置を求める
+# 各列の縦の辺上の位置は、帯の中心線に沿った長さの比率で決める
+def find_cross_lines(co, normals, vertices2d, from_x, from_y, to_x, to_y):
+    step = 1 if to_x >= from_x else -1
+    columns = vertices2d[numpy.arange(from_x, to_x + step, step)]
+    num_columns = len(columns)
+
+    co_from = co[columns[:, from_y]]
+    co_to = co[columns[:, to_y]]
+    normal_from = normals[columns[:, from_y]]
+    normal_to = normals[columns[:, to_y]]
+
+    middle = (co_from + co_to) / 2.0
+    lengths = numpy.linalg.norm(numpy.diff(middle, axis=0), axis=1)
+    total_length = lengths.sum()
+    if total_length > 0.0:
+        ratio = numpy.concatenate(([0.0], numpy.cumsum(lengths))) / total_length
+    else:
+        ratio = numpy.linspace(0.0, 1.0, num_columns)
+    ratio[-1] = 1.0
+
+    def interpolate(t):
+        t = t[:, None]
+        line_co = co_from + (co_to - co_from) * t
+        line_normal = normal_from + (normal_to - normal_from) * t
+        return line_co, line_normal
+
+    lines = [interpolate(ratio), interpolate(1.0 - ratio)]
+    lines[1] = (lines[1][0][::-1], lines[1][1][::-1])
+
+    # 2本の対角線は帯の高さの半分の位置で交差する
+    k = int(numpy.searchsorted(ratio, 0.5))
+    if numpy.isclose(ratio[k], 0.5):
+        centers = [k, num_columns - 1 - k]
+    else:
+        s = (0.5 - ratio[k-1]) / (ratio[k] - ratio[k-1])
+        center_co = middle[k-1] + (middle[k] - middle[k-1]) * s
+        center_normal = (
+            (normal_from[k-1] + normal_to[k-1]) * (1.0 - s) +
+            (normal_from[k] + normal_to[k]) * s
+        ) / 2.0
+        centers = [k, num_columns - k]
+        lines = [
+            (
+                numpy.insert(line_co, center, center_co, axis=0),
+                numpy.insert(line_normal, center, center_normal, axis=0),
+            )
+            for (line_co, line_normal), center in zip(lines, centers)
+        ]
+
+    lines = [(line_co, normalize(line_normal)) for line_co, line_normal in lines]
+
+    return lines, centers
+
+
+# layer: 左の紐を表側(1)と裏側(-1)のどちらにずらすか
+def calc_cross_points(lines, centers, left, right, layer, settings):
+    is_simple_curve = settings.is_simple_curve
+    center_length = settings.bevel_depth
+    center_handle_length_ratio = settings.center_handle_length_ratio
+
+    if is_simple_curve:
+        lines = [
+            (line_co[[0, center, -1]], line_normal[[0, center, -1]])
+            for (line_co, line_normal), center in zip(lines, centers)
+        ]
+
+    # 対角線をカーブで結ぶ
+    # 紐同士が交差するため、衝突しないように位置調整
+    front_or_back = layer
+    for target, (line_co, line_normal), sign in [(left, lines[0], 1), (right, lines[1], -1)]:
+        current = line_co[1:-1]
+        prev = line_co[:-2]
+        next = line_co[2:]
+
+        co = current + line_normal[1:-1] * (center_length * sign * front_or_back)
+        handle_left = co + calc_center_handle(
+            current, prev, next, center_handle_length_ratio)
+        handle_right = co + calc_center_handle(
+            current, next, prev, center_handle_length_ratio)
+
+        if sign < 0:
+            handle_left, handle_right = handle_right, handle_left
+
+        target.append(make_points("MIDDLE", co, handle_left, handle_right))
+
+
+# 行に沿って反対側へ渡る横棒の制御点 (rows に2行を渡すと、その行の間の中央に沿う)
+# is_reversed でなければ右から左へ並べる (calc_center_points と同じ向き)
+def calc_bar_points(co, normals, vertices2d, rows, is_reversed, layer, settings):
+    width, height = vertices2d.shape
+    if width < 3:
+        return make_points("MIDDLE", [], [], [])
+
+    columns = vertices2d[:, list(rows)]
+    line_co = co[columns].mean(axis=1)
+    line_normal = normalize(normals[columns].sum(axis=1))
+
+    if not is_reversed:
+        line_co = line_co[::-1]
+        line_normal = line_normal[::-1]
+
+    if settings.is_simple_curve:
+        center = width // 2
+        line_co = line_co[[0, center, -1]]
+        line_normal = line_normal[[0, center, -1]]
+
+    # 表側は中心点と同じだけ浮かせ、裏側は同じだけ沈める
+    offset = settings.side_handle_length if settings.use_center_offset else settings.bevel_depth
+    current = line_co[1:-1]
+    prev = line_co[:-2]
+    next = line_co[2:]
+
+    bar_co = current + line_normal[1:-1] * (offset * layer)
+    ratio = settings.center_handle_length_ratio
+    handle_left = bar_co + calc_center_handle(current, prev, next, ratio)
+    handle_right = bar_co + calc_center_handle(current, next, prev, ratio)
+
+    return make_points("MIDDLE", bar_co, handle_left, handle_right)
+
+
+# mathutils.Vector.rotation_difference 相当 (a を b に重ねる回転のクォータニオン w, x, y, z)
+def rotation_difference(a, b):
+    a = normalize(a)
+    b = normalize(b)
+    axis = numpy.cross(a, b)
+    axis_length = numpy.linalg.norm(axis)
+
+    if axis_length > FLT_EPSILON:
+        if numpy.dot(a, b) >= 0.0:
+            angle = 2.0 * math.asin(min(numpy.linalg.norm(a - b) / 2.0, 1.0))
+        else:
+            angle = math.pi - 2.0 * math.asin(min(numpy.linalg.norm(a + b) / 2.0, 1.0))
+        axis = axis / axis_length
+    elif numpy.dot(a, b) > 0.0:
+        return numpy.array((1.0, 0.0, 0.0, 0.0))
+    else:
+        # a に直交する軸で180度回転
+        dominant = int(numpy.argmax(numpy.abs(a)))
+        if dominant == 0:
+            axis = numpy.array((-a[1] - a[2], a[0], a[0]))
+        elif dominant == 1:
+            axis = numpy.array((a[1], -a[0] - a[2], a[1]))
+        else:
+            axis = numpy.array((a[2], a[2], -a[0] - a[1]))
+        axis = normalize(axis)
+        angle = math.pi
+
+    return numpy.concatenate(([math.cos(angle / 2.0)], axis * math.sin(angle / 2.0)))
+
+
+def quaternion_to_matrix(q):
+    w, x, y, z = q
+    return numpy.array((
+        (1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)),
+        (2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)),
+        (2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)),
+    ))
+
+
+# 結び目の X 軸を上の辺 (vx1 -> vx2) に沿わせる回転行列
+def calc_knot_rotation(vx1, vx2):
+    xvec = numpy.array((1.0, 0.0, 0.0))
+
+    q = rotation_difference(vx1 - vx2, xvec)
+    rotation = quaternion_to_matrix(q)
+    if q[2] != 0.0:
+        q = rotation_difference(vx2 - vx1, xvec)
+        rotation_z = numpy.array(((-1.0, 0.0, 0.0), (0.0, -1.0, 0.0), (0.0, 0.0, 1.0)))
+        rotation = rotation_z @ quaternion_to_matrix(q)
+
+    return rotation.T
+
+
+def fit_knot(knot, center_co, scale, rotation, is_reverse_knot):
+    result = []
+
+    for spline in (knot.left, knot.right):
+        arrays = {}
+        for name, value in spline.items():
+            value = numpy.array(value, dtype=numpy.float64)
+            if is_reverse_knot:
+                value[:, 1] = 0.0 - value[:, 1]
+            arrays[name] = (value * scale) @ rotation.T + center_co
+
+        result.append(make_points(
+            "KNOT", arrays["co"], arrays["handle_left"], arrays["handle_right"]))
+
+    return result
+
+
+def reverse_spline(spline):
+    return {name: value[::-1] for name, value in spline.items()}
+
+
+# 一番上の行の左右の穴 (SIDE の制御点) の列と行
+def get_top_side_position(width, height):
+    y = height-1
+    return (y % 2) * -1 % width, (height % 2) * -1 % width, y
+
+
+def get_top_points(co, normals, vertices2d, settings, knot):
+    x1, x2, y = get_top_side_position(*vertices2d.shape)
+    height = vertices2d.shape[1]
+
+    # Side
+    left = []
+    right = []
+    calc_side_points(co, normals, vertices2d, left, right, x1, x2, y, True, settings.side_handle_length)
+    left = concatenate_points(left)
+    right = concatenate_points(right)
+
+    # Center
+    is_reversed = height % 2 != 0
+    center = calc_center_points(co, normals, vertices2d, y, is_reversed, settings)
+
+    if knot is None:
+        return (concatenate_points((left, center)), right, True)
+
+    # Zを法線方向に, XYを上の辺に沿って回転
+    vx1 = co[vertices2d[x1][y]]
+    vx2 = co[vertices2d[x2][y]]
+
+    if is_reversed:
+        vx1, vx2 = vx2, vx1
+    else:
+        knot = KnotSplines(
+            reverse_spline(knot.right), reverse_spline(knot.left), knot.bevel_depth)
+
+    rotation = calc_knot_rotation(vx1, vx2)
+    scale = settings.bevel_depth / knot.bevel_depth
+
+    if len(center) == 0:
+        center = concatenate_points((left[-1:], right[:1]))
+    center_co = (center["co"][0] + center["co"][-1]) / 2.0
+
+    center_left, center_right = fit_knot(
+        knot, center_co, scale, rotation, settings.is_reverse_knot)
+
+    return (concatenate_points((left, center_left)), concatenate_points((center_right, right)), False)
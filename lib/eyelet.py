@@ -0,0 +1,108 @@
+# 紐を通す穴をメッシュに直接開ける (Boolean を使わずに bmesh で穴の周りのトポロジを作る)
+import bmesh
+import bpy
+import mathutils
+import numpy
+
+from . import core, link, mesh_adapter, writeback
+
+# 穴の周りの輪の間隔 (半径に対する比率)
+RING_SPACING = 0.25
+
+
+# SIDE の制御点 (紐を通す穴) の位置の頂点
+# 結び方の区間の並び (lacing_pattern.CompiledPattern) の Side と、一番上の行の左右の穴
+def get_eyelet_vertices(vertices2d, pattern):
+    width, height = vertices2d.shape
+    x1, x2, y = core.get_top_side_position(width, height)
+    xs = numpy.concatenate((pattern.side_x.ravel(), (x1, x2)))
+    ys = numpy.concatenate((numpy.repeat(pattern.side_y, 2), (y, y)))
+    return numpy.unique(vertices2d[xs, ys])
+
+
+# 穴の位置を決めるグリッドのメッシュと offset, 結び方
+# 選択中の他のオブジェクトに生成したカーブかグリッドのメッシュがあればそれを使い、なければ穴を開けるメッシュ自身を使う
+def find_eyelet_source(context, target, offset, lacing_method):
+    for obj in context.selected_objects:
+        if obj == target:
+            continue
+        curve = link.get_lace_curve(obj)
+        if curve is not None:
+            settings = link.get_settings(curve)
+            return link.get_source(curve), settings.offset, settings.lacing_method
+        if obj.type == 'MESH':
+            return obj, offset, lacing_method
+
+    curve = link.get_lace_curve(target)
+    if curve is not None:
+        settings = link.get_settings(curve)
+        return target, settings.offset, settings.lacing_method
+
+    return target, offset, lacing_method
+
+
+# 境界辺上の頂点は、ベベルすると閉じた穴ではなくメッシュの縁の切り欠きになる
+# (グリッドのメッシュ自身に穴を開ける場合は、穴の位置の両端の列がすべて境界になる)
+def get_boundary_eyelets(target, indices):
+    topology = mesh_adapter.BlenderMeshAdapter(target.data).get_topology()
+    return numpy.intersect1d(indices, topology.get_boundary_vertices())
+
+
+# グリッドの頂点を、穴を開けるメッシュの同じ位置にある頂点に対応付ける
+# (靴のメッシュから複製したグリッドを想定し、tolerance より離れている頂点は見つからなかったものとする)
+def map_vertices(source, target, indices, tolerance):
+    co = mesh_adapter.BlenderMeshAdapter(source.data).get_coordinates()[indices]
+    co = writeback.transform(writeback.get_transform(source, target), co)
+
+    target_co = mesh_adapter.BlenderMeshAdapter(target.data).get_coordinates()
+    kd = mathutils.kdtree.KDTree(len(target_co))
+    for i, v in enumerate(target_co):
+        kd.insert(v, i)
+    kd.balance()
+
+    found = []
+    missing = 0
+    for v in co:
+        _, index, distance = kd.find(v)
+        if index is None or distance > tolerance:
+            missing += 1
+        else:
+            found.append(index)
+
+    return sorted(set(found)), missing
+
+
+# 頂点をベベルして穴の形にし、rings - 1 本の輪を内側に追加してから中心の面を削除する
+# ベベル・インセット・削除はそれぞれ全ての穴に対して1回ずつ実行する
+def punch_eyelets(mesh, vertex_indices, radius, rings, segments):
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    bm.verts.ensure_lookup_table()
+
+    if bpy.app.version >= (2, 90, 0):
+        affect = {"affect": 'VERTICES'}
+    else:
+        affect = {"vertex_only": True}
+
+    outer_radius = radius * (1.0 + RING_SPACING * (rings - 1))
+    result = bmesh.ops.bevel(
+        bm,
+        geom=[bm.verts[i] for i in vertex_indices],
+        offset=outer_radius,
+        segments=segments,
+        profile=0.5,
+        clamp_overlap=True,
+        **affect)
+    faces = result["faces"]
+
+    for _ in range(rings - 1):
+        bmesh.ops.inset_region(
+            bm, faces=faces, thickness=radius * RING_SPACING, use_even_offset=True)
+
+    bmesh.ops.delete(bm, geom=faces, context='FACES_ONLY')
+
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.update()
+
+    return len(faces)
@@ -0,0 +1,100 @@
+import contextlib
+import bpy
+from bpy.app.handlers import persistent
+
+from . import lazy, link
+
+bake = lazy.module(".bake")
+binding = lazy.module(".binding")
+cache = lazy.module(".cache")
+live = lazy.module(".live")
+
+# 焼き込み中は scene.frame_set のたびに結び付けたカーブや焼き込んだカーブを更新しないよう、
+# フレーム変更時の処理を止める
+frame_change_suspended = False
+
+
+@contextlib.contextmanager
+def suspend_frame_change():
+    global frame_change_suspended
+    previous = frame_change_suspended
+    frame_change_suspended = True
+    try:
+        yield
+    finally:
+        frame_change_suspended = previous
+
+
+@persistent
+def on_depsgraph_update_post(scene, depsgraph=None):
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+
+    for update in depsgraph.updates:
+        if not update.is_updated_geometry:
+            continue
+
+        data = update.id.original
+        if isinstance(data, bpy.types.Object):
+            if data.type != 'MESH':
+                continue
+            data = data.data
+        # キャッシュのモジュールが読み込まれていなければ、破棄するキャッシュもない
+        if isinstance(data, bpy.types.Mesh) and lazy.is_loaded(".cache"):
+            cache.invalidate_validation(data.name_full)
+
+    # 追従するカーブがなければライブ更新のモジュールは読み込まない
+    if len(link.get_live_index()) > 0:
+        live.on_depsgraph_update(depsgraph)
+
+
+@persistent
+def on_frame_change_post(scene, depsgraph=None):
+    # 結び付けたカーブや焼き込んだカーブがなければ、それぞれのモジュールは読み込まない
+    if frame_change_suspended or len(link.get_frame_index()) == 0:
+        return
+    if depsgraph is None:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+
+    for curve in link.get_frame_curves():
+        try:
+            if link.get_binding(curve) is not None:
+                binding.update_curve(curve, depsgraph)
+            else:
+                bake.update_curve(scene, curve)
+        except Exception as e:
+            # 1つのカーブの失敗で再生やレンダリングを止めない
+            print("Taremin Shoelaces: {} の更新に失敗しました: {}".format(curve.name, e))
+
+
+@persistent
+def on_reset(*args):
+    if lazy.is_loaded(".cache"):
+        cache.validation_cache.clear()
+    link.invalidate_live_index()
+    link.invalidate_frame_index()
+    if lazy.is_loaded(".live"):
+        live.cancel()
+
+
+handlers = [
+    (bpy.app.handlers.depsgraph_update_post, on_depsgraph_update_post),
+    (bpy.app.handlers.frame_change_post, on_frame_change_post),
+    (bpy.app.handlers.undo_post, on_reset),
+    (bpy.app.handlers.redo_post, on_reset),
+    (bpy.app.handlers.load_post, on_reset),
+]
+
+
+def register():
+    for handler_list, func in handlers:
+        if func not in handler_list:
+            handler_list.append(func)
+
+
+def unregister():
+    for handler_list, func in handlers:
+        if func in handler_list:
+            handler_list.remove(func)
+    if lazy.is_loaded(".live"):
+        live.cancel()
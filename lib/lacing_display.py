@@ -1,4 +1,4 @@
-from . import lacing_base
+from . import lacing_base, lacing_pattern
 
 
 class DisplayShoeLacing(lacing_base.ShoeLacing):
@@ -22,8 +22,9 @@ class DisplayShoeLacing(lacing_base.ShoeLacing):
     #              \       \
     #               \_______\______  BOTTOM
     #
-    def get_bottom_points(self):
-        return self.calc_center_points(0, False)
+    @classmethod
+    def get_bottom(cls, width, height):
+        return (0, False)
 
     # Middle
     # ナナメに分割する両方のedgeで共通してる頂点が中心点
@@ -43,31 +44,13 @@ class DisplayShoeLacing(lacing_base.ShoeLacing):
     #      \                       \
     #       \_______________________\____  MIDDLE (SIDE): y = 1
     #
-    def get_middle_points(self):
-        vertices2d = self.vertices2d
-        width, height = vertices2d.shape
-
-        left = []
-        right = []
+    @classmethod
+    def get_segments(cls, width, height):
         for y in range(1, height):
             from_y = y - 1
             to_y = y
             from_x = ((y - 1) % 2) * -1 % width
             to_x = (y % 2) * -1 % width
 
-            self.calc_side_points(left, right, from_x, to_x, from_y, True)
-            self.calc_cross_points(left, right, from_x, from_y, to_x, to_y)
-
-        return (left, right)
-
-    def create_curve_points(self, context):
-        context.view_layer.objects.active = self.base_obj
-
-        bottom = self.get_bottom_points()
-        left, right = self.get_middle_points()
-        top_left, top_right, cyclic = self.get_top_points(context)
-
-        return (
-            top_right + list(reversed(right)) + list(reversed(bottom)) + left + top_left,
-            cyclic
-        )
+            yield lacing_pattern.Side(from_y, from_x, to_x, True)
+            yield lacing_pattern.Cross(from_x, from_y, to_x, to_y)
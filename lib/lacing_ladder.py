@@ -0,0 +1,27 @@
+from . import lacing_base, lacing_pattern
+
+
+class LadderShoeLacing(lacing_base.ShoeLacing):
+    label = "LadderShoeLacing"
+
+    # Middle
+    # 紐は両端の穴の外側から入り、行の間を左の紐は表側・右の紐は裏側の横棒で渡る
+    #     +-------+-------+-------+
+    #     |       |       |       |
+    #     |       |       |       |
+    #     |       |       |       |
+    #     O-------+-------+-------O
+    #     ||      |       |      ||
+    #     ||      O_______O______||______  MIDDLE (BAR): rows = (1, 2)
+    #     ||      |       |      ||
+    #     O-------+-------+-------O
+    #     ||      |       |      ||
+    #     ||      O_______O______||______  MIDDLE (BAR): rows = (0, 1)
+    #     ||      |       |      ||
+    #     O-------O-------O-------O
+    #      \                       \
+    #       \_______________________\____  MIDDLE (SIDE): y = 0
+    #
+    @classmethod
+    def get_segments(cls, width, height):
+        return lacing_base.get_bar_segments(width, height, False, False)
@@ -1,8 +1,39 @@
-from . import lacing_base
+import collections.abc
 
+from . import lazy
 
-def create_subclasses_list(cls):
-    return {subclass.__name__: subclass for subclass in cls.__subclasses__()}
+# 結び方のクラス名 -> (表示名, モジュール名)
+# クラスは選ばれたときに初めて読み込むので、ここに固定で登録する (並び順は結び方の選択肢の順)
+METHODS = {
+    "BowTieShoeLacing": ("BowTieShoeLacing", "lacing_bow_tie"),
+    "DisplayShoeLacing": ("DisplayShoeLacing", "lacing_display"),
+    "LadderShoeLacing": ("LadderShoeLacing", "lacing_ladder"),
+    "StraightBarShoeLacing": ("StraightBarShoeLacing", "lacing_straight_bar"),
+}
 
 
-ShoeLacingMethods = create_subclasses_list(lacing_base.ShoeLacing)
+def get_label(class_name):
+    return METHODS[class_name][0]
+
+
+def get_enum_items(scene, context):
+    return [(class_name, get_label(class_name), "") for class_name in METHODS]
+
+
+# クラス名からクラスを引く辞書 (参照したときにモジュールを読み込む)
+class ShoeLacingMethodMap(collections.abc.Mapping):
+    def __getitem__(self, class_name):
+        label, module_name = METHODS[class_name]
+        return getattr(lazy.load("." + module_name), class_name)
+
+    def __contains__(self, class_name):
+        return class_name in METHODS
+
+    def __iter__(self):
+        return iter(METHODS)
+
+    def __len__(self):
+        return len(METHODS)
+
+
+ShoeLacingMethods = ShoeLacingMethodMap()
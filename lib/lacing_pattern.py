@@ -0,0 +1,107 @@
+# 結び方を行ごとの区間の並びで記述し、グリッドの位置の配列に変換する
+#
+# 紐は下の中心の区間から左右2本に分かれて上へ進み、一番上の結び目で合流する
+# 各区間は左右それぞれの紐に制御点を追加する
+#
+#   Side(y, left_x, right_x, is_reversed)   行 y の穴 (左の紐は left_x, 右の紐は right_x)
+#   Cross(from_x, from_y, to_x, to_y, layer) 2本の紐が対角線上で交差する (左の紐が layer 側)
+#   Bar(rows, strand, layer)                 strand の紐が rows の行(2行なら行の間)に沿って反対側へ渡る
+#
+# layer は OVER(表側) か UNDER(裏側)
+import numpy
+
+OVER = 1
+UNDER = -1
+
+LEFT = 0
+RIGHT = 1
+
+# 区間の種類
+SIDE = 0
+CROSS = 1
+BAR = 2
+
+
+# 交差する行が偶数なら左の紐が表側
+def get_cross_layer(to_y):
+    return OVER if to_y % 2 == 0 else UNDER
+
+
+class Side:
+    def __init__(self, y, left_x, right_x, is_reversed):
+        self.y = y
+        self.left_x = left_x
+        self.right_x = right_x
+        self.is_reversed = is_reversed
+
+
+class Cross:
+    def __init__(self, from_x, from_y, to_x, to_y, layer=None):
+        self.from_x = from_x
+        self.from_y = from_y
+        self.to_x = to_x
+        self.to_y = to_y
+        self.layer = get_cross_layer(to_y) if layer is None else layer
+
+
+class Bar:
+    def __init__(self, rows, strand, layer):
+        self.rows = tuple(rows)
+        self.strand = strand
+        self.layer = layer
+
+
+# 区間の並びを種類ごとの配列と、紐ごとの (種類, 番号) の並びにまとめたもの
+class CompiledPattern:
+    def __init__(self, bottom, side_x, side_y, side_reversed, crosses, bars, order):
+        # bottom: 下の中心の区間 (y, is_reversed)
+        self.bottom = bottom
+        # side_x: (n, 2) 左右の紐の穴の列, side_y/side_reversed: (n,)
+        self.side_x = side_x
+        self.side_y = side_y
+        self.side_reversed = side_reversed
+        # crosses: (from_x, from_y, to_x, to_y, layer) のリスト
+        self.crosses = crosses
+        # bars: (rows, is_reversed, layer) のリスト
+        self.bars = bars
+        # order: 左右の紐ごとの (種類, 番号) の配列 (m, 2)
+        self.order = order
+
+
+# 横棒は紐がいる側から反対側へ渡るので、区間を順に辿って紐の列を追跡しながら変換する
+def compile_pattern(bottom, segments, width):
+    sides = []
+    crosses = []
+    bars = []
+    order = ([], [])
+    columns = [0, width - 1]
+
+    for segment in segments:
+        if isinstance(segment, Side):
+            for strand, x in ((LEFT, segment.left_x), (RIGHT, segment.right_x)):
+                order[strand].append((SIDE, len(sides)))
+                columns[strand] = x
+            sides.append(segment)
+        elif isinstance(segment, Cross):
+            for strand, x in ((LEFT, segment.to_x), (RIGHT, segment.from_x)):
+                order[strand].append((CROSS, len(crosses)))
+                columns[strand] = x
+            crosses.append((segment.from_x, segment.from_y, segment.to_x, segment.to_y, segment.layer))
+        elif isinstance(segment, Bar):
+            strand = segment.strand
+            is_reversed = columns[strand] == 0
+            order[strand].append((BAR, len(bars)))
+            columns[strand] = width - 1 if is_reversed else 0
+            bars.append((segment.rows, is_reversed, segment.layer))
+        else:
+            raise TypeError("不明な区間です: {}".format(segment))
+
+    return CompiledPattern(
+        bottom,
+        numpy.array([(s.left_x, s.right_x) for s in sides], dtype=numpy.int64).reshape(-1, 2),
+        numpy.array([s.y for s in sides], dtype=numpy.int64),
+        numpy.array([s.is_reversed for s in sides], dtype=bool),
+        crosses,
+        bars,
+        tuple(numpy.array(o, dtype=numpy.int64).reshape(-1, 2) for o in order),
+    )
@@ -0,0 +1,27 @@
+from . import lacing_base, lacing_pattern
+
+
+class StraightBarShoeLacing(lacing_base.ShoeLacing):
+    label = "StraightBarShoeLacing"
+
+    # Middle
+    # 行の間を横棒で渡り、表に見える横棒は左右の紐で交互になる (もう一方は裏側を通る)
+    #     +-------+-------+-------+
+    #     |       |       |       |
+    #     |       |       |       |
+    #     |       |       |       |
+    #     O-------+-------+-------O
+    #     |       |       |       |
+    #     |       O_______O_______|______  MIDDLE (BAR): rows = (1, 2)
+    #     |       |       |       |
+    #     O-------+-------+-------O
+    #     |       |       |       |
+    #     |       O_______O_______|______  MIDDLE (BAR): rows = (0, 1)
+    #     |       |       |       |
+    #     O-------O-------O-------O
+    #      \                       \
+    #       \_______________________\____  MIDDLE (SIDE): y = 0
+    #
+    @classmethod
+    def get_segments(cls, width, height):
+        return lacing_base.get_bar_segments(width, height, True, True)
@@ -0,0 +1,40 @@
+# NumPy や bmesh を読み込むモジュールを、最初に属性を参照したときに読み込む
+# (アドオンの読み込み・登録の時点では、登録するクラスと軽いモジュールだけを読み込む)
+#
+# モジュール名は import_module と同じく、"." で始まる場合はこのパッケージからの相対名
+import importlib
+import sys
+
+
+def get_fullname(name):
+    if name.startswith("."):
+        return __package__ + name
+    return name
+
+
+def is_loaded(name):
+    return get_fullname(name) in sys.modules
+
+
+def load(name):
+    fullname = get_fullname(name)
+    module = sys.modules.get(fullname)
+    if module is None:
+        module = importlib.import_module(fullname)
+    return module
+
+
+# 再読み込みされた場合も新しいモジュールを参照するよう、毎回 sys.modules から引く
+class LazyModule:
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+
+    def __getattr__(self, attr):
+        return getattr(load(self._name), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(load(self._name), attr, value)
+
+
+def module(name):
+    return LazyModule(name)
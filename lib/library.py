@@ -1,6 +1,349 @@
+import os
+import bpy
+from . import lazy, utils
+
+# 結び目の選択肢はリドゥパネルの描画ごとに参照されるので、配列を扱うモジュールや索引は使うときに読み込む
+numpy = lazy.module("numpy")
+hashlib = lazy.module("hashlib")
+json = lazy.module("json")
+cache = lazy.module(".cache")
+core = lazy.module(".core")
+writeback = lazy.module(".writeback")
+
+
 knots = [
     #          Label,      Blend Path, Object Name, Spline Idx 1, Spline Idx 2, Spl1 Rev, Spl2 Rev
     ("None",                     None,        None,         None,         None,     None,     None),
     ("Object",                     "",        None,         None,         None,     None,     None),
     ("Shoelace Knot", "./knots.blend",  "ShoeLace",            1,            0,    False,    False),
 ]
+
+# 結び目のライブラリの索引 (アドオン設定のディレクトリにある .blend ファイルの結び目)
+#   {"version": INDEX_VERSION, "files": {パス: {"mtime": 更新日時, "knots": [結び目の情報, ...]}}}
+INDEX_VERSION = 1
+INDEX_FILENAME = "taremin_shoelaces_knots.json"
+# ライブラリの結び目の knot_type は、ファイルのパスとオブジェクト名から作る
+LIBRARY_ID_PREFIX = "lib_"
+
+# 読み込んだ索引 (最初に参照するまで None)
+knot_index = None
+# knot_type の選択肢 (動的な EnumProperty の文字列は Python 側で参照を保持しておく必要がある)
+enum_items = None
+# ライブラリの結び目の knot_type -> knots と同じ形式の情報 (最初に参照するまで None)
+library_assets = None
+
+
+def append(context, path, obj_names):
+    path = os.path.join(os.path.dirname(__file__), "..", path)
+
+    with context.blend_data.libraries.load(path) as (data_from, data_to):
+        data_to.objects = obj_names
+
+    return [obj for obj in data_to.objects if obj is not None]
+
+
+# bpy.data の削除できる ID のコレクションごとの、現在のデータブロック
+# (読み込みの前に取っておき、読み込みで追加されたものを remove_appended ですべて削除する)
+def get_id_snapshot(blend_data):
+    snapshot = {}
+    for name in dir(blend_data):
+        collection = getattr(blend_data, name, None)
+        if isinstance(collection, bpy.types.bpy_prop_collection) and hasattr(collection, "remove"):
+            snapshot[name] = {value.as_pointer() for value in collection}
+    return snapshot
+
+
+# 読み込んだオブジェクトと一緒に追加されたメッシュ・マテリアル・画像などもすべて削除する
+# オブジェクトを先に削除して、データを使っているものがない状態にする
+# (リンクで追加されたライブラリは、リンクしたデータブロックを削除してから最後に削除する)
+def get_remove_order(name):
+    if name == "objects":
+        return 0
+    if name == "libraries":
+        return 2
+    return 1
+
+
+def remove_appended(blend_data, snapshot):
+    appended = []
+    for name, pointers in snapshot.items():
+        collection = getattr(blend_data, name)
+        appended.extend(
+            (get_remove_order(name), collection, value)
+            for value in collection if value.as_pointer() not in pointers)
+
+    for _, collection, value in sorted(appended, key=lambda item: item[0]):
+        try:
+            collection.remove(value)
+        except ReferenceError:
+            pass
+
+
+# スプラインごとの制御点を配列で読み込む
+def read_curve_splines(curve):
+    splines = []
+
+    for spline in curve.splines:
+        arrays = writeback.read_bezier_points(spline.bezier_points)
+        splines.append({
+            name: arrays[name].astype(numpy.float64)
+            for name in ("co", "handle_left", "handle_right")
+        })
+
+    return splines
+
+
+# プリセットとライブラリの結び目を読み込む (ファイルやオブジェクトがない場合は None)
+# 一度読み込んだらファイルが更新されるまで配列をキャッシュし、追加したデータは削除する
+def load_knot(context, path, obj_name):
+    path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", path))
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    key = (path, obj_name)
+
+    entry = cache.knot_cache.get(key)
+    if entry is not None and entry.mtime == mtime:
+        return entry
+
+    snapshot = get_id_snapshot(context.blend_data)
+    try:
+        objects = append(context, path, [obj_name])
+        if len(objects) == 0 or objects[0].type != 'CURVE':
+            return None
+
+        curve = objects[0].data
+        entry = cache.KnotCacheEntry(mtime, read_curve_splines(curve), curve.bevel_depth)
+        cache.knot_cache.set(key, entry)
+    finally:
+        remove_appended(context.blend_data, snapshot)
+
+    return entry
+
+
+# --------------------------------------------------------------------------
+# ライブラリの索引
+
+def get_index_path():
+    return os.path.join(bpy.utils.user_resource('CONFIG'), INDEX_FILENAME)
+
+
+def get_library_id(path, obj_name):
+    digest = hashlib.blake2b("{}\0{}".format(path, obj_name).encode("utf-8"), digest_size=8)
+    return LIBRARY_ID_PREFIX + digest.hexdigest()
+
+
+# 索引を読み込む (ないか読めない場合は空)
+def get_index():
+    global knot_index
+    if knot_index is None:
+        knot_index = {}
+        try:
+            with open(get_index_path(), encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                knot_index = data["files"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+    return knot_index
+
+
+def save_index(files):
+    global knot_index
+    path = get_index_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": INDEX_VERSION, "files": files}, f, ensure_ascii=False, indent=1)
+
+    knot_index = files
+
+
+# 索引の結び目 [(knot_type, ファイルのパス, 結び目の情報)]
+def get_library_knots():
+    return [
+        (get_library_id(path, knot["object"]), path, knot)
+        for path, entry in sorted(get_index().items())
+        for knot in entry["knots"]
+    ]
+
+
+def find_blend_files(directories):
+    paths = set()
+    for directory in directories:
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                if filename.lower().endswith(".blend"):
+                    paths.add(os.path.normpath(os.path.join(root, filename)))
+    return sorted(paths)
+
+
+# 結び目として使うスプラインの推奨値 (左, 右, 左を逆順にするか, 右を逆順にするか)
+# 紐につながる端は、閉じていないスプラインの端点のうち結び目の横方向(X)に最も外側のもの
+# 左のスプラインは始点、右のスプラインは終点で紐につながる
+def suggest_knot_splines(splines, cyclic):
+    ends = [
+        (i, spline["co"][0][0], spline["co"][-1][0])
+        for i, (spline, is_cyclic) in enumerate(zip(splines, cyclic)) if not is_cyclic
+    ]
+    if len(ends) < 2:
+        return None
+
+    left = min(ends, key=lambda end: min(end[1], end[2]))
+    right = max((end for end in ends if end[0] != left[0]), key=lambda end: max(end[1], end[2]))
+    return left[0], right[0], bool(left[2] < left[1]), bool(right[1] > right[2])
+
+
+# 索引に記録する結び目の情報 (結び目として使えないカーブは None)
+# name: ライブラリでのオブジェクト名 (読み込んだオブジェクトは名前が重なると変更される)
+def get_knot_metadata(obj, name):
+    curve = obj.data
+    bezier_splines = [spline for spline in curve.splines if spline.type == 'BEZIER']
+    if len(bezier_splines) < 2 or curve.bevel_depth <= 0.0:
+        return None
+
+    splines = [
+        {name: value.astype(numpy.float64) for name, value in writeback.read_bezier_points(spline.bezier_points).items()}
+        for spline in bezier_splines
+    ]
+    suggestion = suggest_knot_splines(splines, [spline.use_cyclic_u for spline in bezier_splines])
+    if suggestion is None or len(bezier_splines) != len(curve.splines):
+        return None
+    left, right, reverse_left, reverse_right = suggestion
+
+    co = numpy.concatenate([spline["co"] for spline in splines])
+    return {
+        "object": name,
+        "splines": len(splines),
+        "bevel_depth": curve.bevel_depth,
+        "left": left,
+        "right": right,
+        "reverse_left": reverse_left,
+        "reverse_right": reverse_right,
+        "bounds": [co.min(axis=0).tolist(), co.max(axis=0).tolist()],
+    }
+
+
+# .blend ファイルのオブジェクトを一時的にリンクして、結び目の情報を集める
+# カーブのデータがないファイルはオブジェクトを読み込まない
+# オブジェクトの種類は読み込むまで分からないので、ローカルにコピーしないリンクで読み込み、
+# 追加されたライブラリとデータブロックはすべて削除する
+def scan_blend_file(context, path):
+    snapshot = get_id_snapshot(context.blend_data)
+    try:
+        with context.blend_data.libraries.load(path, link=True) as (data_from, data_to):
+            names = list(data_from.objects) if len(data_from.curves) > 0 else []
+            data_to.objects = names
+
+        return [
+            metadata for metadata in (
+                get_knot_metadata(obj, name)
+                for name, obj in zip(names, data_to.objects)
+                if obj is not None and obj.type == 'CURVE')
+            if metadata is not None
+        ]
+    finally:
+        remove_appended(context.blend_data, snapshot)
+
+
+# ディレクトリの .blend ファイルを調べて索引を更新する (更新日時が変わっていないファイルは調べない)
+# (調べたファイルの数, 読み込めなかったファイルのリスト) を返す
+def update_index(context, directories):
+    old_files = get_index()
+    files = {}
+    scanned = 0
+    errors = []
+
+    for path in find_blend_files(directories):
+        try:
+            mtime = os.path.getmtime(path)
+            entry = old_files.get(path)
+            if entry is None or entry["mtime"] != mtime:
+                entry = {"mtime": mtime, "knots": scan_blend_file(context, path)}
+                scanned += 1
+        except (OSError, RuntimeError) as e:
+            errors.append("{}: {}".format(path, e))
+            continue
+        files[path] = entry
+
+    save_index(files)
+    invalidate_library_cache()
+    return scanned, errors
+
+
+def invalidate_library_cache():
+    global enum_items, library_assets
+    enum_items = None
+    library_assets = None
+
+
+# ライブラリの結び目の knot_type -> knots と同じ形式の情報 (索引を更新するまで同じ辞書を返す)
+def get_library_assets():
+    global library_assets
+    if library_assets is None:
+        library_assets = {
+            knot_id: (
+                knot["object"], path, knot["object"],
+                knot["left"], knot["right"], knot["reverse_left"], knot["reverse_right"])
+            for knot_id, path, knot in get_library_knots()
+        }
+    return library_assets
+
+
+# knot_type の選択肢 (索引を更新するまで同じリストを返す)
+def get_enum_items(self, context):
+    global enum_items
+    if enum_items is None:
+        enum_items = [(str(i), asset[0], "") for i, asset in enumerate(knots)]
+        enum_items.extend(
+            (knot_id, "{} ({})".format(asset[0], os.path.splitext(os.path.basename(asset[1]))[0]), asset[1])
+            for knot_id, asset in get_library_assets().items()
+        )
+    return enum_items
+
+
+# knot_type から knots と同じ形式の情報を返す (見つからない場合は結び目なし)
+# リドゥパネルの描画ごとに呼ばれるので、索引の結び目は knot_type の辞書から引く
+def get_asset(knot_type):
+    if knot_type.isdigit() and int(knot_type) < len(knots):
+        return knots[int(knot_type)]
+
+    return get_library_assets().get(knot_type, knots[0])
+
+
+# オペレータの設定から結び目のスプラインを取得する (結び目なしの場合は None)
+def get_knot(context, settings):
+    asset = get_asset(settings.knot_type)
+    local_knots = utils.get_knot_list(context.scene, context)
+    is_local_object = (asset[1] == "")
+    if asset[1] is None or (is_local_object and len(local_knots) == 0):
+        return None
+
+    if is_local_object:
+        curve = context.blend_data.objects[settings.knot].data
+        splines = read_curve_splines(curve)
+        bevel_depth = curve.bevel_depth
+        is_reverse_spline_left = settings.is_reverse_spline_left
+        is_reverse_spline_right = settings.is_reverse_spline_right
+        spline_index_left = settings.sil
+        spline_index_right = settings.sir
+    else:
+        # プリセットとライブラリの結び目は、選択されたものだけを読み込んでキャッシュした配列を使う
+        knot = load_knot(context, asset[1], asset[2])
+        if knot is None:
+            return None
+        splines = knot.splines
+        bevel_depth = knot.bevel_depth
+        is_reverse_spline_left = asset[5]
+        is_reverse_spline_right = asset[6]
+        spline_index_left = asset[3]
+        spline_index_right = asset[4]
+
+    left = splines[spline_index_left]
+    right = splines[spline_index_right]
+    if is_reverse_spline_left:
+        left = core.reverse_spline(left)
+    if is_reverse_spline_right:
+        right = core.reverse_spline(right)
+
+    return core.KnotSplines(left, right, bevel_depth)
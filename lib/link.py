@@ -0,0 +1,214 @@
+import bpy
+
+# 生成したカーブと元のメッシュの関連付け (カーブオブジェクトのカスタムプロパティに保存する)
+PROP_SOURCE = "taremin_shoelaces_source"
+PROP_PARAMS = "taremin_shoelaces_params"
+PROP_LIVE = "taremin_shoelaces_live"
+PROP_HOLE_CURVE = "taremin_shoelaces_hole_curve"
+PROP_HOLE_MESH = "taremin_shoelaces_hole_mesh"
+# LOD のレベル ("0", "1", ...) -> チューブのメッシュのオブジェクト
+PROP_TUBE_MESHES = "taremin_shoelaces_tube_meshes"
+# 元のメッシュ側には最後に生成したカーブを保存する
+PROP_CURVE = "taremin_shoelaces_curve"
+# 焼き込んだキャッシュファイルのパス (フレームの変更時にカーブへ書き込む)
+PROP_BAKE_CACHE = "taremin_shoelaces_bake_cache"
+# 元のメッシュのグリッドの四角形への結び付け (フレームの変更時に変形に合わせて動かす)
+PROP_BINDING = "taremin_shoelaces_binding"
+
+# 再生成に必要なオペレータのプロパティ
+PARAM_NAMES = (
+    "lacing_method",
+    "offset",
+    "bevel_depth",
+    "side_handle_length",
+    "center_handle_length_ratio",
+    "is_simple_curve",
+    "use_center_offset",
+    "knot_type",
+    "knot",
+    "is_reverse_knot",
+    "is_reverse_spline_left",
+    "is_reverse_spline_right",
+    "sil",
+    "sir",
+    "is_create_tube_mesh",
+    "tube_resolution",
+    "tube_profile_segments",
+    "tube_profile_ratio",
+    "hole_mesh_segments",
+    "use_adaptive_resolution",
+    "tube_segment_budget",
+    "lod_levels",
+    "lod_ratio",
+    "use_clearance_check",
+    "clearance_margin",
+)
+
+
+# オペレータの代わりに、保存したプロパティの値を属性として持つ
+class LinkSettings:
+    # 後から追加したプロパティ(古いカーブには保存されていない)の既定値
+    use_clearance_check = False
+    clearance_margin = 0.0
+
+    def __init__(self, params):
+        self.__dict__.update(params)
+
+
+def store_link(curve_obj, source_obj, operator, live=False):
+    curve_obj[PROP_SOURCE] = source_obj
+    curve_obj[PROP_PARAMS] = {name: getattr(operator, name) for name in PARAM_NAMES}
+    curve_obj[PROP_LIVE] = live
+    source_obj[PROP_CURVE] = curve_obj
+    invalidate_live_index()
+
+
+def store_hole_curve(curve_obj, hole_curve_obj):
+    curve_obj[PROP_HOLE_CURVE] = hole_curve_obj
+
+
+def store_hole_mesh(curve_obj, hole_mesh_obj):
+    curve_obj[PROP_HOLE_MESH] = hole_mesh_obj
+
+
+def store_tube_meshes(curve_obj, tube_objects):
+    curve_obj[PROP_TUBE_MESHES] = {str(level): obj for level, obj in enumerate(tube_objects)}
+
+
+def is_linked(obj):
+    return obj is not None and obj.get(PROP_SOURCE) is not None and PROP_PARAMS in obj
+
+
+def get_source(curve_obj):
+    return curve_obj.get(PROP_SOURCE)
+
+
+def get_hole_curve(curve_obj):
+    return curve_obj.get(PROP_HOLE_CURVE)
+
+
+def get_hole_mesh(curve_obj):
+    return curve_obj.get(PROP_HOLE_MESH)
+
+
+# [(LOD のレベル, オブジェクト)] (削除されたオブジェクトは除く)
+def get_tube_meshes(curve_obj):
+    group = curve_obj.get(PROP_TUBE_MESHES)
+    if group is None:
+        return []
+    return sorted(
+        (int(level), obj) for level, obj in group.items()
+        if obj is not None and obj.type == 'MESH'
+    )
+
+
+# アクティブオブジェクトが元のメッシュの場合は、関連付けられたカーブを返す
+def get_lace_curve(obj):
+    if obj is None:
+        return None
+    if is_linked(obj):
+        return obj
+
+    curve_obj = obj.get(PROP_CURVE)
+    if is_linked(curve_obj) and get_source(curve_obj) == obj:
+        return curve_obj
+
+    return None
+
+
+def get_settings(curve_obj):
+    return LinkSettings(curve_obj[PROP_PARAMS].to_dict())
+
+
+def is_live(curve_obj):
+    return bool(curve_obj.get(PROP_LIVE, False))
+
+
+def set_live(curve_obj, live):
+    curve_obj[PROP_LIVE] = live
+    invalidate_live_index()
+
+
+# 元のメッシュ -> 追従するカーブ の索引 (depsgraph の更新ごとに全オブジェクトを調べないようにする)
+live_index = None
+
+
+def invalidate_live_index():
+    global live_index
+    live_index = None
+
+
+def get_live_index():
+    global live_index
+    if live_index is None:
+        live_index = {}
+        for obj in bpy.data.objects:
+            if not is_live(obj):
+                continue
+            source = get_source(obj)
+            if source is not None:
+                live_index.setdefault(source.name_full, []).append(obj.name_full)
+    return live_index
+
+
+def get_live_curves(source_obj):
+    names = get_live_index().get(source_obj.name_full, [])
+    return [
+        obj for obj in (bpy.data.objects.get(name) for name in names)
+        if obj is not None and is_live(obj) and get_source(obj) == source_obj
+    ]
+
+
+def get_bake_cache(curve_obj):
+    return curve_obj.get(PROP_BAKE_CACHE)
+
+
+# path が None の場合はキャッシュファイルとの関連付けを解除する
+def set_bake_cache(curve_obj, path):
+    if path is None:
+        if PROP_BAKE_CACHE in curve_obj:
+            del curve_obj[PROP_BAKE_CACHE]
+    else:
+        curve_obj[PROP_BAKE_CACHE] = path
+    invalidate_frame_index()
+
+
+def get_binding(curve_obj):
+    return curve_obj.get(PROP_BINDING)
+
+
+# binding が None の場合は結び付けを解除する
+def set_binding(curve_obj, binding):
+    if binding is None:
+        if PROP_BINDING in curve_obj:
+            del curve_obj[PROP_BINDING]
+    else:
+        curve_obj[PROP_BINDING] = binding
+    invalidate_frame_index()
+
+
+def is_frame_driven(obj):
+    return get_binding(obj) is not None or get_bake_cache(obj) is not None
+
+
+# フレームの変更時に書き換えるカーブの名前 (フレームの変更ごとに全オブジェクトを調べないようにする)
+frame_index = None
+
+
+def invalidate_frame_index():
+    global frame_index
+    frame_index = None
+
+
+def get_frame_index():
+    global frame_index
+    if frame_index is None:
+        frame_index = [obj.name_full for obj in bpy.data.objects if is_frame_driven(obj)]
+    return frame_index
+
+
+def get_frame_curves():
+    return [
+        obj for obj in (bpy.data.objects.get(name) for name in get_frame_index())
+        if obj is not None and is_frame_driven(obj)
+    ]
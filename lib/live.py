@@ -0,0 +1,136 @@
+# メッシュの変更に追従してカーブを更新する (ライブ更新)
+#
+# depsgraph の更新で対象のカーブを記録し、最後の更新から DEBOUNCE_SECONDS 経過したらタイマーでまとめて更新する
+import time
+import bpy
+
+from . import cache, link, mesh_adapter, mesh_grid, regenerate, writeback
+
+DEBOUNCE_SECONDS = 0.1
+
+# 更新待ちのカーブの名前
+pending = set()
+last_update_time = 0.0
+
+# 編集モードの内容をメッシュに書き戻したときに発生する更新は無視する
+# (元のメッシュの名前 -> 書き戻した時刻)
+flushed_sources = {}
+
+
+def on_depsgraph_update(depsgraph):
+    global last_update_time
+
+    if len(link.get_live_index()) == 0:
+        return
+
+    now = time.perf_counter()
+    for update in depsgraph.updates:
+        if not (update.is_updated_geometry or update.is_updated_transform):
+            continue
+
+        obj = update.id.original
+        if not isinstance(obj, bpy.types.Object) or obj.type != 'MESH':
+            continue
+
+        flushed_time = flushed_sources.pop(obj.name_full, None)
+        if flushed_time is not None and now - flushed_time < DEBOUNCE_SECONDS / 2:
+            continue
+
+        for curve in link.get_live_curves(obj):
+            pending.add(curve.name)
+
+    if len(pending) > 0:
+        last_update_time = now
+        if not bpy.app.timers.is_registered(on_timer):
+            bpy.app.timers.register(on_timer, first_interval=DEBOUNCE_SECONDS)
+
+
+def on_timer():
+    remaining = DEBOUNCE_SECONDS - (time.perf_counter() - last_update_time)
+    if remaining > 0.0:
+        return remaining
+
+    names = list(pending)
+    pending.clear()
+
+    for name in names:
+        curve = bpy.data.objects.get(name)
+        if curve is None:
+            continue
+        try:
+            update_curve(bpy.context, curve)
+        except Exception as e:
+            # 編集中の一時的な形状で失敗しても、編集操作は止めない
+            print("Taremin Shoelaces: {} の更新に失敗しました: {}".format(name, e))
+
+    return None
+
+
+def cancel():
+    pending.clear()
+    flushed_sources.clear()
+    if bpy.app.timers.is_registered(on_timer):
+        bpy.app.timers.unregister(on_timer)
+
+
+# 頂点・面の数が変わっていなければ前回のグリッドを使う (グリッドにならない場合は None)
+def get_live_topology(source_mesh, mesh, offset):
+    counts = (len(source_mesh.vertices), len(source_mesh.polygons), len(source_mesh.loops))
+    key = (source_mesh.name_full, offset)
+
+    entry = cache.live_topology_cache.get(key)
+    if entry is not None and entry.counts == counts:
+        return entry.vertices2d
+
+    err, corner_vertices = mesh_grid.check_corner_vertices(mesh.get_vertex_face_count())
+    if err is not None:
+        return None
+    try:
+        vertices2d = mesh.get_topology().to_array2d(corner_vertices, offset)
+    except ValueError:
+        return None
+
+    cache.live_topology_cache.set(key, cache.LiveTopologyEntry(counts, vertices2d))
+    return vertices2d
+
+
+# 関連付けられたメッシュからカーブの制御点を計算し直し、変化した点だけを書き込む
+# 戻り値は書き込んだ制御点の数 (更新できなかった場合は None)
+def update_curve(context, curve):
+    source = link.get_source(curve)
+    if source is None or source.type != 'MESH' or curve.type != 'CURVE':
+        return None
+
+    # 編集中のカーブは編集モードを抜けるときに上書きされるので更新しない
+    if curve.mode == 'EDIT':
+        return None
+
+    if source.mode == 'EDIT':
+        source.update_from_editmode()
+        flushed_sources[source.name_full] = time.perf_counter()
+
+    settings = link.get_settings(curve)
+    mesh = mesh_adapter.BlenderMeshAdapter(source.data)
+    vertices2d = get_live_topology(source.data, mesh, settings.offset)
+    if vertices2d is None:
+        return None
+
+    local_arrays, cyclic = regenerate.calc_point_arrays(context, mesh, vertices2d, settings)
+    if settings.use_clearance_check:
+        local_arrays, _, _ = regenerate.fix_clearance(source, local_arrays, cyclic, settings)
+
+    arrays = writeback.transform_arrays(local_arrays, writeback.get_transform(source, curve))
+    written = writeback.update_bezier_spline(curve.data.splines, arrays, cyclic)
+
+    if written > 0:
+        hole_curve = link.get_hole_curve(curve)
+        if hole_curve is not None and hole_curve.type == 'CURVE':
+            regenerate.write_hole_curve(source, hole_curve, local_arrays, settings.bevel_depth)
+
+        hole_mesh_obj = link.get_hole_mesh(curve)
+        if hole_mesh_obj is not None and hole_mesh_obj.type == 'MESH':
+            regenerate.write_hole_mesh(context, source, hole_mesh_obj, local_arrays, settings)
+        for level, tube_obj in link.get_tube_meshes(curve):
+            regenerate.write_tube_mesh(context, curve, tube_obj, settings, level)
+
+    return written
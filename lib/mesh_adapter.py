@@ -0,0 +1,107 @@
+# core/mesh_grid に渡すメッシュの配列を取り出すインターフェース
+#
+#   get_coordinates()       頂点座標 (N, 3)
+#   get_normals()           頂点法線 (N, 3)
+#   get_vertex_face_count() 頂点ごとの面の数 (N,)
+#   get_topology()          mesh_grid.MeshTopology
+import numpy
+from . import mesh_grid
+
+
+class MeshAdapter:
+    def get_coordinates(self):
+        raise NotImplementedError()
+
+    def get_normals(self):
+        raise NotImplementedError()
+
+    def get_vertex_face_count(self):
+        return self.get_topology().vert_face_count
+
+    def get_topology(self):
+        raise NotImplementedError()
+
+
+# Blender のメッシュから foreach_get で一括取得する
+class BlenderMeshAdapter(MeshAdapter):
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self._coordinates = None
+        self._normals = None
+        self._topology = None
+
+    def get_vertex_array(self, name):
+        verts = self.mesh.vertices
+        value = numpy.empty(len(verts) * 3, dtype=numpy.float32)
+        verts.foreach_get(name, value)
+        return value.reshape(-1, 3).astype(numpy.float64)
+
+    def get_coordinates(self):
+        if self._coordinates is None:
+            self._coordinates = self.get_vertex_array("co")
+        return self._coordinates
+
+    def get_normals(self):
+        if self._normals is None:
+            self._normals = self.get_vertex_array("normal")
+        return self._normals
+
+    def get_vertex_face_count(self):
+        if self._topology is not None:
+            return self._topology.vert_face_count
+
+        loop_verts = numpy.empty(len(self.mesh.loops), dtype=numpy.int64)
+        self.mesh.loops.foreach_get("vertex_index", loop_verts)
+        return numpy.bincount(loop_verts, minlength=len(self.mesh.vertices))
+
+    def get_topology(self):
+        if self._topology is None:
+            self._topology = mesh_grid.MeshTopology.from_mesh(self.mesh)
+        return self._topology
+
+
+# Blender 外でのテストやベンチマーク用に、頂点座標と面のリストから作るメッシュ
+class ArrayMesh(MeshAdapter):
+    def __init__(self, coordinates, faces):
+        self.coordinates = numpy.asarray(coordinates, dtype=numpy.float64).reshape(-1, 3)
+
+        # ループ(面の頂点)ごとに、同じ面の次のループを求める
+        lengths = numpy.array([len(face) for face in faces], dtype=numpy.int64)
+        loop_verts = numpy.concatenate([numpy.asarray(face, dtype=numpy.int64) for face in faces])
+        starts = numpy.cumsum(lengths) - lengths
+        loop_faces = numpy.repeat(numpy.arange(len(lengths)), lengths)
+        positions = numpy.arange(len(loop_verts)) - starts[loop_faces]
+        next_loops = starts[loop_faces] + (positions + 1) % lengths[loop_faces]
+
+        pairs = numpy.sort(numpy.stack((loop_verts, loop_verts[next_loops]), axis=1), axis=1)
+        edges, loop_edges = numpy.unique(pairs, axis=0, return_inverse=True)
+
+        self.loop_verts = loop_verts
+        self.loop_faces = loop_faces
+        self.next_loops = next_loops
+        self.topology = mesh_grid.MeshTopology(
+            len(self.coordinates), edges, loop_verts, loop_edges.ravel())
+        self.normals = self.calc_normals()
+
+    # 面の法線(Newell法)を頂点ごとに合計して正規化する
+    def calc_normals(self):
+        co = self.coordinates
+        loop_co = co[self.loop_verts]
+        loop_cross = numpy.cross(loop_co, loop_co[self.next_loops])
+
+        face_normals = numpy.zeros((self.loop_faces.max() + 1 if len(self.loop_faces) else 0, 3))
+        numpy.add.at(face_normals, self.loop_faces, loop_cross)
+        normals = numpy.zeros_like(co)
+        numpy.add.at(normals, self.loop_verts, face_normals[self.loop_faces])
+
+        length = numpy.linalg.norm(normals, axis=1, keepdims=True)
+        return numpy.divide(normals, length, out=numpy.zeros_like(normals), where=length > 0.0)
+
+    def get_coordinates(self):
+        return self.coordinates
+
+    def get_normals(self):
+        return self.normals
+
+    def get_topology(self):
+        return self.topology
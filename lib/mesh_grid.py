@@ -0,0 +1,157 @@
+import numpy
+
+
+# 頂点ごとの面の数だけでメッシュが四角形グリッドになり得るか判定する
+def check_corner_vertices(face_count):
+    if numpy.any((face_count == 0) | (face_count == 3) | (face_count > 4)):
+        return True, "不正な入力メッシュ"
+
+    corner_vertices = [int(i) for i in numpy.flatnonzero(face_count == 1)]
+    if len(corner_vertices) != 4:
+        return True, "カドの頂点が4以外です"
+
+    return None, corner_vertices
+
+
+# メッシュのトポロジを foreach_get で一括取得し、四角形グリッドを線形時間で辿る
+# (bpy.ops や編集モードを使わないので選択状態などに副作用がない)
+class MeshTopology:
+    def __init__(self, num_verts, edges, loop_verts, loop_edges):
+        self.num_verts = num_verts
+        self.edges = edges
+        self.loop_verts = loop_verts
+        self.loop_edges = loop_edges
+
+        self.vert_face_count = numpy.bincount(loop_verts, minlength=num_verts)
+        self.edge_face_count = numpy.bincount(loop_edges, minlength=len(edges))
+        self._adjacency = None
+
+    @classmethod
+    def from_mesh(cls, mesh):
+        num_verts = len(mesh.vertices)
+
+        edges = numpy.empty(len(mesh.edges) * 2, dtype=numpy.int64)
+        mesh.edges.foreach_get("vertices", edges)
+
+        num_loops = len(mesh.loops)
+        loop_verts = numpy.empty(num_loops, dtype=numpy.int64)
+        mesh.loops.foreach_get("vertex_index", loop_verts)
+        loop_edges = numpy.empty(num_loops, dtype=numpy.int64)
+        mesh.loops.foreach_get("edge_index", loop_edges)
+
+        return cls(num_verts, edges.reshape(-1, 2), loop_verts, loop_edges)
+
+    def get_corner_vertices(self):
+        return [int(i) for i in numpy.flatnonzero(self.vert_face_count == 1)]
+
+    # 頂点ごとの隣接頂点 (num_verts, 最大価数) 足りない部分は -1
+    @property
+    def adjacency(self):
+        if self._adjacency is not None:
+            return self._adjacency
+
+        edges = self.edges
+        src = numpy.concatenate((edges[:, 0], edges[:, 1]))
+        dst = numpy.concatenate((edges[:, 1], edges[:, 0]))
+        order = numpy.argsort(src, kind='stable')
+        src = src[order]
+        dst = dst[order]
+
+        counts = numpy.bincount(src, minlength=self.num_verts)
+        starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+        max_degree = int(counts.max()) if len(counts) > 0 else 0
+
+        adjacency = numpy.full((self.num_verts, max_degree), -1, dtype=numpy.int64)
+        adjacency[src, numpy.arange(len(src)) - starts[src]] = dst
+        self._adjacency = adjacency
+
+        return adjacency
+
+    # 境界辺(面が1つだけの辺)上の頂点
+    def get_boundary_vertices(self):
+        return numpy.unique(self.edges[self.edge_face_count == 1])
+
+    # 境界辺(面が1つだけの辺)を一周する頂点のリスト
+    def get_boundary_loop(self, start):
+        boundary = self.edges[self.edge_face_count == 1]
+        neighbors = numpy.full((self.num_verts, 2), -1, dtype=numpy.int64)
+        src = numpy.concatenate((boundary[:, 0], boundary[:, 1]))
+        dst = numpy.concatenate((boundary[:, 1], boundary[:, 0]))
+        order = numpy.argsort(src, kind='stable')
+        src = src[order]
+        dst = dst[order]
+
+        counts = numpy.bincount(src, minlength=self.num_verts)
+        if numpy.any((counts != 0) & (counts != 2)):
+            raise ValueError("境界が単純なループになっていません")
+        starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+        neighbors[src, numpy.arange(len(src)) - starts[src]] = dst
+
+        loop = [start]
+        prev = start
+        current = int(neighbors[start][0])
+        while current != start:
+            loop.append(current)
+            a, b = neighbors[current]
+            prev, current = current, int(b if a == prev else a)
+
+        if len(loop) != len(boundary):
+            raise ValueError("境界が単純なループになっていません")
+
+        return loop
+
+    # カド頂点で区切った4辺を一巡する順に返す
+    # 始点は最小indexのカドで、隣接するカドのうちindexの小さい方へ向かう
+    def get_sides(self, corner_vertices):
+        corners = sorted(corner_vertices)
+        loop = self.get_boundary_loop(corners[0])
+        corner_set = set(corners)
+        positions = [i for i, v in enumerate(loop) if v in corner_set]
+        if len(positions) != 4:
+            raise ValueError("カドの頂点が4以外です")
+
+        if loop[positions[3]] < loop[positions[1]]:
+            loop = loop[:1] + loop[:0:-1]
+            positions = [0] + [len(loop) - p for p in reversed(positions[1:])]
+
+        loop = loop + loop[:1]
+        positions = positions + [len(loop) - 1]
+
+        return [loop[positions[i]:positions[i+1]+1] for i in range(4)]
+
+    def to_array2d(self, corner_vertices, offset=0):
+        sides = self.get_sides(corner_vertices)
+        sides = sides[offset:] + sides[:offset]
+        first = sides[0]
+        last = sides[-1]
+
+        # 四角形を一巡する形になっているため、最初と最後の辺の長さが横幅と高さになる
+        width = len(first)
+        height = len(last)
+        vertices2d = numpy.zeros((width, height), dtype=int)
+        vertices2d[:, 0] = first
+        vertices2d[0, :] = last[::-1]
+
+        # 1列前の頂点から、上下と2列前の頂点を除いた残りの隣接頂点が次の列の頂点になる
+        adjacency = self.adjacency
+        rows = numpy.arange(height - 1)
+        for x in range(1, width):
+            prev = vertices2d[x-1]
+            candidates = adjacency[prev[1:]]
+
+            below = prev[:-1]
+            above = numpy.append(prev[2:], -1)
+            back = vertices2d[x-2][1:] if x >= 2 else numpy.full(height - 1, -1)
+
+            mask = (
+                (candidates != -1) &
+                (candidates != below[:, None]) &
+                (candidates != above[:, None]) &
+                (candidates != back[:, None])
+            )
+            if numpy.any(mask.sum(axis=1) != 1):
+                raise ValueError("四角形のグリッドになっていません")
+
+            vertices2d[x, 1:] = candidates[rows, mask.argmax(axis=1)]
+
+        return vertices2d
@@ -1,7 +1,17 @@
 import bpy
-import bmesh
-import numpy
-from . import lacing_list, library, utils
+import time
+from . import lacing_list, lazy, library, link, preferences, profiling, utils
+
+# 解析と書き込みのモジュールは NumPy や bmesh を読み込むので、オペレータを実行するまで読み込まない
+bake = lazy.module(".bake")
+binding = lazy.module(".binding")
+cache = lazy.module(".cache")
+eyelet = lazy.module(".eyelet")
+live = lazy.module(".live")
+mesh_adapter = lazy.module(".mesh_adapter")
+mesh_grid = lazy.module(".mesh_grid")
+regenerate = lazy.module(".regenerate")
+writeback = lazy.module(".writeback")
 
 
 def check_index(self, value):
@@ -19,12 +29,18 @@ def check_index(self, value):
     return value
 
 
+def report_clearance(operator, obj, fixed, remaining):
+    if fixed > 0:
+        operator.report({'INFO'}, "{}: {} 個の制御点の位置を調整しました".format(obj.name, fixed))
+    if remaining > 0:
+        operator.report({'WARNING'}, "{}: {} 箇所のめり込みを補正できませんでした".format(obj.name, remaining))
+
+
 class OBJECT_OT_TareminShoeLacesCreateCurve(bpy.types.Operator):
     bl_idname = 'taremin.shoelaces_create_curve'
     bl_label = 'カーブの生成'
     bl_options = {'REGISTER', 'UNDO'}
-    lacing_method: bpy.props.EnumProperty(name="結び方", items=lambda scene, context: [(
-        class_name, lacing_list.ShoeLacingMethods[class_name].label, "") for i, class_name in enumerate(lacing_list.ShoeLacingMethods)])
+    lacing_method: bpy.props.EnumProperty(name="結び方", items=lacing_list.get_enum_items)
 
     # --------------------------------------------------------------------------
 
@@ -71,9 +87,98 @@ class OBJECT_OT_TareminShoeLacesCreateCurve(bpy.types.Operator):
         default=True,
     )
 
-    knot_type: bpy.props.EnumProperty(name="結び目のタイプ", items=[
-        (str(i), asset[0], "") for i, asset in enumerate(library.knots)
-    ])
+    is_create_hole_mesh: bpy.props.BoolProperty(
+        name="穴あけ用のメッシュを生成",
+        description="紐を通す穴ごとの円柱をまとめた、Booleanモディファイアでそのまま使える閉じたメッシュを生成します",
+        default=False,
+    )
+    hole_mesh_segments: bpy.props.IntProperty(
+        name="穴あけ用のメッシュの分割数",
+        description="円柱の周方向の分割数",
+        default=8,
+        min=3,
+        max=64,
+    )
+
+    is_create_tube_mesh: bpy.props.BoolProperty(
+        name="チューブのメッシュを生成",
+        description="カーブに沿って、ベベル深度を半径とするチューブのメッシュを生成します",
+        default=False,
+    )
+    tube_resolution: bpy.props.IntProperty(
+        name="チューブの解像度",
+        description="制御点の間の分割数",
+        default=12,
+        min=1,
+        max=64,
+    )
+    tube_profile_segments: bpy.props.IntProperty(
+        name="チューブの断面の分割数",
+        default=8,
+        min=3,
+        max=64,
+    )
+    tube_profile_ratio: bpy.props.FloatProperty(
+        name="チューブの断面の縦横比",
+        description="1.0 で円形、小さくすると平たい紐になります",
+        default=1.0,
+        min=0.01,
+        max=1.0,
+    )
+
+    use_adaptive_resolution: bpy.props.BoolProperty(
+        name="曲がり具合に応じて分割する",
+        description="チューブのメッシュの分割数を、制御点の間の曲がり具合から割り当てます。直線に近い区間は少なく、結び目などの曲がった区間は多く分割します (カーブオブジェクトの分割数は変わりません)",
+        default=False,
+    )
+    tube_segment_budget: bpy.props.IntProperty(
+        name="分割数の予算",
+        description="カーブ全体の分割数 (0 の場合は 制御点の間の数 x チューブの解像度)",
+        default=0,
+        min=0,
+    )
+    lod_levels: bpy.props.IntProperty(
+        name="LODの数",
+        description="分割数を減らしたチューブのメッシュを追加で生成します",
+        default=1,
+        min=1,
+        max=8,
+    )
+    lod_ratio: bpy.props.FloatProperty(
+        name="LODの分割数の比率",
+        description="LOD のレベルが1つ上がるごとの分割数の比率",
+        default=0.5,
+        min=0.05,
+        max=1.0,
+    )
+
+    use_clearance_check: bpy.props.BoolProperty(
+        name="めり込みを補正する",
+        description="紐がメッシュにめり込んでいたり紐同士がぶつかっている部分の制御点をずらします",
+        default=False,
+    )
+
+    clearance_margin: bpy.props.FloatProperty(
+        name="補正の余白",
+        description="紐の太さに加えて、メッシュや他の紐から離す距離",
+        default=0.0,
+        min=0.0,
+        subtype="DISTANCE",
+    )
+
+    use_live_follow: bpy.props.BoolProperty(
+        name="メッシュの変更に追従する",
+        description="生成したカーブを元のメッシュに関連付け、メッシュを編集したときに自動で更新します",
+        default=False,
+    )
+
+    use_selected_objects: bpy.props.BoolProperty(
+        name="選択中のオブジェクトすべてに生成",
+        description="選択中のメッシュそれぞれにカーブを生成します。失敗したオブジェクトは報告して処理を続けます",
+        default=False,
+    )
+
+    knot_type: bpy.props.EnumProperty(name="結び目のタイプ", items=library.get_enum_items)
 
     is_reverse_knot: bpy.props.BoolProperty(
         name="結び目の前後を反転する",
@@ -132,293 +237,246 @@ class OBJECT_OT_TareminShoeLacesCreateCurve(bpy.types.Operator):
     # --------------------------------------------------------------------------
 
     @classmethod
-    def get_corner_vertices(cls, bm):
-        corner_vertices = []
-
-        for v in bm.verts:
-            num_link_faces = len(v.link_faces)
-            if num_link_faces == 1:
-                corner_vertices.append(v.index)
-            if num_link_faces == 0 or num_link_faces == 3 or num_link_faces > 4:
-                return True, "不正な入力メッシュ"
-
-        return None, corner_vertices
-
-    # カド頂点からカド頂点への辺を取得
-    @classmethod
-    def get_corner_to_corner_edges(cls, bm, corner_vertices):
-        corner_to_corner_edges = []
-
-        for from_index in range(len(corner_vertices)):
-            edge_from = corner_vertices[from_index]
-            for i in range(1, 4-from_index):
-                to_index = (from_index + i) % 4
-                edge_to = corner_vertices[to_index]
-
-                bpy.ops.mesh.select_all(action='DESELECT')
-                bm.verts[edge_from].select = True
-                bm.verts[edge_to].select = True
-                bpy.ops.mesh.shortest_path_select()
-
-                edges = [e for e in bm.edges if e.select]
-
-                # 距離が1の場合、shortest_path_selectで選択が解除されてしまうため別の方法で辺を取得する
-                if len(edges) == 0:
-                    v1 = bm.verts[edge_from]
-                    v2 = bm.verts[edge_to]
-                    edges = [
-                        e for e in bm.edges if v1 in e.verts and v2 in e.verts]
-
-                corner_to_corner_edges.append(
-                    (edge_from, edge_to, edges))
-
-        # 対角線を削除(対角線は辺の数が 横+高さ なので辺の多いものを2つ削除すれば良い)
-        corner_to_corner_edges.sort(key=lambda tuple: len(tuple[2]))
-        corner_to_corner_edges.pop()
-        corner_to_corner_edges.pop()
-
-        # from_index, to_index のソート
-        corner_to_corner_edges.sort(key=lambda tuple: tuple[1])
-        corner_to_corner_edges.sort(key=lambda tuple: tuple[0])
-
-        return corner_to_corner_edges
-
-    @classmethod
-    def edges_to_sorted_vertices(cls, bm, from_idx, to_idx, edges):
-        visited = {}
-
-        next = from_idx
-        visited[from_idx] = True
-        verts = [bm.verts[from_idx]]
-
-        while next != to_idx:
-            vert = bm.verts[next]
-            link_edges = vert.link_edges
-            next_edge = None
-            if len(link_edges) == 1:
-                next_edge = link_edges[0]
-            else:
-                for edge in link_edges:
-                    other_vert = edge.other_vert(vert)
-                    if other_vert.index in visited:
-                        continue
-                    if edge in edges:
-                        next_edge = edge
-                        break
-            visited[vert.index] = True
-            verts.append(next_edge.other_vert(vert))
-            next = next_edge.other_vert(vert).index
-
-        return verts
-
-    def fill_verts(self, visited, v1, v2):
-        for e1 in v1.link_edges:
-            o1 = e1.other_vert(v1).index
-            for e2 in v2.link_edges:
-                o2 = e2.other_vert(v2).index
-                if o1 == o2 and o1 not in visited:
-                    visited[o1] = True
-                    return o1
-        return None
-
-    def convert_coordinate(self, src_obj, dst_obj, vector):
-        return (dst_obj.matrix_world.inverted() @ (src_obj.matrix_world @ vector))
-
-    def mesh_to_array2d(self, context, obj, corner_vertices):
-        context.view_layer.objects.active = obj
-
-        offset = self.offset
-
-        bpy.ops.object.mode_set(mode='EDIT', toggle=False)
-        bpy.ops.mesh.select_mode(type='VERT')
-        bm = bmesh.from_edit_mesh(obj.data)
-        bm.verts.ensure_lookup_table()
-
-        corner_to_corner_edges = type(self).get_corner_to_corner_edges(
-            bm, corner_vertices)
-
-        # カド(始点)からカド(終点)と経路となる辺の辞書を作成する
-        # このとき同じ始点から開始する場合は始点と終点を入れ替え、一巡するような形にする
-        corner_to_corner_with_route = {}
-        for from_index, to_index, edges in corner_to_corner_edges:
-            if from_index in corner_to_corner_with_route:
-                # from, to 双方使用済みだった場合はすでに辞書に登録済みの方がおかしいので修正
-                if to_index in corner_to_corner_with_route:
-                    for index1, index2 in ((from_index, to_index), (to_index, from_index)):
-                        tmp_index, tmp_edges = corner_to_corner_with_route[index1]
-                        if tmp_index not in corner_to_corner_with_route:
-                            corner_to_corner_with_route[tmp_index] = (
-                                index1, tmp_edges)
-                            corner_to_corner_with_route[index1] = (
-                                index2, edges)
-                            break
-                else:
-                    corner_to_corner_with_route[to_index] = (from_index, edges)
-            else:
-                corner_to_corner_with_route[from_index] = (to_index, edges)
-
-        # 辺のリストから始点から終点までの頂点のリストにする
-        start, next, _ = corner_to_corner_edges[0]
-        edges_tmp = []
-        current = start
-
-        while True:
-            to_index, edges = corner_to_corner_with_route[current]
-            edges_tmp.append(type(self).edges_to_sorted_vertices(
-                bm, current, to_index, edges))
-
-            # update loop
-            current = next
-            next, _ = corner_to_corner_with_route[next]
-            if current == start:
-                break
-
-        edges_tmp = edges_tmp[offset:] + edges_tmp[:offset]
-        first = edges_tmp[0]
-        last = edges_tmp[len(edges_tmp)-1]
-
-        # 四角形を一巡する形になっているため、最初と最後の辺の長さが横幅と高さになる
-        width = len(first)
-        height = len(last)
-        vertices2d = numpy.zeros((width, height), dtype=int)
-        visited = {}
-        for from_index, v in enumerate(first):
-            vertices2d[from_index][0] = v.index
-            visited[v.index] = True
-        for from_index, v in enumerate(reversed(last)):
-            vertices2d[0][from_index] = v.index
-            visited[v.index] = True
-
-        for x in range(1, width):
-            for y in range(1, height):
-                vertices2d[x][y] = self.fill_verts(
-                    visited, bm.verts[vertices2d[x-1][y]], bm.verts[vertices2d[x][y-1]])
-
-        return vertices2d
-
-    @classmethod
-    def check_mesh_geometry(cls, obj):
-        result = []
-
+    def check_object(cls, obj):
         if obj is None:
             return True, "アクティブオブジェクトがありません"
 
         if obj.type != 'MESH':
             return True, "アクティブオブジェクトがメッシュではありません"
 
-        if bpy.context.object.mode != 'OBJECT':
+        if obj.mode != 'OBJECT':
             return True, "オブジェクトモードではありません"
 
-        bm = bmesh.new()
-        bm.from_mesh(obj.data)
-        bm.verts.ensure_lookup_table()
-        err, result = cls.get_corner_vertices(bm)
-
-        if err:
-            return True, result
+        return None, None
 
-        corner_vertices = result
-
-        if corner_vertices is None:
-            return True, "カドになる頂点が見つかりません"
+    @classmethod
+    def check_mesh_geometry(cls, obj):
+        err, result = cls.check_object(obj)
+        if err is not None:
+            return err, result
 
-        if len(corner_vertices) != 4:
-            return True, "カドの頂点が4以外です"
+        key = cache.get_validation_key(obj.data)
+        result = cache.validation_cache.get(key)
+        if result is None:
+            mesh = mesh_adapter.BlenderMeshAdapter(obj.data)
+            result = mesh_grid.check_corner_vertices(mesh.get_vertex_face_count())
+            cache.validation_cache.set(key, result)
 
-        return None, corner_vertices
+        return result
 
-    def copy_object(self, base_obj):
-        copy_obj = base_obj.copy()
-        copy_obj.data = base_obj.data.copy()
-        bpy.context.scene.collection.objects.link(copy_obj)
-        bpy.context.view_layer.objects.active = copy_obj
-        return copy_obj
+    # パネルの描画と poll 用
+    # メッシュの形状の確認は NumPy を読み込むので、キャッシュのモジュール (NumPy を読み込む) が
+    # 読み込まれるまではオブジェクトの種類とモードだけを確認し、その後はキャッシュした確認結果を使う
+    @classmethod
+    def check_mesh_geometry_if_loaded(cls, obj):
+        if not lazy.is_loaded(".cache"):
+            return cls.check_object(obj)
+        return cls.check_mesh_geometry(obj)
 
-    def restore_status(self, active_object, mode, remove_objects=[]):
+    def restore_status(self, active_object, mode):
         bpy.context.view_layer.objects.active = active_object
-        bpy.ops.object.mode_set(mode=mode, toggle=False)
-
-        for obj in remove_objects:
-            bpy.data.objects.remove(obj, do_unlink=True)
+        if active_object is not None:
+            bpy.ops.object.mode_set(mode=mode, toggle=False)
 
     @classmethod
     def poll(cls, context):
-        err, result = cls.check_mesh_geometry(context.active_object)
-        return not err
+        err, result = cls.check_mesh_geometry_if_loaded(context.active_object)
+        if err is None:
+            return True
+
+        return any(
+            cls.check_mesh_geometry_if_loaded(obj)[0] is None
+            for obj in context.selected_objects if obj.type == 'MESH'
+        )
+
+    # 生成の途中で例外が発生した場合は、作成したオブジェクトを削除してオブジェクトモードと
+    # アクティブオブジェクトを戻してから例外を投げ直す (複数のメッシュに生成する場合は次のメッシュの処理を続ける)
+    def generate(self, context, base_obj):
+        created_objects = []
+        try:
+            return self.build_curves(context, base_obj, created_objects)
+        except Exception:
+            self.discard_objects(context, base_obj, created_objects)
+            raise
+
+    def discard_objects(self, context, base_obj, objects):
+        active_object = context.view_layer.objects.active
+        if active_object is not None and active_object.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
 
-    def execute(self, context):
-        base_obj = bpy.context.active_object
-        current_mode = bpy.context.object.mode
+        blend_data = context.blend_data
+        for obj in objects:
+            data = obj.data
+            blend_data.objects.remove(obj, do_unlink=True)
+            if isinstance(data, bpy.types.Curve) and data.users == 0:
+                blend_data.curves.remove(data)
+            elif isinstance(data, bpy.types.Mesh) and data.users == 0:
+                blend_data.meshes.remove(data)
+        link.invalidate_live_index()
+
+        context.view_layer.objects.active = base_obj
+
+    def build_curves(self, context, base_obj, created_objects):
         bevel_depth = self.bevel_depth
+        profiler = profiling.profiler
 
-        err, result = type(self).check_mesh_geometry(base_obj)
+        with profiler.measure("validation"):
+            err, result = type(self).check_mesh_geometry(base_obj)
         if err is not None:
-            self.report({'ERROR_INVALID_INPUT'}, result)
-            self.restore_status(base_obj, current_mode)
-            return {'CANCELLED'}
+            return err, result
         corner_vertices = result
 
-        copy_obj = self.copy_object(base_obj)
-        vertices2d = self.mesh_to_array2d(context, copy_obj, corner_vertices)
+        # 結果がメッシュと offset のみに依存する解析はキャッシュしておき、
+        # リドゥパネルでのパラメータ変更時には解析を省略する
+        mesh = mesh_adapter.BlenderMeshAdapter(base_obj.data)
+        with profiler.measure("topology"):
+            vertices2d, cross_lines = regenerate.get_grid(
+                base_obj, mesh, corner_vertices, self.offset, self.lacing_method)
 
-        bpy.ops.curve.primitive_bezier_circle_add(enter_editmode=True)
+        with profiler.measure("curve_create"):
+            bpy.ops.curve.primitive_bezier_circle_add(enter_editmode=True)
         curve = bpy.context.active_object
+        created_objects.append(curve)
+        link.store_link(curve, base_obj, self, self.use_live_follow)
+
+        with profiler.measure("knot_load"):
+            knot = library.get_knot(context, self)
+
+        # 解析は元のメッシュを読み取るだけで、一時オブジェクトやモード変更は行わない
+        with profiler.measure("lacing"):
+            curve_generator = lacing_list.ShoeLacingMethods[self.lacing_method](
+                mesh, vertices2d, self, cross_lines, knot)
+            local_arrays, cyclic = curve_generator.create_curve_points()
+
+        if self.use_clearance_check:
+            with profiler.measure("clearance"):
+                local_arrays, fixed, remaining = regenerate.fix_clearance(
+                    base_obj, local_arrays, cyclic, self)
+            report_clearance(self, base_obj, fixed, remaining)
+
+        with profiler.measure("writeback"):
+            s = curve.data.splines[0]
+            s.use_cyclic_u = cyclic
 
-        curve_generator = lacing_list.ShoeLacingMethods[self.lacing_method](
-            copy_obj, vertices2d, self)
-        points, cyclic = curve_generator.create_curve_points(context)
-
-        s = curve.data.splines[0]
-        s.use_cyclic_u = cyclic
-
-        bp = s.bezier_points
-        bp.add(len(points) - len(bp))
-
-        for i in range(len(points)):
-            p = points[i]
-            b = bp[i]
-
-            if isinstance(p, bpy.types.BezierSplinePoint):
-                b.co = self.convert_coordinate(copy_obj, curve, p.co)
-                b.handle_left = p.handle_left
-                b.handle_right = p.handle_right
-                b.handle_left_type = 'AUTO'
-                b.handle_right_type = 'AUTO'
-            else:
-                b.co = self.convert_coordinate(copy_obj, curve, p['co'])
-                b.handle_left_type = 'FREE'
-                b.handle_right_type = 'FREE'
-                b.handle_left = self.convert_coordinate(
-                    copy_obj, curve, p['handle_left'])
-                b.handle_right = self.convert_coordinate(
-                    copy_obj, curve, p['handle_right'])
-                b.handle_left_type = 'ALIGNED'
-                b.handle_right_type = 'ALIGNED'
+            bp = s.bezier_points
+            bp.add(len(local_arrays) - len(bp))
+
+            arrays = writeback.transform_arrays(
+                local_arrays, writeback.get_transform(base_obj, curve))
+            writeback.write_bezier_points(s, arrays)
 
         bpy.context.view_layer.objects.active = curve
         bpy.ops.curve.select_all(action='DESELECT')
         curve.data.bevel_depth = bevel_depth
 
         if self.is_create_hole_curve:
-            bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-            bpy.ops.curve.primitive_bezier_curve_add(enter_editmode=True)
-            hole_curve_obj = bpy.context.active_object
-            hole_curves = hole_curve_obj.data
-            hole_splines = hole_curves.splines
-            hole_splines.clear()
-            for i in range(len(points)):
-                p = points[i]
-                if isinstance(p, bpy.types.BezierSplinePoint) or p['type'] != 'SIDE':
-                    continue
-                s = hole_splines.new(type='POLY')
-                s.points.add(2 - len(s.points))
-                s.points[0].co = self.convert_coordinate(
-                    copy_obj, hole_curve_obj, p['handle_left']).to_4d()
-                s.points[1].co = self.convert_coordinate(
-                    copy_obj, hole_curve_obj, p['handle_right']).to_4d()
-            hole_curves.bevel_depth = bevel_depth
-
-        self.restore_status(base_obj, current_mode, [copy_obj])
+            with profiler.measure("hole_curve"):
+                bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+                bpy.ops.curve.primitive_bezier_curve_add(enter_editmode=True)
+                hole_curve_obj = bpy.context.active_object
+                created_objects.append(hole_curve_obj)
+                link.store_hole_curve(curve, hole_curve_obj)
+                hole_curves = hole_curve_obj.data
+                hole_splines = hole_curves.splines
+                hole_splines.clear()
+                hole_arrays = writeback.transform_arrays(
+                    local_arrays, writeback.get_transform(base_obj, hole_curve_obj))
+                writeback.write_hole_splines(
+                    hole_splines, *writeback.get_side_handles(hole_arrays))
+                hole_curves.bevel_depth = bevel_depth
+
+        if self.is_create_hole_mesh:
+            with profiler.measure("hole_mesh"):
+                hole_mesh_obj = regenerate.create_hole_mesh_object(
+                    context, base_obj, local_arrays, self)
+            created_objects.append(hole_mesh_obj)
+            link.store_hole_mesh(curve, hole_mesh_obj)
+
+        bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+
+        if self.is_create_tube_mesh:
+            # 解析結果と制御点は共通で、LOD ごとに分割数だけ変えて掃引する
+            with profiler.measure("tube_mesh"):
+                tube_objects = [
+                    regenerate.create_tube_object(context, curve, self, level)
+                    for level in range(self.lod_levels)
+                ]
+            created_objects.extend(tube_objects)
+            link.store_tube_meshes(curve, tube_objects)
+
+        return None, created_objects
+
+    def execute(self, context):
+        profiler = profiling.profiler
+        profiler.enabled = preferences.is_profiling_enabled(context)
+        profiler.begin()
+        try:
+            result = self.generate_curves(context)
+        finally:
+            report = profiler.end(
+                operator=self.bl_idname,
+                lacing_method=self.lacing_method,
+                blender=bpy.app.version_string)
+
+        if report is not None:
+            for line in profiling.format_report(report):
+                self.report({'INFO'}, line)
+            output = preferences.get_profile_output(context)
+            if output != "":
+                try:
+                    profiling.append_json(report, output)
+                except OSError as e:
+                    self.report({'WARNING'}, "計測結果を書き出せません: {}".format(e))
+
+        return result
+
+    def generate_curves(self, context):
+        base_obj = bpy.context.active_object
+        current_mode = bpy.context.object.mode if base_obj is not None else 'OBJECT'
+
+        if not self.use_selected_objects:
+            err, result = self.generate(context, base_obj)
+            if err is not None:
+                self.report({'ERROR_INVALID_INPUT'}, result)
+                self.restore_status(base_obj, current_mode)
+                return {'CANCELLED'}
+
+            self.restore_status(base_obj, current_mode)
+            return {'FINISHED'}
+
+        # 選択中のメッシュすべてに生成する(1回のオペレータ実行なのでUndoも1回で戻る)
+        # 生成中に選択が変わるため、対象は最初に確定しておく
+        targets = [obj for obj in context.selected_objects if obj.type == 'MESH']
+        if base_obj in targets:
+            targets.remove(base_obj)
+            targets.insert(0, base_obj)
+
+        timings = []
+        failures = 0
+        total_start = time.perf_counter()
+        for obj in targets:
+            start = time.perf_counter()
+            try:
+                err, result = self.generate(context, obj)
+            except Exception as e:
+                err, result = True, str(e)
+            elapsed = time.perf_counter() - start
+
+            if err is not None:
+                failures += 1
+                self.report({'WARNING'}, "{}: {}".format(obj.name, result))
+            timings.append((obj.name, elapsed, err is None))
+
+        self.restore_status(base_obj, current_mode)
+
+        for name, elapsed, succeeded in timings:
+            self.report({'INFO'}, "{}: {:.3f}秒{}".format(
+                name, elapsed, "" if succeeded else " (失敗)"))
+        self.report({'INFO'}, "{}/{} オブジェクトに生成しました ({:.3f}秒)".format(
+            len(targets) - failures, len(targets), time.perf_counter() - total_start))
+
+        if failures == len(targets):
+            return {'CANCELLED'}
 
         return {'FINISHED'}
 
@@ -434,10 +492,29 @@ class OBJECT_OT_TareminShoeLacesCreateCurve(bpy.types.Operator):
         box.prop(self, "side_handle_length")
         box.prop(self, "use_center_offset")
         box.prop(self, "is_create_hole_curve")
+        box.prop(self, "is_create_hole_mesh")
+        if self.is_create_hole_mesh:
+            box.prop(self, "hole_mesh_segments")
+        box.prop(self, "is_create_tube_mesh")
+        if self.is_create_tube_mesh:
+            box.prop(self, "tube_resolution")
+            box.prop(self, "tube_profile_segments")
+            box.prop(self, "tube_profile_ratio")
+            box.prop(self, "lod_levels")
+            if self.lod_levels > 1:
+                box.prop(self, "lod_ratio")
+            box.prop(self, "use_adaptive_resolution")
+            if self.use_adaptive_resolution or self.lod_levels > 1:
+                box.prop(self, "tube_segment_budget")
+        box.prop(self, "use_clearance_check")
+        if self.use_clearance_check:
+            box.prop(self, "clearance_margin")
+        box.prop(self, "use_live_follow")
+        box.prop(self, "use_selected_objects")
 
         box = layout.box()
         box.prop(self, "knot_type")
-        knot = library.knots[int(self.knot_type)]
+        knot = library.get_asset(self.knot_type)
         knots = utils.get_knot_list(context.scene, context)
         if knot[1] == "" and len(knots) > 0:
             box.prop(self, "knot")
@@ -447,3 +524,319 @@ class OBJECT_OT_TareminShoeLacesCreateCurve(bpy.types.Operator):
             box.prop(self, "spline_index_right")
         if knot[1] is not None:
             box.prop(self, "is_reverse_knot")
+
+
+# 関連付けられたカーブオブジェクトに、保存した設定で制御点を書き込み直す
+# (新しいオブジェクトを作らないので、モディファイアやマテリアルはそのまま残る)
+class OBJECT_OT_TareminShoeLacesRegenerate(bpy.types.Operator):
+    bl_idname = 'taremin.shoelaces_regenerate'
+    bl_label = 'カーブの再生成'
+    bl_description = '元のメッシュから、既存のカーブと穴あけ用のカーブを書き換えます'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT' and link.get_lace_curve(context.active_object) is not None
+
+    def execute(self, context):
+        curve = link.get_lace_curve(context.active_object)
+        source = link.get_source(curve)
+        settings = link.get_settings(curve)
+
+        # 元のメッシュが削除されている場合
+        if source is None:
+            self.report({'ERROR_INVALID_INPUT'}, "{}: 元のメッシュがありません".format(curve.name))
+            return {'CANCELLED'}
+
+        err, result = OBJECT_OT_TareminShoeLacesCreateCurve.check_mesh_geometry(source)
+        if err is not None:
+            self.report({'ERROR_INVALID_INPUT'}, "{}: {}".format(source.name, result))
+            return {'CANCELLED'}
+
+        mesh = mesh_adapter.BlenderMeshAdapter(source.data)
+        vertices2d, cross_lines = regenerate.get_grid(
+            source, mesh, result, settings.offset, settings.lacing_method)
+        local_arrays, cyclic = regenerate.calc_point_arrays(
+            context, mesh, vertices2d, settings, cross_lines)
+        if settings.use_clearance_check:
+            local_arrays, fixed, remaining = regenerate.fix_clearance(
+                source, local_arrays, cyclic, settings)
+            report_clearance(self, source, fixed, remaining)
+
+        regenerate.write_lace_curve(source, curve, local_arrays, cyclic, settings.bevel_depth)
+
+        hole_curve = link.get_hole_curve(curve)
+        if hole_curve is not None and hole_curve.type == 'CURVE':
+            regenerate.write_hole_curve(source, hole_curve, local_arrays, settings.bevel_depth)
+
+        hole_mesh_obj = link.get_hole_mesh(curve)
+        if hole_mesh_obj is not None and hole_mesh_obj.type == 'MESH':
+            regenerate.write_hole_mesh(context, source, hole_mesh_obj, local_arrays, settings)
+
+        for level, tube_obj in link.get_tube_meshes(curve):
+            regenerate.write_tube_mesh(context, curve, tube_obj, settings, level)
+
+        # 結び付けや焼き込んだキャッシュファイルは再生成前のカーブのものなので解除する
+        if link.is_frame_driven(curve):
+            link.set_binding(curve, None)
+            link.set_bake_cache(curve, None)
+            self.report({'INFO'}, "{}: 変形への結び付けと焼き込みを解除しました".format(curve.name))
+
+        return {'FINISHED'}
+
+
+# 穴の位置のグリッドの頂点に、Boolean を使わずに穴を開ける
+# 選択中の他のオブジェクト(グリッドのメッシュか生成したカーブ)の穴の位置で、アクティブなメッシュに穴を開ける
+class OBJECT_OT_TareminShoeLacesPunchEyelets(bpy.types.Operator):
+    bl_idname = 'taremin.shoelaces_punch_eyelets'
+    bl_label = '紐を通す穴を開ける'
+    bl_description = '紐を通す穴の位置の頂点を中心に、アクティブなメッシュへ直接穴を開けます'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    radius: bpy.props.FloatProperty(
+        name="穴の半径",
+        default=0.01,
+        min=0.0,
+        subtype='DISTANCE',
+    )
+    rings: bpy.props.IntProperty(
+        name="穴の周りの輪の数",
+        description="穴の縁を含めた、穴を囲む辺のループの数",
+        default=1,
+        min=1,
+        max=8,
+    )
+    segments: bpy.props.IntProperty(
+        name="穴の分割数",
+        description="穴の縁の、元の辺ごとの分割数",
+        default=2,
+        min=1,
+        max=16,
+    )
+    offset: bpy.props.IntProperty(
+        name="方向オフセット",
+        description="穴の位置を決めるグリッドの向き (生成したカーブを選択している場合はその設定を使います)",
+        default=0,
+        min=0,
+        max=3,
+    )
+    lacing_method: bpy.props.EnumProperty(
+        name="結び方",
+        description="穴の位置を決める結び方 (生成したカーブを選択している場合はその設定を使います)",
+        items=lacing_list.get_enum_items,
+    )
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.active_object
+        return obj is not None and obj.type == 'MESH' and obj.mode == 'OBJECT'
+
+    def execute(self, context):
+        target = context.active_object
+        source, offset, lacing_method = eyelet.find_eyelet_source(
+            context, target, self.offset, self.lacing_method)
+        # 選択中のカーブの元のメッシュが削除されている場合
+        if source is None:
+            self.report({'ERROR_INVALID_INPUT'}, "穴の位置を決める元のメッシュがありません")
+            return {'CANCELLED'}
+
+        err, result = OBJECT_OT_TareminShoeLacesCreateCurve.check_mesh_geometry(source)
+        if err is not None:
+            self.report({'ERROR_INVALID_INPUT'}, "{}: {}".format(source.name, result))
+            return {'CANCELLED'}
+
+        mesh = mesh_adapter.BlenderMeshAdapter(source.data)
+        vertices2d = mesh.get_topology().to_array2d(result, offset)
+        pattern = lacing_list.ShoeLacingMethods[lacing_method].get_compiled_pattern(*vertices2d.shape)
+        indices = eyelet.get_eyelet_vertices(vertices2d, pattern)
+
+        missing = 0
+        if source != target:
+            indices, missing = eyelet.map_vertices(source, target, indices, self.radius)
+            if missing > 0:
+                self.report({'WARNING'}, "{} 個の穴の位置に {} の頂点がありません".format(missing, target.name))
+        if len(indices) == 0:
+            self.report({'ERROR_INVALID_INPUT'}, "穴を開ける頂点がありません")
+            return {'CANCELLED'}
+
+        boundary = eyelet.get_boundary_eyelets(target, indices)
+        if len(boundary) > 0:
+            self.report(
+                {'ERROR_INVALID_INPUT'},
+                "{}: {} 個の穴の位置がメッシュの境界にあり、穴ではなく切り欠きになります"
+                " (グリッドのメッシュか生成したカーブを一緒に選択して、靴のメッシュに穴を開けてください)".format(
+                    target.name, len(boundary)))
+            return {'CANCELLED'}
+
+        eyelet.punch_eyelets(target.data, indices, self.radius, self.rings, self.segments)
+        self.report({'INFO'}, "{} 個の穴を開けました".format(len(indices)))
+
+        return {'FINISHED'}
+
+
+class OBJECT_OT_TareminShoeLacesToggleLive(bpy.types.Operator):
+    bl_idname = 'taremin.shoelaces_toggle_live'
+    bl_label = 'メッシュへの追従を切り替え'
+    bl_description = 'アクティブなカーブを元のメッシュの変更に追従させるか切り替えます'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return link.is_linked(context.active_object)
+
+    def execute(self, context):
+        curve = context.active_object
+        is_live = not link.is_live(curve)
+        link.set_live(curve, is_live)
+
+        if is_live:
+            # 焼き込んだキャッシュファイルや結び付けはフレームの変更ごとにカーブを上書きするので解除する
+            link.set_bake_cache(curve, None)
+            link.set_binding(curve, None)
+            written = live.update_curve(context, curve)
+            if written is None:
+                self.report({'WARNING'}, "元のメッシュからカーブを更新できません")
+
+        return {'FINISHED'}
+
+
+# 現在のカーブの形を元のメッシュのグリッドに結び付け、再生時に変形に合わせて動かす
+# (再生時は評価後のメッシュの頂点座標だけを読み取り、グリッドの解析や制御点の計算はしない)
+class OBJECT_OT_TareminShoeLacesToggleBinding(bpy.types.Operator):
+    bl_idname = 'taremin.shoelaces_toggle_binding'
+    bl_label = 'メッシュの変形への結び付けを切り替え'
+    bl_description = 'アクティブなカーブを現在のフレームの元のメッシュに結び付け、アニメーションの変形に合わせて動かすか切り替えます'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT' and link.is_linked(context.active_object)
+
+    def execute(self, context):
+        curve = context.active_object
+        if link.get_binding(curve) is not None:
+            link.set_binding(curve, None)
+            return {'FINISHED'}
+
+        source = link.get_source(curve)
+        if source is None:
+            self.report({'ERROR_INVALID_INPUT'}, "{}: 元のメッシュがありません".format(curve.name))
+            return {'CANCELLED'}
+        if curve.type != 'CURVE' or len(curve.data.splines) == 0:
+            self.report({'ERROR_INVALID_INPUT'}, "{}: カーブがありません".format(curve.name))
+            return {'CANCELLED'}
+
+        settings = link.get_settings(curve)
+        err, result = OBJECT_OT_TareminShoeLacesCreateCurve.check_mesh_geometry(source)
+        if err is not None:
+            self.report({'ERROR_INVALID_INPUT'}, "{}: {}".format(source.name, result))
+            return {'CANCELLED'}
+
+        mesh = mesh_adapter.BlenderMeshAdapter(source.data)
+        vertices2d, _ = regenerate.get_grid(
+            source, mesh, result, settings.offset, settings.lacing_method)
+
+        err, result = binding.bind_curve(context, curve, vertices2d)
+        if err is not None:
+            self.report({'ERROR'}, "{}: {}".format(source.name, result))
+            return {'CANCELLED'}
+
+        # 追従や焼き込んだキャッシュファイルは結び付けたカーブを上書きするので止める
+        if link.is_live(curve):
+            link.set_live(curve, False)
+        link.set_bake_cache(curve, None)
+        self.report({'INFO'}, "{} 個の制御点を結び付けました".format(result))
+
+        return {'FINISHED'}
+
+
+# 変形する元のメッシュに合わせて、フレームごとのカーブをシェイプキーかキャッシュファイルに焼き込む
+# (グリッドの解析は1回だけ行い、フレームごとには評価後のメッシュの座標と法線だけを読み取る)
+class OBJECT_OT_TareminShoeLacesBake(bpy.types.Operator):
+    bl_idname = 'taremin.shoelaces_bake'
+    bl_label = 'アニメーションの焼き込み'
+    bl_description = '元のメッシュの変形に合わせたカーブを、フレームごとにシェイプキーかキャッシュファイルに焼き込みます'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    frame_start: bpy.props.IntProperty(name="開始フレーム", default=1)
+    frame_end: bpy.props.IntProperty(name="終了フレーム", default=250)
+    bake_target: bpy.props.EnumProperty(name="焼き込み先", items=[
+        ('CACHE_FILE', "キャッシュファイル", "フレームごとの制御点をファイルに保存し、フレームの変更時にカーブへ書き込みます (推奨)"),
+        ('SHAPE_KEYS', "シェイプキー", "カーブのシェイプキーを作り直し、フレームごとのキーにキーフレームを打ちます (短い範囲向け)"),
+    ])
+    filepath: bpy.props.StringProperty(
+        name="キャッシュファイル",
+        description="空の場合はカーブの名前から決めます",
+        default="",
+        subtype="FILE_PATH",
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return context.mode == 'OBJECT' and link.get_lace_curve(context.active_object) is not None
+
+    def invoke(self, context, event):
+        self.frame_start = context.scene.frame_start
+        self.frame_end = context.scene.frame_end
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        start_time = time.perf_counter()
+        curve = link.get_lace_curve(context.active_object)
+        source = link.get_source(curve)
+        settings = link.get_settings(curve)
+
+        if source is None:
+            self.report({'ERROR_INVALID_INPUT'}, "{}: 元のメッシュがありません".format(curve.name))
+            return {'CANCELLED'}
+        if self.frame_end < self.frame_start:
+            self.report({'ERROR_INVALID_INPUT'}, "終了フレームが開始フレームより前です")
+            return {'CANCELLED'}
+        num_frames = self.frame_end - self.frame_start + 1
+        if self.bake_target == 'SHAPE_KEYS' and num_frames > bake.SHAPE_KEY_MAX_FRAMES:
+            self.report(
+                {'ERROR_INVALID_INPUT'},
+                "シェイプキーに焼き込めるのは {} フレームまでです ({} フレーム)。キャッシュファイルに焼き込んでください".format(
+                    bake.SHAPE_KEY_MAX_FRAMES, num_frames))
+            return {'CANCELLED'}
+
+        err, result = OBJECT_OT_TareminShoeLacesCreateCurve.check_mesh_geometry(source)
+        if err is not None:
+            self.report({'ERROR_INVALID_INPUT'}, "{}: {}".format(source.name, result))
+            return {'CANCELLED'}
+
+        # グリッドは変形前のメッシュで解析する (変形しても頂点の番号は変わらない)
+        mesh = mesh_adapter.BlenderMeshAdapter(source.data)
+        vertices2d, _ = regenerate.get_grid(
+            source, mesh, result, settings.offset, settings.lacing_method)
+
+        frames = list(range(self.frame_start, self.frame_end + 1))
+        err, result = bake.calc_frame_arrays(context, source, curve, vertices2d, settings, frames)
+        if err is not None:
+            self.report({'ERROR'}, "{}: {}".format(source.name, result))
+            return {'CANCELLED'}
+        baked, cyclic = result
+
+        # 追従するカーブや結び付けたカーブは上書きされるので、追従と結び付けを止める
+        if link.is_live(curve):
+            link.set_live(curve, False)
+            self.report({'INFO'}, "{}: メッシュへの追従を OFF にしました".format(curve.name))
+        link.set_binding(curve, None)
+
+        if self.bake_target == 'SHAPE_KEYS':
+            link.set_bake_cache(curve, None)
+            bake.write_shape_keys(curve, frames, baked, cyclic)
+        else:
+            path = self.filepath if self.filepath != "" else bake.get_default_cache_path(curve)
+            try:
+                bake.save_cache(bpy.path.abspath(path), frames, baked, cyclic)
+            except OSError as e:
+                self.report({'ERROR'}, "キャッシュファイルを書き出せません: {}".format(e))
+                return {'CANCELLED'}
+            link.set_bake_cache(curve, path)
+            bake.update_curve(context.scene, curve)
+
+        self.report({'INFO'}, "{} フレームを焼き込みました ({:.3f}秒)".format(
+            len(frames), time.perf_counter() - start_time))
+
+        return {'FINISHED'}
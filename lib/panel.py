@@ -1,6 +1,6 @@
 import bpy
 
-from . import ops, props, utils
+from . import link, ops, profiling, props, utils
 
 
 class VIEW3D_PT_TareminShoeLacesPanel(bpy.types.Panel):
@@ -15,8 +15,7 @@ class VIEW3D_PT_TareminShoeLacesPanel(bpy.types.Panel):
         errors = []
         settings = utils.get_settings(context)
 
-        err, result = ops.OBJECT_OT_TareminShoeLacesCreateCurve.check_mesh_geometry(
-            obj)
+        err, result = ops.OBJECT_OT_TareminShoeLacesCreateCurve.check_mesh_geometry_if_loaded(obj)
         if err:
             errors.append(result)
 
@@ -58,3 +57,43 @@ class VIEW3D_PT_TareminShoeLacesPanel(bpy.types.Panel):
         col = layout.column(align=True)
         operator_row = col.row(align=True)
         operator_row.operator(ops.OBJECT_OT_TareminShoeLacesCreateCurve.bl_idname)
+        col.operator(ops.OBJECT_OT_TareminShoeLacesPunchEyelets.bl_idname)
+
+        # 生成したカーブ
+        curve = link.get_lace_curve(obj)
+        if curve is not None:
+            operator_row.operator(ops.OBJECT_OT_TareminShoeLacesRegenerate.bl_idname)
+            col.operator(ops.OBJECT_OT_TareminShoeLacesBake.bl_idname)
+
+        if link.is_linked(obj):
+            box = layout.box()
+            source = link.get_source(obj)
+            box.label(text=source.name, icon='MESH_DATA')
+            is_live = link.is_live(obj)
+            box.operator(
+                ops.OBJECT_OT_TareminShoeLacesToggleLive.bl_idname,
+                text="追従: ON" if is_live else "追従: OFF",
+                icon='LINKED' if is_live else 'UNLINKED',
+                depress=is_live)
+            is_bound = link.get_binding(obj) is not None
+            box.operator(
+                ops.OBJECT_OT_TareminShoeLacesToggleBinding.bl_idname,
+                text="変形への結び付け: ON" if is_bound else "変形への結び付け: OFF",
+                icon='LINKED' if is_bound else 'UNLINKED',
+                depress=is_bound)
+
+        # 計測結果 (アドオン設定か環境変数で計測を有効にした場合のみ)
+        report = profiling.profiler.last_report
+        if report is not None:
+            row = layout.row()
+            row.prop(
+                settings, "profile_folding",
+                icon="TRIA_RIGHT" if settings.profile_folding else "TRIA_DOWN",
+                icon_only=True
+            )
+            row.label(text="Profile")
+
+            if not settings.profile_folding:
+                col = layout.box().column(align=True)
+                for line in profiling.format_report(report):
+                    col.label(text=line)
@@ -0,0 +1,124 @@
+import os
+import bpy
+
+from . import library, profiling
+
+# lib の親パッケージ(アドオン本体)の名前
+ADDON_NAME = __package__.rpartition(".")[0]
+
+
+class TareminShoeLacesKnotDirectory(bpy.types.PropertyGroup):
+    path: bpy.props.StringProperty(name="ディレクトリ", subtype='DIR_PATH', default="")
+
+
+class TareminShoeLaces_OT_AddKnotDirectory(bpy.types.Operator):
+    bl_idname = "taremin.shoelaces_add_knot_directory"
+    bl_label = "結び目のディレクトリを追加"
+    bl_options = {'REGISTER', 'INTERNAL'}
+
+    def execute(self, context):
+        get_preferences(context).knot_directories.add()
+        return {'FINISHED'}
+
+
+class TareminShoeLaces_OT_RemoveKnotDirectory(bpy.types.Operator):
+    bl_idname = "taremin.shoelaces_remove_knot_directory"
+    bl_label = "結び目のディレクトリを削除"
+    bl_options = {'REGISTER', 'INTERNAL'}
+
+    index: bpy.props.IntProperty()
+
+    def execute(self, context):
+        get_preferences(context).knot_directories.remove(self.index)
+        return {'FINISHED'}
+
+
+# ディレクトリの .blend ファイルを調べて、結び目のライブラリの索引を作り直す
+# (リドゥパネルでは索引だけを参照し、.blend ファイルは選択された結び目だけを読み込む)
+class TareminShoeLaces_OT_UpdateKnotLibrary(bpy.types.Operator):
+    bl_idname = "taremin.shoelaces_update_knot_library"
+    bl_label = "結び目のライブラリを更新"
+    bl_description = "設定したディレクトリの .blend ファイルから結び目の一覧を作り直します(更新されていないファイルは調べません)"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        directories = get_knot_directories(context)
+        scanned, errors = library.update_index(context, directories)
+
+        for error in errors:
+            self.report({'WARNING'}, "読み込めません: {}".format(error))
+        self.report({'INFO'}, "{} 個のファイルを調べました (結び目: {} 個)".format(
+            scanned, len(library.get_library_assets())))
+
+        return {'FINISHED'}
+
+
+class TareminShoeLacesPreferences(bpy.types.AddonPreferences):
+    bl_idname = ADDON_NAME
+
+    use_profiling: bpy.props.BoolProperty(
+        name="処理時間を計測する",
+        description="カーブの生成時に段階ごとの処理時間・呼び出し回数・メモリ使用量を記録します",
+        default=False,
+    )
+    profile_output: bpy.props.StringProperty(
+        name="計測結果の出力先",
+        description="計測結果を JSON Lines 形式で追記するファイル(空の場合は出力しません)",
+        subtype='FILE_PATH',
+        default="",
+    )
+    knot_directories: bpy.props.CollectionProperty(type=TareminShoeLacesKnotDirectory)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "use_profiling")
+        layout.prop(self, "profile_output")
+        layout.label(text="環境変数 {}=1 / {}=<ファイル> でも設定できます".format(
+            profiling.ENV_ENABLE, profiling.ENV_OUTPUT))
+
+        box = layout.box()
+        box.label(text="結び目のライブラリ")
+        for i, directory in enumerate(self.knot_directories):
+            row = box.row(align=True)
+            row.prop(directory, "path", text="")
+            row.operator(TareminShoeLaces_OT_RemoveKnotDirectory.bl_idname, text="", icon='X').index = i
+        row = box.row()
+        row.operator(TareminShoeLaces_OT_AddKnotDirectory.bl_idname, icon='ADD')
+        row.operator(TareminShoeLaces_OT_UpdateKnotLibrary.bl_idname, icon='FILE_REFRESH')
+        box.label(text="{} 個の結び目".format(len(library.get_library_assets())))
+
+
+def get_preferences(context):
+    addon = context.preferences.addons.get(ADDON_NAME)
+    if addon is None:
+        return None
+    return addon.preferences
+
+
+# 結び目のライブラリのディレクトリ (存在するもののみ)
+def get_knot_directories(context):
+    preferences = get_preferences(context)
+    if preferences is None:
+        return []
+    directories = [bpy.path.abspath(directory.path) for directory in preferences.knot_directories]
+    return [directory for directory in directories if directory != "" and os.path.isdir(directory)]
+
+
+def is_profiling_enabled(context):
+    if os.environ.get(profiling.ENV_ENABLE, "") not in ("", "0"):
+        return True
+
+    preferences = get_preferences(context)
+    return preferences is not None and preferences.use_profiling
+
+
+def get_profile_output(context):
+    path = os.environ.get(profiling.ENV_OUTPUT, "")
+    if path == "":
+        preferences = get_preferences(context)
+        if preferences is not None:
+            path = preferences.profile_output
+
+    if path == "":
+        return ""
+    return bpy.path.abspath(path)
@@ -0,0 +1,146 @@
+# 生成処理の段階ごとの処理時間・呼び出し回数・メモリ確保量のピークを記録する
+#
+# 計測は明示的に有効にした場合のみ行う(無効のときの measure() は何もしない)
+#
+#   profiler.enabled = True
+#   profiler.begin()
+#   with profiler.measure("topology"):
+#       ...
+#   report = profiler.end(operator="...")
+#
+# メモリは tracemalloc で計測する(NumPy の配列も含まれる)
+# tracemalloc.reset_peak() がない Python (3.8 以前) では、段階ごとのピークは計測開始からのピークになる
+import collections
+import contextlib
+import time
+
+from . import lazy
+
+# 計測を有効にしたときだけ使うモジュール
+datetime = lazy.module("datetime")
+json = lazy.module("json")
+tracemalloc = lazy.module("tracemalloc")
+
+# 環境変数で有効にする場合 (アドオン設定より優先)
+ENV_ENABLE = "TAREMIN_SHOELACES_PROFILE"
+ENV_OUTPUT = "TAREMIN_SHOELACES_PROFILE_OUTPUT"
+
+NULL_CONTEXT = contextlib.nullcontext()
+
+
+class StageStats:
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.seconds = 0.0
+        self.calls = 0
+        self.peak_bytes = 0
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "seconds": self.seconds,
+            "calls": self.calls,
+            "peak_bytes": self.peak_bytes,
+        }
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = True
+        self.stages = collections.OrderedDict()
+        self.stack = []
+        self.last_report = None
+        self.start_time = None
+        self.started_tracemalloc = False
+
+    def begin(self):
+        self.stages = collections.OrderedDict()
+        self.stack = []
+        if not self.enabled:
+            return
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+        self.start_time = time.perf_counter()
+
+    def end(self, **meta):
+        if not self.enabled or self.start_time is None:
+            return None
+
+        report = {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "total_seconds": time.perf_counter() - self.start_time,
+            "meta": meta,
+            "stages": [stats.to_dict() for stats in self.stages.values()],
+        }
+
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+        self.start_time = None
+        self.last_report = report
+
+        return report
+
+    def measure(self, name):
+        if not self.enabled or self.start_time is None:
+            return NULL_CONTEXT
+        return self.measure_stage(name)
+
+    @contextlib.contextmanager
+    def measure_stage(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats(name, len(self.stack))
+
+        # frame: [段階の開始時の確保量, 段階中のピーク]
+        tracing = tracemalloc.is_tracing()
+        frame = [0, 0]
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # ピークをリセットする前に、外側の段階のピークを更新しておく
+            for parent in self.stack:
+                parent[1] = max(parent[1], peak)
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            frame = [current, current]
+
+        self.stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats.seconds += time.perf_counter() - start
+            stats.calls += 1
+            self.stack.pop()
+
+            if tracing:
+                peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+                stats.peak_bytes = max(stats.peak_bytes, peak - frame[0])
+                if len(self.stack) > 0:
+                    self.stack[-1][1] = max(self.stack[-1][1], peak)
+
+
+def format_report(report):
+    lines = ["計測結果: {:.1f}ms".format(report["total_seconds"] * 1000.0)]
+    for stage in report["stages"]:
+        lines.append("{}{}: {:.1f}ms x{} {:.0f}KB".format(
+            "  " * stage["depth"],
+            stage["name"],
+            stage["seconds"] * 1000.0,
+            stage["calls"],
+            stage["peak_bytes"] / 1024.0))
+    return lines
+
+
+# 1回の計測結果を1行の JSON として追記する (JSON Lines)
+def append_json(report, path):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(report, ensure_ascii=False) + "\n")
+
+
+profiler = Profiler()
@@ -15,6 +15,7 @@ class ShoeLacingSettings(bpy.types.PropertyGroup):
     knots: bpy.props.CollectionProperty(type=ShoeLacingKnotProps)
     active_knot_index: bpy.props.IntProperty(name='ActiveKnotIndex', options={'HIDDEN'}, default=0)
     knots_folding: bpy.props.BoolProperty(name="expand", default=False)
+    profile_folding: bpy.props.BoolProperty(name="expand", default=True)
 
 
 class VIEW3D_UL_ShoeLacing(bpy.types.UIList):
@@ -0,0 +1,182 @@
+# 既存のカーブオブジェクトに制御点を書き込み直す (オブジェクトやデータブロックは作り直さない)
+import numpy
+from . import cache, clearance, lacing_list, library, sweep, writeback
+
+
+# 解析結果はメッシュと offset・結び方のみに依存するのでキャッシュから取得する
+def get_grid(obj, mesh, corner_vertices, offset, lacing_method):
+    cache_key = cache.get_topology_key(obj, offset, lacing_method)
+    entry = cache.topology_cache.get(cache_key)
+
+    if entry is None:
+        entry = cache.TopologyCacheEntry(
+            mesh.get_topology().to_array2d(corner_vertices, offset))
+        cache.topology_cache.set(cache_key, entry)
+
+    return entry.vertices2d, entry.cross_lines
+
+
+# 制御点の配列を元のメッシュのローカル座標で求める
+def calc_point_arrays(context, mesh, vertices2d, settings, cross_lines=None):
+    curve_generator = lacing_list.ShoeLacingMethods[settings.lacing_method](
+        mesh, vertices2d, settings, cross_lines, library.get_knot(context, settings))
+    return curve_generator.create_curve_points()
+
+
+# 元のメッシュの面の BVH (頂点座標が変わらない限り作り直さない)
+def get_bvh_tree(obj):
+    cache_key = cache.get_topology_key(obj)
+    tree = cache.bvh_cache.get(cache_key)
+
+    if tree is None:
+        import mathutils.bvhtree
+
+        mesh = obj.data
+        co = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+        mesh.vertices.foreach_get("co", co)
+        loop_verts = numpy.empty(len(mesh.loops), dtype=numpy.int64)
+        mesh.loops.foreach_get("vertex_index", loop_verts)
+        loop_starts = numpy.empty(len(mesh.polygons), dtype=numpy.int64)
+        mesh.polygons.foreach_get("loop_start", loop_starts)
+
+        polygons = [p.tolist() for p in numpy.split(loop_verts, loop_starts[1:])]
+        tree = mathutils.bvhtree.BVHTree.FromPolygons(co.reshape(-1, 3).tolist(), polygons)
+        cache.bvh_cache.set(cache_key, tree)
+
+    return tree
+
+
+# 紐がメッシュにめり込んだり紐同士がぶつかったりしている制御点をずらす (元のメッシュのローカル座標)
+# ずらした配列と、ずらした制御点の数・残った問題の数を返す
+def fix_clearance(source, local_arrays, cyclic, settings):
+    tree = get_bvh_tree(source)
+
+    def find_nearest(points):
+        nearest = numpy.full_like(points, numpy.nan)
+        normals = numpy.full_like(points, numpy.nan)
+        for i, co in enumerate(points.tolist()):
+            location, normal, _, _ = tree.find_nearest(co)
+            if location is not None:
+                nearest[i] = location
+                normals[i] = normal
+        return nearest, normals
+
+    return clearance.fix_clearance(
+        local_arrays, cyclic, settings.bevel_depth, settings.clearance_margin, find_nearest)
+
+
+def write_lace_curve(source, curve_obj, local_arrays, cyclic, bevel_depth):
+    arrays = writeback.transform_arrays(
+        local_arrays, writeback.get_transform(source, curve_obj))
+
+    splines = curve_obj.data.splines
+    n = len(arrays)
+    if len(splines) == 1 and splines[0].type == 'BEZIER' and len(splines[0].bezier_points) == n:
+        spline = splines[0]
+    else:
+        spline = writeback.resize_bezier_spline(splines, n)
+
+    spline.use_cyclic_u = cyclic
+    writeback.write_bezier_points(spline, arrays)
+    curve_obj.data.bevel_depth = bevel_depth
+
+
+def write_hole_curve(source, hole_curve_obj, local_arrays, bevel_depth):
+    arrays = writeback.transform_arrays(
+        local_arrays, writeback.get_transform(source, hole_curve_obj))
+    writeback.update_hole_splines(
+        hole_curve_obj.data.splines, *writeback.get_side_handles(arrays))
+    hole_curve_obj.data.bevel_depth = bevel_depth
+
+
+def read_spline_arrays(curve_obj):
+    spline = curve_obj.data.splines[0]
+    arrays = writeback.read_bezier_points(spline.bezier_points)
+    return {name: value.astype(numpy.float64) for name, value in arrays.items()}, spline.use_cyclic_u
+
+
+# LOD0 の分割数の予算 (指定がない場合は一様に分割したときと同じ数)
+def get_segment_budget(arrays, cyclic, settings):
+    if settings.tube_segment_budget > 0:
+        return settings.tube_segment_budget
+    num_spans = len(arrays["co"]) if cyclic else len(arrays["co"]) - 1
+    return num_spans * settings.tube_resolution
+
+
+# カーブの最初のスプラインに沿ったチューブ (Blender が計算した自動ハンドルをそのまま使う)
+# LOD のレベルが上がるごとに、カーブ方向と断面の分割数を lod_ratio 倍に減らす
+def calc_tube_geometry(curve_obj, settings, level=0):
+    arrays, cyclic = read_spline_arrays(curve_obj)
+
+    budget = None
+    if settings.use_adaptive_resolution or level > 0:
+        budget = sweep.get_lod_budgets(
+            get_segment_budget(arrays, cyclic, settings), level + 1, settings.lod_ratio)[level]
+    segments = max(3, int(round(settings.tube_profile_segments * settings.lod_ratio ** level)))
+
+    return sweep.sweep_bezier(
+        arrays, cyclic, settings.bevel_depth, settings.tube_resolution,
+        segments, settings.tube_profile_ratio, budget)
+
+
+def get_tube_name(curve_obj, level):
+    if level == 0:
+        return curve_obj.name + "Tube"
+    return "{}Tube_LOD{}".format(curve_obj.name, level)
+
+
+def create_tube_object(context, curve_obj, settings, level=0):
+    mesh = context.blend_data.meshes.new(get_tube_name(curve_obj, level))
+    writeback.write_mesh(mesh, calc_tube_geometry(curve_obj, settings, level))
+
+    obj = context.blend_data.objects.new(mesh.name, mesh)
+    context.collection.objects.link(obj)
+    obj.matrix_world = curve_obj.matrix_world.copy()
+
+    return obj
+
+
+# 既存のメッシュオブジェクトのジオメトリを置き換える (オブジェクトとマテリアルはそのまま)
+def replace_mesh_geometry(context, obj, geometry):
+    mesh = obj.data
+    if hasattr(mesh, "clear_geometry"):
+        mesh.clear_geometry()
+    else:
+        # Blender 2.80 にはジオメトリを消す API がないので作り直す
+        old_mesh = mesh
+        mesh = context.blend_data.meshes.new(old_mesh.name)
+        for material in old_mesh.materials:
+            mesh.materials.append(material)
+        obj.data = mesh
+        if old_mesh.users == 0:
+            context.blend_data.meshes.remove(old_mesh)
+
+    writeback.write_mesh(mesh, geometry)
+
+
+def write_tube_mesh(context, curve_obj, tube_obj, settings, level=0):
+    replace_mesh_geometry(context, tube_obj, calc_tube_geometry(curve_obj, settings, level))
+    tube_obj.matrix_world = curve_obj.matrix_world.copy()
+
+
+# 穴あけ用のメッシュ: 両端の制御点のハンドルを軸とする円柱 (元のメッシュのローカル座標)
+def calc_hole_geometry(local_arrays, settings):
+    starts, ends = writeback.get_side_handles(local_arrays)
+    return sweep.create_cylinders(starts, ends, settings.bevel_depth, settings.hole_mesh_segments)
+
+
+def create_hole_mesh_object(context, source, local_arrays, settings):
+    mesh = context.blend_data.meshes.new(source.name + "HoleCutter")
+    writeback.write_mesh(mesh, calc_hole_geometry(local_arrays, settings))
+
+    obj = context.blend_data.objects.new(mesh.name, mesh)
+    context.collection.objects.link(obj)
+    obj.matrix_world = source.matrix_world.copy()
+
+    return obj
+
+
+def write_hole_mesh(context, source, hole_mesh_obj, local_arrays, settings):
+    replace_mesh_geometry(context, hole_mesh_obj, calc_hole_geometry(local_arrays, settings))
+    hole_mesh_obj.matrix_world = source.matrix_world.copy()
+
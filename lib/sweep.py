@@ -0,0 +1,313 @@
+# ベジェ曲線に沿って断面を掃引したチューブのメッシュを NumPy で作る
+#
+# 断面の向きは平行移動フレーム (double reflection 法) で決め、ねじれが生じないようにする
+# UV は U が断面の周方向、V がカーブに沿った長さ (断面の周長を 1 とする)
+import math
+import numpy
+
+FLT_EPSILON = 1.1920928955078125e-07
+
+
+def get_spans(n, cyclic):
+    start = numpy.arange(n if cyclic else n - 1)
+    return start, (start + 1) % n
+
+
+# 各区間を resolution 分割した点と、点ごとの区間の番号・区間内の位置 t (終点は含まない)
+# resolution は全区間共通の値か、区間ごとの分割数の配列
+def sample_bezier(co, handle_left, handle_right, cyclic, resolution):
+    start, end = get_spans(len(co), cyclic)
+    resolution = numpy.broadcast_to(numpy.asarray(resolution, dtype=numpy.int64), start.shape)
+
+    span = numpy.repeat(numpy.arange(len(start)), resolution)
+    offsets = numpy.cumsum(resolution) - resolution
+    t = (numpy.arange(len(span)) - offsets[span]) / resolution[span]
+    s = (1.0 - t)[:, None]
+    u = t[:, None]
+    p0 = co[start][span]
+    p1 = handle_right[start][span]
+    p2 = handle_left[end][span]
+    p3 = co[end][span]
+
+    points = s * s * s * p0 + 3.0 * s * s * u * p1 + 3.0 * s * u * u * p2 + u * u * u * p3
+    return points, span, t
+
+
+# 各区間を resolution 分割した点列 (Blender の resolution_u と同じ分割)
+def evaluate_bezier(co, handle_left, handle_right, cyclic, resolution):
+    points, span, t = sample_bezier(co, handle_left, handle_right, cyclic, resolution)
+    if not cyclic:
+        points = numpy.concatenate((points, co[-1:]))
+
+    # 長さ0の区間(制御点とハンドルが重なっている場合など)は除く
+    keep = numpy.ones(len(points), dtype=bool)
+    keep[1:] = numpy.linalg.norm(numpy.diff(points, axis=0), axis=1) > FLT_EPSILON
+    if cyclic and len(points) > 1 and numpy.linalg.norm(points[-1] - points[0]) <= FLT_EPSILON:
+        keep[-1] = False
+
+    return points[keep]
+
+
+# 区間ごとの曲がり具合 (制御点とハンドルを結んだ折れ線の曲がる角度の合計)
+# 直線の区間にも長さに応じて分割数が割り当たるよう、全長に対する長さの割合 x STRAIGHT_WEIGHT を加える
+STRAIGHT_WEIGHT = math.pi
+
+
+def calc_span_weights(co, handle_left, handle_right, cyclic):
+    start, end = get_spans(len(co), cyclic)
+    polygon = numpy.stack(
+        (co[start], handle_right[start], handle_left[end], co[end]), axis=1)
+    edges = numpy.diff(polygon, axis=1)
+    lengths = numpy.linalg.norm(edges, axis=2)
+
+    directions = normalize(edges)
+    cos = numpy.clip(numpy.einsum('ijk,ijk->ij', directions[:, :-1], directions[:, 1:]), -1.0, 1.0)
+    # 長さ0の辺(ハンドルが制御点に重なっている)は曲がりに数えない
+    valid = (lengths[:, :-1] > FLT_EPSILON) & (lengths[:, 1:] > FLT_EPSILON)
+    angles = numpy.where(valid, numpy.arccos(cos), 0.0).sum(axis=1)
+
+    span_lengths = lengths.sum(axis=1)
+    total_length = span_lengths.sum()
+    if total_length > 0.0:
+        angles = angles + span_lengths / total_length * STRAIGHT_WEIGHT
+
+    return angles
+
+
+# 全体の分割数 budget を重みに比例して区間に割り当てる (各区間は最低1)
+def allocate_resolution(weights, budget):
+    n = len(weights)
+    budget = max(int(budget), n)
+    total = weights.sum()
+    if n == 0 or total <= 0.0:
+        return numpy.full(n, max(1, budget // max(n, 1)), dtype=numpy.int64)
+
+    share = weights / total * (budget - n)
+    resolution = numpy.floor(share).astype(numpy.int64)
+    # 端数の大きい区間から残りを割り当てる
+    remainder = budget - n - resolution.sum()
+    if remainder > 0:
+        resolution[numpy.argsort(resolution - share)[:remainder]] += 1
+
+    return resolution + 1
+
+
+def calc_adaptive_resolution(arrays, cyclic, budget):
+    weights = calc_span_weights(
+        arrays["co"], arrays["handle_left"], arrays["handle_right"], cyclic)
+    return allocate_resolution(weights, budget)
+
+
+# LOD ごとの分割数の予算 (レベルが1つ上がるごとに ratio 倍)
+def get_lod_budgets(budget, levels, ratio):
+    return [max(1, int(round(budget * ratio ** level))) for level in range(levels)]
+
+
+def normalize(vectors):
+    length = numpy.linalg.norm(vectors, axis=-1, keepdims=True)
+    return numpy.divide(vectors, length, out=numpy.zeros_like(vectors), where=length > 0.0)
+
+
+def calc_tangents(points, cyclic):
+    if cyclic:
+        return normalize(numpy.roll(points, -1, axis=0) - numpy.roll(points, 1, axis=0))
+    return normalize(numpy.gradient(points, axis=0))
+
+
+# v に垂直な平面での鏡映の行列 (v が0の場合は単位行列)
+def reflections(v):
+    c = numpy.einsum('ij,ij->i', v, v)
+    scale = numpy.divide(2.0, c, out=numpy.zeros_like(c), where=c > FLT_EPSILON)
+    return numpy.identity(3) - scale[:, None, None] * v[:, :, None] * v[:, None, :]
+
+
+# 行列の累積積 C[i] = A[i] @ A[i-1] @ ... @ A[0] を log2(n) 回の一括の行列積で求める
+def cumulative_matmul(matrices):
+    result = matrices.copy()
+    step = 1
+    while step < len(result):
+        result[step:] = result[step:] @ result[:-step]
+        step *= 2
+    return result
+
+
+def rotate_about_axis(vectors, axis, angle):
+    cos = numpy.cos(angle)[:, None]
+    sin = numpy.sin(angle)[:, None]
+    return (
+        vectors * cos +
+        numpy.cross(axis, vectors) * sin +
+        axis * numpy.einsum('ij,ij->i', axis, vectors)[:, None] * (1.0 - cos)
+    )
+
+
+def get_initial_normal(tangent):
+    axis = numpy.zeros(3)
+    axis[int(numpy.argmin(numpy.abs(tangent)))] = 1.0
+    return normalize(numpy.cross(tangent, axis))
+
+
+# 平行移動フレーム (tangents, normals, binormals)
+# 点 i から i+1 への double reflection は線形写像なので、その累積積で全ての点の法線を一度に求める
+def calc_frames(points, cyclic):
+    n = len(points)
+    tangents = calc_tangents(points, cyclic)
+
+    next_index = (numpy.arange(n) + 1) % n
+    v1 = points[next_index] - points
+    h1 = reflections(v1)
+    reflected_tangents = numpy.einsum('ijk,ik->ij', h1, tangents)
+    h2 = reflections(tangents[next_index] - reflected_tangents)
+    steps = h2 @ h1
+
+    transforms = numpy.empty((n, 3, 3))
+    transforms[0] = numpy.identity(3)
+    transforms[1:] = steps[:-1]
+    transforms = cumulative_matmul(transforms)
+
+    normal0 = get_initial_normal(tangents[0])
+    normals = normalize(transforms @ normal0)
+
+    # 閉じたカーブでは一周したときの法線のずれを長さに応じて分配する
+    if cyclic and n > 2:
+        end_normal = normalize(steps[-1] @ normals[-1])
+        angle = math.atan2(
+            numpy.dot(numpy.cross(end_normal, normal0), tangents[0]),
+            numpy.dot(end_normal, normal0))
+        lengths = numpy.linalg.norm(v1, axis=1)
+        ratio = numpy.concatenate(([0.0], numpy.cumsum(lengths[:-1]))) / lengths.sum()
+        normals = normalize(rotate_about_axis(normals, tangents, angle * ratio))
+
+    # 接線と直交させる
+    normals = normalize(normals - tangents * numpy.einsum('ij,ij->i', normals, tangents)[:, None])
+    binormals = numpy.cross(tangents, normals)
+
+    return tangents, normals, binormals
+
+
+def create_profile(segments, ratio):
+    angle = numpy.arange(segments) * (2.0 * math.pi / segments)
+    return numpy.stack((numpy.cos(angle), numpy.sin(angle) * ratio), axis=1)
+
+
+# 戻り値: {"vertices" (V, 3), "loop_verts" (L,), "loop_starts" (P,), "loop_totals" (P,), "uvs" (L, 2)}
+def sweep_tube(points, cyclic, radius, segments=8, ratio=1.0):
+    n = len(points)
+    k = segments
+    if n < 2 or k < 3:
+        raise ValueError("チューブを作るには2点以上の点列と3以上の分割数が必要です")
+
+    tangents, normals, binormals = calc_frames(points, cyclic)
+    profile = create_profile(k, ratio) * radius
+    vertices = (
+        points[:, None] +
+        profile[None, :, 0, None] * normals[:, None] +
+        profile[None, :, 1, None] * binormals[:, None]
+    ).reshape(-1, 3)
+
+    # 側面の四角形 (リング i の断面 j から、断面方向・カーブ方向の順に一周する)
+    rings = numpy.arange(n if cyclic else n - 1)
+    next_rings = (rings + 1) % n
+    j = numpy.arange(k)
+    next_j = (j + 1) % k
+    quads = numpy.stack((
+        rings[:, None] * k + j[None, :],
+        rings[:, None] * k + next_j[None, :],
+        next_rings[:, None] * k + next_j[None, :],
+        next_rings[:, None] * k + j[None, :],
+    ), axis=2).reshape(-1, 4)
+
+    # UV: 断面の継ぎ目は U=1 にする。V は断面の周長を 1 とした長さ
+    lengths = numpy.linalg.norm(numpy.diff(numpy.concatenate((points, points[:1])), axis=0), axis=1)
+    distance = numpy.concatenate(([0.0], numpy.cumsum(lengths)))
+    circumference = numpy.linalg.norm(numpy.diff(numpy.concatenate((profile, profile[:1])), axis=0), axis=1).sum()
+    v = distance / circumference if circumference > 0.0 else distance
+    u = numpy.arange(k + 1) / k
+    quad_uvs = numpy.stack((
+        numpy.stack(numpy.broadcast_arrays(u[None, j], v[rings, None]), axis=2),
+        numpy.stack(numpy.broadcast_arrays(u[None, j + 1], v[rings, None]), axis=2),
+        numpy.stack(numpy.broadcast_arrays(u[None, j + 1], v[rings + 1, None]), axis=2),
+        numpy.stack(numpy.broadcast_arrays(u[None, j], v[rings + 1, None]), axis=2),
+    ), axis=2).reshape(-1, 2)
+
+    loop_verts = [quads.ravel()]
+    loop_totals = [numpy.full(len(quads), 4)]
+    uvs = [quad_uvs]
+
+    # 閉じていないカーブは両端をふさぐ
+    if not cyclic:
+        cap_uvs = profile / (2.0 * radius) + 0.5 if radius > 0.0 else numpy.full((k, 2), 0.5)
+        loop_verts += [j[::-1], (n - 1) * k + j]
+        loop_totals.append(numpy.full(2, k))
+        uvs += [cap_uvs[::-1], cap_uvs]
+
+    loop_totals = numpy.concatenate(loop_totals)
+    return {
+        "vertices": vertices,
+        "loop_verts": numpy.concatenate(loop_verts),
+        "loop_starts": numpy.concatenate(([0], numpy.cumsum(loop_totals)[:-1])),
+        "loop_totals": loop_totals,
+        "uvs": numpy.concatenate(uvs),
+    }
+
+
+# budget を指定した場合は、曲がり具合に応じて区間ごとの分割数を決める
+def sweep_bezier(arrays, cyclic, radius, resolution=12, segments=8, ratio=1.0, budget=None):
+    if budget is not None:
+        resolution = calc_adaptive_resolution(arrays, cyclic, budget)
+    points = evaluate_bezier(
+        arrays["co"], arrays["handle_left"], arrays["handle_right"], cyclic, resolution)
+    return sweep_tube(points, cyclic, radius, segments, ratio)
+
+
+# 各直線に垂直な単位ベクトル
+def get_perpendiculars(tangents):
+    helpers = numpy.identity(3)[numpy.argmin(numpy.abs(tangents), axis=1)]
+    return normalize(numpy.cross(tangents, helpers))
+
+
+# starts[i] -> ends[i] を軸とする、両端をふさいだ円柱を一度に作る (Boolean の穴あけ用)
+def create_cylinders(starts, ends, radius, segments=8):
+    m = len(starts)
+    k = segments
+    if k < 3:
+        raise ValueError("円柱の分割数は3以上にしてください")
+
+    tangents = normalize(ends - starts)
+    normals = get_perpendiculars(tangents)
+    binormals = numpy.cross(tangents, normals)
+
+    profile = create_profile(k, 1.0) * radius
+    ring = profile[None, :, 0, None] * normals[:, None] + profile[None, :, 1, None] * binormals[:, None]
+    vertices = numpy.stack((starts[:, None] + ring, ends[:, None] + ring), axis=1).reshape(-1, 3)
+
+    # 円柱 i の頂点は i * 2k から、始点側の断面 k 個、終点側の断面 k 個
+    base = (numpy.arange(m) * 2 * k)[:, None]
+    j = numpy.arange(k)[None, :]
+    next_j = (j + 1) % k
+    quads = numpy.stack((base + j, base + next_j, base + k + next_j, base + k + j), axis=2).reshape(-1, 4)
+    start_caps = (base + j[:, ::-1]).ravel()
+    end_caps = (base + k + j).ravel()
+
+    u = numpy.arange(k + 1) / k
+    side_uvs = numpy.stack((
+        numpy.stack((u[:-1], numpy.zeros(k)), axis=1),
+        numpy.stack((u[1:], numpy.zeros(k)), axis=1),
+        numpy.stack((u[1:], numpy.ones(k)), axis=1),
+        numpy.stack((u[:-1], numpy.ones(k)), axis=1),
+    ), axis=1)
+    cap_uvs = create_profile(k, 1.0) / 2.0 + 0.5
+
+    loop_totals = numpy.concatenate((numpy.full(m * k, 4), numpy.full(2 * m, k)))
+    return {
+        "vertices": vertices,
+        "loop_verts": numpy.concatenate((quads.ravel(), start_caps, end_caps)),
+        "loop_starts": numpy.concatenate(([0], numpy.cumsum(loop_totals)[:-1])),
+        "loop_totals": loop_totals,
+        "uvs": numpy.concatenate((
+            numpy.tile(side_uvs.reshape(-1, 2), (m, 1)),
+            numpy.tile(cap_uvs[::-1], (m, 1)),
+            numpy.tile(cap_uvs, (m, 1)),
+        )),
+    }
+
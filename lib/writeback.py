@@ -0,0 +1,192 @@
+# 制御点の配列 (core.POINT_DTYPE の構造化配列) をカーブに書き込む
+import numpy
+from . import core
+
+HANDLE_TYPES = core.HANDLE_TYPES
+HANDLE_TYPE_NAMES = {value: name for name, value in HANDLE_TYPES.items()}
+
+# これより小さい座標の差は変化していないとみなす (RNA の座標は float32)
+CHANGE_EPSILON = 1e-5
+
+# 変化した制御点がこの割合以下なら、その点だけを書き込む
+PARTIAL_WRITE_RATIO = 0.25
+
+# スプラインを作り直すときに引き継ぐ設定
+SPLINE_SETTINGS = ("material_index", "resolution_u", "use_smooth", "tilt_interpolation", "radius_interpolation")
+
+
+# src_obj のローカル座標を dst_obj のローカル座標に変換する行列
+def get_transform(src_obj, dst_obj):
+    return numpy.array(dst_obj.matrix_world.inverted() @ src_obj.matrix_world)
+
+
+def transform(matrix, co):
+    return co @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+# 3つの座標をまとめて1回の行列積で変換した制御点の配列を返す
+def transform_arrays(arrays, matrix):
+    n = len(arrays)
+    vectors = transform(matrix, numpy.concatenate(
+        (arrays["co"], arrays["handle_left"], arrays["handle_right"])))
+
+    result = arrays.copy()
+    result["co"] = vectors[:n]
+    result["handle_left"] = vectors[n:n*2]
+    result["handle_right"] = vectors[n*2:]
+
+    return result
+
+
+# SIDE の制御点(紐を通す穴)のハンドルの位置
+def get_side_handles(arrays):
+    is_side = arrays["type"] == core.POINT_TYPES['SIDE']
+    return arrays["handle_left"][is_side], arrays["handle_right"][is_side]
+
+
+def write_bezier_points(spline, arrays):
+    bezier_points = spline.bezier_points
+    handle_types = numpy.ascontiguousarray(arrays["handle_type"])
+
+    bezier_points.foreach_set("handle_left_type", handle_types)
+    bezier_points.foreach_set("handle_right_type", handle_types)
+    for name in ("co", "handle_left", "handle_right"):
+        bezier_points.foreach_set(
+            name, numpy.ascontiguousarray(arrays[name], dtype=numpy.float32).ravel())
+
+    # foreach_set では更新処理が呼ばれないため、1点だけRNA経由で設定してスプライン全体のハンドルを再計算させる
+    if len(bezier_points) > 0:
+        bezier_points[0].handle_left_type = bezier_points[0].handle_left_type
+
+
+def read_bezier_points(bezier_points):
+    arrays = {}
+    for name in ("co", "handle_left", "handle_right"):
+        value = numpy.empty(len(bezier_points) * 3, dtype=numpy.float32)
+        bezier_points.foreach_get(name, value)
+        arrays[name] = value.reshape(-1, 3)
+
+    handle_type = numpy.empty(len(bezier_points), dtype=numpy.int32)
+    bezier_points.foreach_get("handle_left_type", handle_type)
+    arrays["handle_type"] = handle_type
+
+    return arrays
+
+
+# 制御点の数を変えるため、スプラインを作り直す (スプラインの設定は引き継ぐ)
+def resize_bezier_spline(splines, count):
+    settings = {}
+    if len(splines) > 0:
+        settings = {name: getattr(splines[0], name) for name in SPLINE_SETTINGS}
+
+    splines.clear()
+    spline = splines.new(type='BEZIER')
+    spline.bezier_points.add(count - len(spline.bezier_points))
+    for name, value in settings.items():
+        setattr(spline, name, value)
+
+    return spline
+
+
+# 既存のカーブの最初のスプラインを書き換え、書き込んだ制御点の数を返す
+# 制御点の数が同じなら、変化した点が少ないときはその点だけを RNA 経由で書き込む
+def update_bezier_spline(splines, arrays, cyclic):
+    n = len(arrays)
+    spline = splines[0] if len(splines) > 0 else None
+
+    if spline is None or spline.type != 'BEZIER' or len(spline.bezier_points) != n:
+        spline = resize_bezier_spline(splines, n)
+        spline.use_cyclic_u = cyclic
+        write_bezier_points(spline, arrays)
+        return n
+
+    if spline.use_cyclic_u != cyclic:
+        spline.use_cyclic_u = cyclic
+
+    bezier_points = spline.bezier_points
+    current = read_bezier_points(bezier_points)
+    handle_type = arrays["handle_type"]
+
+    # 自動ハンドルの点は Blender が計算したハンドルになっているので座標だけ比べる
+    changed = (current["handle_type"] != handle_type)
+    changed |= numpy.any(numpy.abs(current["co"] - arrays["co"]) > CHANGE_EPSILON, axis=1)
+    is_auto = (handle_type == HANDLE_TYPES['AUTO'])
+    for name in ("handle_left", "handle_right"):
+        changed |= ~is_auto & numpy.any(
+            numpy.abs(current[name] - arrays[name]) > CHANGE_EPSILON, axis=1)
+
+    indices = numpy.flatnonzero(changed)
+    if len(indices) == 0:
+        return 0
+
+    if len(indices) > n * PARTIAL_WRITE_RATIO:
+        write_bezier_points(spline, arrays)
+        return n
+
+    for i in indices.tolist():
+        point = bezier_points[i]
+        type_name = HANDLE_TYPE_NAMES[int(handle_type[i])]
+        point.handle_left_type = type_name
+        point.handle_right_type = type_name
+        point.co = arrays["co"][i]
+        if type_name != 'AUTO':
+            point.handle_left = arrays["handle_left"][i]
+            point.handle_right = arrays["handle_right"][i]
+
+    return len(indices)
+
+
+def write_hole_splines(splines, handle_left, handle_right):
+    co = numpy.ones((len(handle_left), 2, 4), dtype=numpy.float32)
+    co[:, 0, :3] = handle_left
+    co[:, 1, :3] = handle_right
+
+    for i in range(len(co)):
+        s = splines.new(type='POLY')
+        s.points.add(2 - len(s.points))
+        s.points.foreach_set("co", co[i].ravel())
+
+
+# 穴あけ用のスプラインの数が同じなら、各スプラインの座標だけを書き換える
+def update_hole_splines(splines, handle_left, handle_right):
+    n = len(handle_left)
+    if len(splines) != n or any(s.type != 'POLY' or len(s.points) != 2 for s in splines):
+        splines.clear()
+        write_hole_splines(splines, handle_left, handle_right)
+        return
+
+    co = numpy.ones((n, 2, 4), dtype=numpy.float32)
+    co[:, 0, :3] = handle_left
+    co[:, 1, :3] = handle_right
+
+    for i, s in enumerate(splines):
+        s.points.foreach_set("co", co[i].ravel())
+
+
+# sweep.sweep_tube などの配列から、空のメッシュに頂点・面・UVを一括で書き込む
+def write_mesh(mesh, geometry, uv_name="UVMap"):
+    vertices = geometry["vertices"]
+    loop_verts = geometry["loop_verts"]
+    loop_totals = geometry["loop_totals"]
+
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", numpy.ascontiguousarray(vertices, dtype=numpy.float32).ravel())
+    mesh.loops.add(len(loop_verts))
+    mesh.loops.foreach_set("vertex_index", numpy.ascontiguousarray(loop_verts, dtype=numpy.int32))
+
+    polygons = mesh.polygons
+    polygons.add(len(loop_totals))
+    polygons.foreach_set(
+        "loop_start", numpy.ascontiguousarray(geometry["loop_starts"], dtype=numpy.int32))
+    # Blender 4.0 以降は loop_start から決まるため設定できない
+    if len(polygons) > 0 and not polygons[0].bl_rna.properties["loop_total"].is_readonly:
+        polygons.foreach_set("loop_total", numpy.ascontiguousarray(loop_totals, dtype=numpy.int32))
+    polygons.foreach_set("use_smooth", [True] * len(polygons))
+
+    uv_layer = mesh.uv_layers.get(uv_name)
+    if uv_layer is None:
+        uv_layer = mesh.uv_layers.new(name=uv_name)
+    uv_layer.data.foreach_set("uv", numpy.ascontiguousarray(geometry["uvs"], dtype=numpy.float32).ravel())
+
+    mesh.update(calc_edges=True)
+
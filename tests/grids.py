@@ -0,0 +1,62 @@
+# テスト用の四角形グリッドのメッシュと、オペレータのプロパティの代わりの設定
+import os
+import sys
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import mesh_adapter  # noqa: E402
+
+# 穴の間隔
+SPACING = 0.01
+
+
+# オペレータのプロパティの代わり (デフォルト値は OBJECT_OT_TareminShoeLacesCreateCurve と同じ)
+class Settings:
+    def __init__(self, **kwargs):
+        self.offset = 0
+        self.bevel_depth = 0.01
+        self.side_handle_length = 0.1
+        self.center_handle_length_ratio = 0.5
+        self.is_simple_curve = True
+        self.use_center_offset = True
+        self.is_reverse_knot = False
+        self.__dict__.update(kwargs)
+
+
+# XY 平面上のグリッド (頂点 index は y * width + x)
+def create_grid(width, height, spacing=SPACING):
+    x, y = numpy.meshgrid(
+        numpy.arange(width, dtype=numpy.float64) * spacing,
+        numpy.arange(height, dtype=numpy.float64) * spacing)
+    co = numpy.stack((x.ravel(), y.ravel(), numpy.zeros(width * height)), axis=1)
+
+    x, y = numpy.meshgrid(numpy.arange(width - 1), numpy.arange(height - 1))
+    v = (y * width + x).ravel()
+    faces = numpy.stack((v, v + 1, v + 1 + width, v + width), axis=1)
+
+    return co, faces
+
+
+# 頂点の番号と面の順番、面ごとの頂点の開始位置を入れ替える
+# 戻り値の order は新しい頂点の番号 -> 元の頂点の番号
+def shuffle_grid(co, faces, seed=0):
+    rng = numpy.random.RandomState(seed)
+    order = rng.permutation(len(co))
+    inverse = numpy.argsort(order)
+
+    faces = inverse[faces][rng.permutation(len(faces))]
+    shifts = rng.randint(0, faces.shape[1], size=len(faces))
+    faces = numpy.array([numpy.roll(face, shift) for face, shift in zip(faces, shifts)])
+
+    return co[order], faces, order
+
+
+def create_mesh(width, height, spacing=SPACING):
+    return mesh_adapter.ArrayMesh(*create_grid(width, height, spacing))
+
+
+def get_vertices2d(mesh, offset=0):
+    topology = mesh.get_topology()
+    return topology.to_array2d(topology.get_corner_vertices(), offset)
@@ -0,0 +1,76 @@
+# tests/test_batch.py で Blender の代わりにワーカーとして起動するスクリプト
+#
+#   python stub_blender.py -b --factory-startup --python-exit-code 1 <file> --python lib/batch.py -- --worker --task ...
+#
+# タスクは --python に渡されたスクリプトの引数の解析で読み取り、対象のオブジェクト名で結果を切り替える
+#   Missing で始まる  オブジェクトがない
+#   Fail で始まる     オペレータが CANCELLED を返した
+#   Crash で始まる    結果を出力せずに終了コード 1 で終了する (--python-exit-code 1 のスクリプトの例外)
+#   Hang で始まる     タイムアウトするまで終了しない
+# それ以外は OK とし、OK が1つでもあれば出力先にファイルを書き出す
+#
+# 環境変数 STUB_BLENDER_LOG にディレクトリを指定すると、受け取った引数を <.blend のファイル名>.json に書き出す
+import importlib.util
+import json
+import os
+import sys
+import time
+
+
+def load_script(path):
+    spec = importlib.util.spec_from_file_location("stub_blender_script", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main(argv):
+    blender_args = argv[1:argv.index("--")] if "--" in argv else argv[1:]
+    if "--python" not in blender_args:
+        print("--python がありません")
+        return 1
+    script_index = blender_args.index("--python")
+    path = blender_args[script_index - 1]
+    script = blender_args[script_index + 1]
+
+    log_dir = os.environ.get("STUB_BLENDER_LOG")
+    if log_dir:
+        with open(os.path.join(log_dir, os.path.basename(path) + ".json"), "w", encoding="utf-8") as f:
+            json.dump(argv[1:], f, ensure_ascii=False)
+
+    if not os.path.isfile(path):
+        print("ファイルを開けません: {}".format(path))
+        return 1
+
+    batch = load_script(script)
+    args = batch.create_parser().parse_args(batch.get_script_args(argv))
+    task = json.loads(args.task)
+    print("Blender (stub) {}".format(path))
+
+    results = []
+    for name in task["objects"]:
+        if name.startswith("Crash"):
+            print("Traceback (most recent call last):")
+            print("RuntimeError: {}".format(name))
+            return 1
+        if name.startswith("Hang"):
+            time.sleep(60)
+
+        if name.startswith("Missing"):
+            status, message = "ERROR", "オブジェクトがありません"
+        elif name.startswith("Fail"):
+            status, message = "ERROR", ""
+        else:
+            status, message = "OK", ""
+        results.append({"name": name, "status": status, "message": message, "seconds": 0.0})
+
+    if any(r["status"] == "OK" for r in results):
+        with open(task["output"], "w", encoding="utf-8") as f:
+            json.dump(task["params"], f)
+
+    print(batch.RESULT_PREFIX + json.dumps(results, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,232 @@
+# lib/batch.py のコントローラを、Blender の代わりに stub_blender.py を起動して最後まで実行する
+#
+#   python -m unittest discover tests
+#
+# (リポジトリの直下はアドオンの __init__.py で bpy を読み込むので、pytest ではなく unittest で実行する)
+import argparse
+import contextlib
+import io
+import json
+import os
+import shlex
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import batch  # noqa: E402
+
+STUB_BLENDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_blender.py")
+
+
+class TestArguments(unittest.TestCase):
+    def test_get_script_args(self):
+        self.assertEqual(batch.get_script_args(["blender", "-b", "--", "--file", "a.blend"]), ["--file", "a.blend"])
+        self.assertEqual(batch.get_script_args(["batch.py", "--workers", "2"]), ["--workers", "2"])
+
+    def test_parse_param(self):
+        self.assertEqual(batch.parse_param("bevel_depth=0.005"), ("bevel_depth", "0.005"))
+        self.assertEqual(batch.parse_param("knot=Knot.001"), ("knot", "Knot.001"))
+        self.assertEqual(batch.parse_param("knot=a=b"), ("knot", "a=b"))
+        with self.assertRaises(argparse.ArgumentTypeError):
+            batch.parse_param("bevel_depth")
+
+    def test_coerce_params(self):
+        property_types = {
+            "knot_type": 'ENUM',
+            "knot": 'STRING',
+            "bevel_depth": 'FLOAT',
+            "offset": 'INT',
+            "use_clearance_check": 'BOOLEAN',
+        }
+        params = batch.coerce_params({
+            "knot_type": "2",
+            "knot": "1e3",
+            "bevel_depth": "0.005",
+            "offset": 2,
+            "use_clearance_check": "True",
+            "unknown": "1",
+        }, property_types)
+        self.assertEqual(params, {
+            "knot_type": "2",
+            "knot": "1e3",
+            "bevel_depth": 0.005,
+            "offset": 2,
+            "use_clearance_check": True,
+            "unknown": "1",
+        })
+        # --jobs の JSON で数値を指定した列挙型のプロパティ
+        self.assertEqual(batch.coerce_params({"knot_type": 2}, property_types), {"knot_type": "2"})
+
+    def test_invalid_param(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            batch.create_parser().parse_args(["--param", "bevel_depth"])
+
+    def test_operator_params(self):
+        args = batch.create_parser().parse_args([
+            "--lacing-method", "DisplayShoeLacing", "--offset", "1", "--knot-type", "2",
+            "--param", "bevel_depth=0.005", "--param", "offset=2",
+        ])
+        self.assertEqual(batch.get_operator_params(args), {
+            "lacing_method": "DisplayShoeLacing",
+            "offset": "2",
+            "knot_type": "2",
+            "bevel_depth": "0.005",
+        })
+
+    def test_output_path(self):
+        path = os.path.join("shoes", "a.blend")
+        self.assertEqual(batch.get_output_path(path, False, ".laces"), os.path.join("shoes", "a.laces.blend"))
+        self.assertEqual(batch.get_output_path(path, True, ".laces"), path)
+
+
+@unittest.skipIf(os.name == "nt", "スタブを起動するシェルスクリプトを実行できない")
+class TestController(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.log_dir = self.get_path("log")
+        os.mkdir(self.log_dir)
+
+        # --blender には実行ファイルを1つだけ渡すので、このテストと同じ Python でスタブを起動するスクリプトを作る
+        self.blender = self.get_path("blender")
+        with open(self.blender, "w", encoding="utf-8") as f:
+            f.write("#!/bin/sh\nexec {} {} \"$@\"\n".format(shlex.quote(sys.executable), shlex.quote(STUB_BLENDER)))
+        os.chmod(self.blender, 0o755)
+
+        environ = mock.patch.dict(os.environ, {"STUB_BLENDER_LOG": self.log_dir})
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def get_path(self, name):
+        return os.path.join(self.tempdir.name, name)
+
+    def create_blend(self, name):
+        path = self.get_path(name)
+        with open(path, "wb") as f:
+            f.write(b"BLENDER")
+        return path
+
+    def run_controller(self, *args):
+        report = self.get_path("report.json")
+        argv = ["blender", "-b", "--python", "lib/batch.py", "--",
+                "--blender", self.blender, "--workers", "2", "--report", report] + list(args)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            code = batch.main(argv)
+        with open(report, encoding="utf-8") as f:
+            results = {os.path.basename(r["file"]): r for r in json.load(f)}
+        return code, results, stdout.getvalue()
+
+    def get_command(self, blend):
+        with open(os.path.join(self.log_dir, os.path.basename(blend) + ".json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_success(self):
+        a = self.create_blend("a.blend")
+        b = self.create_blend("b.blend")
+
+        code, results, stdout = self.run_controller(
+            "--file", a, "Lace_L", "Lace_R", "--file", b, "Lace",
+            "--lacing-method", "DisplayShoeLacing", "--knot-type", "2", "--param", "bevel_depth=0.005")
+
+        self.assertEqual(code, 0)
+        self.assertEqual(sorted(results), ["a.blend", "b.blend"])
+        self.assertEqual(results["a.blend"]["returncode"], 0)
+        self.assertEqual([o["name"] for o in results["a.blend"]["objects"]], ["Lace_L", "Lace_R"])
+        self.assertTrue(all(o["status"] == "OK" for r in results.values() for o in r["objects"]))
+        self.assertEqual(results["a.blend"]["log"], "")
+        self.assertIn("{}: 2/2".format(a), stdout)
+
+        output = self.get_path("a.laces.blend")
+        self.assertEqual(results["a.blend"]["output"], output)
+        self.assertTrue(os.path.isfile(output))
+
+        params = {"lacing_method": "DisplayShoeLacing", "knot_type": "2", "bevel_depth": "0.005"}
+        task = {"objects": ["Lace_L", "Lace_R"], "params": params, "output": output}
+        self.assertEqual(self.get_command(a), [
+            "-b", "--factory-startup", "--python-exit-code", "1", a,
+            "--python", os.path.abspath(batch.__file__),
+            "--", "--worker", "--task", json.dumps(task),
+        ])
+
+    def test_jobs_file(self):
+        a = self.create_blend("a.blend")
+        b = self.create_blend("b.blend")
+        jobs = self.get_path("jobs.json")
+        with open(jobs, "w", encoding="utf-8") as f:
+            json.dump([{"file": b, "objects": ["Lace"], "params": {"offset": 2}}], f)
+
+        code, results, _ = self.run_controller(
+            "--file", a, "Lace", "--jobs", jobs, "--in-place", "--param", "offset=1")
+
+        self.assertEqual(code, 0)
+        self.assertEqual(results["a.blend"]["output"], a)
+        self.assertEqual(results["b.blend"]["output"], b)
+        self.assertEqual(json.loads(self.get_command(a)[-1])["params"], {"offset": "1"})
+        self.assertEqual(json.loads(self.get_command(b)[-1])["params"], {"offset": 2})
+
+    def test_failed_objects(self):
+        a = self.create_blend("a.blend")
+        b = self.create_blend("b.blend")
+
+        code, results, stdout = self.run_controller(
+            "--file", a, "Lace", "Missing", "Fail", "--file", b, "Lace")
+
+        self.assertEqual(code, 1)
+        self.assertEqual(results["a.blend"]["returncode"], 0)
+        self.assertEqual(
+            [(o["name"], o["status"]) for o in results["a.blend"]["objects"]],
+            [("Lace", "OK"), ("Missing", "ERROR"), ("Fail", "ERROR")])
+        self.assertIn("  Missing: ERROR オブジェクトがありません", stdout)
+        self.assertTrue(os.path.isfile(self.get_path("a.laces.blend")))
+        self.assertEqual(results["b.blend"]["objects"][0]["status"], "OK")
+
+    def test_no_output_when_all_failed(self):
+        a = self.create_blend("a.blend")
+
+        code, results, _ = self.run_controller("--file", a, "Missing")
+
+        self.assertEqual(code, 1)
+        self.assertFalse(os.path.exists(self.get_path("a.laces.blend")))
+
+    def test_crash(self):
+        a = self.create_blend("a.blend")
+        b = self.create_blend("b.blend")
+
+        code, results, stdout = self.run_controller("--file", a, "Crash", "--file", b, "Lace")
+
+        self.assertEqual(code, 1)
+        self.assertEqual(results["a.blend"]["returncode"], 1)
+        self.assertEqual(results["a.blend"]["objects"], [])
+        self.assertIn("RuntimeError: Crash", results["a.blend"]["log"])
+        self.assertIn("{}: 0/0".format(a), stdout)
+        self.assertEqual(results["b.blend"]["returncode"], 0)
+
+    def test_missing_file(self):
+        code, results, _ = self.run_controller("--file", self.get_path("missing.blend"), "Lace")
+
+        self.assertEqual(code, 1)
+        self.assertEqual(results["missing.blend"]["returncode"], 1)
+        self.assertIn("ファイルを開けません", results["missing.blend"]["log"])
+
+    def test_timeout(self):
+        a = self.create_blend("a.blend")
+
+        code, results, _ = self.run_controller("--file", a, "Hang", "--timeout", "1")
+
+        self.assertEqual(code, 1)
+        self.assertIsNone(results["a.blend"]["returncode"])
+        self.assertEqual(results["a.blend"]["objects"], [])
+
+    def test_report_without_jobs(self):
+        code, results, _ = self.run_controller()
+
+        self.assertEqual(code, 0)
+        self.assertEqual(results, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+# lib/clearance.py の空間ハッシュによる近い点の組の検索
+import unittest
+
+import numpy
+
+import grids  # noqa: F401 (lib を import できるようにする)
+from lib import clearance
+
+
+# 総当たりで distance より近い点の組 (i < j)
+def find_close_pairs_brute_force(points, distance):
+    d = numpy.linalg.norm(points[:, None] - points[None], axis=2)
+    i, j = numpy.nonzero(d < distance)
+    keep = i < j
+    return sorted(zip(i[keep].tolist(), j[keep].tolist()))
+
+
+class TestFindClosePairs(unittest.TestCase):
+    def assertPairs(self, points, distance):
+        pairs = clearance.find_close_pairs(points, distance)
+        self.assertTrue(numpy.all(pairs[:, 0] < pairs[:, 1]))
+        self.assertEqual(sorted(map(tuple, pairs.tolist())), find_close_pairs_brute_force(points, distance))
+
+    def test_random(self):
+        rng = numpy.random.RandomState(0)
+        for seed in range(4):
+            with self.subTest(seed=seed):
+                points = rng.uniform(-1.0, 1.0, size=(300, 3))
+                self.assertPairs(points, 0.15)
+
+    # セルの境界をまたぐ点の組と、負の座標
+    def test_cell_boundary(self):
+        points = numpy.array([
+            (0.099, 0.0, 0.0), (0.101, 0.0, 0.0),
+            (-0.05, -0.05, -0.05), (0.04, -0.05, -0.05),
+            (1.0, 1.0, 1.0),
+        ])
+        self.assertPairs(points, 0.1)
+
+    # 同じ位置の点が多くても重複せずに全ての組を返す
+    def test_duplicates(self):
+        points = numpy.zeros((5, 3))
+        self.assertEqual(len(clearance.find_close_pairs(points, 0.1)), 10)
+
+    def test_empty(self):
+        self.assertEqual(clearance.find_close_pairs(numpy.zeros((1, 3)), 0.1).shape, (0, 2))
+        self.assertEqual(clearance.find_close_pairs(numpy.zeros((3, 3)), 0.0).shape, (0, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
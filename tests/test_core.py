@@ -0,0 +1,98 @@
+# lib/core.py の穴と対角線の制御点
+import unittest
+
+import numpy
+
+import grids
+from lib import core
+
+
+class TestSidePoints(unittest.TestCase):
+    def setUp(self):
+        self.mesh = grids.create_mesh(4, 3)
+        self.co = self.mesh.get_coordinates()
+        self.normals = self.mesh.get_normals()
+        self.vertices2d = grids.get_vertices2d(self.mesh)
+
+    def test_side_point_arrays(self):
+        points = core.calc_side_point_arrays(
+            self.co, self.normals, self.vertices2d,
+            [0, 3], [1, 1], [1.0, -1.0], [False, True], 0.1)
+
+        index = self.vertices2d[[0, 3], [1, 1]]
+        numpy.testing.assert_allclose(points["co"], self.co[index])
+        self.assertTrue(numpy.all(points["type"] == core.POINT_TYPES['SIDE']))
+        self.assertTrue(numpy.all(points["handle_type"] == core.HANDLE_TYPES['ALIGNED']))
+
+        # 平面の法線方向に side_handle_length だけ離れ、左の紐は表から裏へ、右の紐は反転して逆向き
+        normal = self.normals[index[0]]
+        numpy.testing.assert_allclose(points["handle_left"][0], self.co[index[0]] + normal * 0.1)
+        numpy.testing.assert_allclose(points["handle_right"][0], self.co[index[0]] - normal * 0.1)
+        numpy.testing.assert_allclose(points["handle_left"][1], self.co[index[1]] + normal * 0.1)
+        numpy.testing.assert_allclose(points["handle_right"][1], self.co[index[1]] - normal * 0.1)
+
+    def test_side_points(self):
+        left = []
+        right = []
+        core.calc_side_points(self.co, self.normals, self.vertices2d, left, right, 0, 3, 2, False, 0.1)
+        expected = core.calc_side_point_arrays(
+            self.co, self.normals, self.vertices2d, [0, 3], [2, 2], [1.0, -1.0], [False, False], 0.1)
+        self.assertEqual(len(left), 1)
+        self.assertEqual(len(right), 1)
+        numpy.testing.assert_array_equal(core.concatenate_points(left + right), expected)
+
+
+class TestCrossPoints(unittest.TestCase):
+    def setUp(self):
+        self.mesh = grids.create_mesh(5, 3)
+        self.co = self.mesh.get_coordinates()
+        self.normals = self.mesh.get_normals()
+        self.vertices2d = grids.get_vertices2d(self.mesh)
+        self.settings = grids.Settings(is_simple_curve=False)
+
+    def test_cross_lines(self):
+        lines, centers = core.find_cross_lines(self.co, self.normals, self.vertices2d, 0, 0, 4, 1)
+
+        # 2本の対角線は帯の対角の頂点を結び (右の紐は逆向きに辿る)、中心点で交差する
+        (left_co, left_normals), (right_co, right_normals) = lines
+        numpy.testing.assert_allclose(left_co[0], self.co[self.vertices2d[0, 0]])
+        numpy.testing.assert_allclose(left_co[-1], self.co[self.vertices2d[4, 1]])
+        numpy.testing.assert_allclose(right_co[0], self.co[self.vertices2d[4, 0]])
+        numpy.testing.assert_allclose(right_co[-1], self.co[self.vertices2d[0, 1]])
+        numpy.testing.assert_allclose(left_co[centers[0]], right_co[centers[1]])
+        numpy.testing.assert_allclose(numpy.linalg.norm(left_normals, axis=1), 1.0)
+        numpy.testing.assert_allclose(numpy.linalg.norm(right_normals, axis=1), 1.0)
+
+    def test_cross_points(self):
+        lines, centers = core.find_cross_lines(self.co, self.normals, self.vertices2d, 0, 0, 4, 1)
+        left = []
+        right = []
+        core.calc_cross_points(lines, centers, left, right, 1, self.settings)
+
+        self.assertEqual(len(left[0]), len(lines[0][0]) - 2)
+        self.assertEqual(len(right[0]), len(lines[1][0]) - 2)
+        self.assertTrue(numpy.all(left[0]["type"] == core.POINT_TYPES['MIDDLE']))
+
+        # 左の紐は layer 側 (表)、右の紐は反対側 (裏) へ bevel_depth だけずらす
+        normal = lines[0][1][1:-1]
+        numpy.testing.assert_allclose(left[0]["co"], lines[0][0][1:-1] + normal * 0.01)
+        numpy.testing.assert_allclose(right[0]["co"], lines[1][0][1:-1] - lines[1][1][1:-1] * 0.01)
+
+        under_left = []
+        under_right = []
+        core.calc_cross_points(lines, centers, under_left, under_right, -1, self.settings)
+        numpy.testing.assert_allclose(under_left[0]["co"], lines[0][0][1:-1] - normal * 0.01)
+
+    def test_simple_curve(self):
+        lines, centers = core.find_cross_lines(self.co, self.normals, self.vertices2d, 0, 0, 4, 1)
+        left = []
+        right = []
+        core.calc_cross_points(lines, centers, left, right, 1, grids.Settings(is_simple_curve=True))
+
+        # 中心点だけが残る
+        self.assertEqual(len(left[0]), 1)
+        numpy.testing.assert_allclose(left[0]["co"][0], lines[0][0][centers[0]] + lines[0][1][centers[0]] * 0.01)
+
+
+if __name__ == "__main__":
+    unittest.main()
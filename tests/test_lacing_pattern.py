@@ -0,0 +1,118 @@
+# lib/lacing_pattern.py の区間の並びの変換と、結び方ごとの制御点
+import unittest
+
+import numpy
+
+import grids
+from lib import core, lacing_base, lacing_list, lacing_pattern
+from lib.lacing_bow_tie import BowTieShoeLacing
+from lib.lacing_display import DisplayShoeLacing
+
+
+class TestCompilePattern(unittest.TestCase):
+    def test_display(self):
+        pattern = DisplayShoeLacing.get_compiled_pattern(4, 5)
+
+        self.assertEqual(pattern.bottom, (0, False))
+        self.assertEqual(pattern.side_y.tolist(), [0, 1, 2, 3])
+        self.assertEqual(pattern.side_x.tolist(), [[0, 3], [3, 0], [0, 3], [3, 0]])
+        self.assertTrue(numpy.all(pattern.side_reversed))
+        self.assertEqual(
+            [cross[:4] for cross in pattern.crosses],
+            [(0, 0, 3, 1), (3, 1, 0, 2), (0, 2, 3, 3), (3, 3, 0, 4)])
+        # 交差する行が偶数なら左の紐が表側
+        self.assertEqual(
+            [cross[4] for cross in pattern.crosses],
+            [lacing_pattern.UNDER, lacing_pattern.OVER, lacing_pattern.UNDER, lacing_pattern.OVER])
+
+        # 左右の紐とも穴と交差を交互に通る
+        for order in pattern.order:
+            self.assertEqual(order[:, 0].tolist(), [lacing_pattern.SIDE, lacing_pattern.CROSS] * 4)
+            self.assertEqual(order[:, 1].tolist(), [0, 0, 1, 1, 2, 2, 3, 3])
+
+    def test_bow_tie(self):
+        even = BowTieShoeLacing.get_compiled_pattern(4, 6)
+        self.assertEqual(even.bottom, (0, False))
+        self.assertEqual(even.side_y.tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(even.side_x.tolist(), [[0, 3], [0, 3], [3, 0], [3, 0], [0, 3]])
+        self.assertEqual([cross[:4] for cross in even.crosses], [(0, 1, 3, 2), (3, 3, 0, 4)])
+
+        odd = BowTieShoeLacing.get_compiled_pattern(4, 5)
+        self.assertEqual(odd.bottom, (0, True))
+        self.assertEqual(odd.side_y.tolist(), [0, 1, 2, 3])
+        self.assertEqual([cross[:4] for cross in odd.crosses], [(3, 0, 0, 1), (0, 2, 3, 3)])
+
+    def test_cached(self):
+        self.assertIs(DisplayShoeLacing.get_compiled_pattern(4, 5), DisplayShoeLacing.get_compiled_pattern(4, 5))
+        self.assertIsNot(DisplayShoeLacing.get_compiled_pattern(4, 5), BowTieShoeLacing.get_compiled_pattern(4, 5))
+
+    # 横棒は紐がいる列から反対側の列へ渡る
+    def test_bar(self):
+        pattern = lacing_pattern.compile_pattern((0, False), [
+            lacing_pattern.Side(0, 0, 3, False),
+            lacing_pattern.Bar((0, 1), lacing_pattern.LEFT, lacing_pattern.OVER),
+            lacing_pattern.Bar((1, 2), lacing_pattern.LEFT, lacing_pattern.UNDER),
+            lacing_pattern.Bar((0, 1), lacing_pattern.RIGHT, lacing_pattern.UNDER),
+        ], 4)
+        self.assertEqual([bar[1] for bar in pattern.bars], [True, False, False])
+        self.assertEqual(pattern.order[lacing_pattern.LEFT][:, 0].tolist(), [
+            lacing_pattern.SIDE, lacing_pattern.BAR, lacing_pattern.BAR])
+
+    # 横棒の結び方は穴の区間の向きと、表側を渡る紐を左右交互にするかどうかだけが違う
+    def test_bar_segments(self):
+        segments = list(lacing_base.get_bar_segments(4, 4, False, False))
+        self.assertEqual([type(segment) for segment in segments[:3]], [lacing_pattern.Side, lacing_pattern.Bar, lacing_pattern.Bar])
+        sides = segments[0::3]
+        self.assertEqual([(side.y, side.left_x, side.right_x) for side in sides], [(0, 0, 3), (1, 3, 0), (2, 0, 3)])
+        self.assertFalse(any(side.is_reversed for side in sides))
+        self.assertEqual([bar.rows for bar in segments[1::3]], [(0, 1), (1, 2), (2, 3)])
+        self.assertTrue(all(bar.strand == lacing_pattern.LEFT and bar.layer == lacing_pattern.OVER for bar in segments[1::3]))
+        self.assertTrue(all(bar.strand == lacing_pattern.RIGHT and bar.layer == lacing_pattern.UNDER for bar in segments[2::3]))
+
+        alternate = list(lacing_base.get_bar_segments(4, 4, True, True))
+        self.assertTrue(all(side.is_reversed for side in alternate[0::3]))
+        self.assertEqual(
+            [bar.strand for bar in alternate[1::3]],
+            [lacing_pattern.LEFT, lacing_pattern.RIGHT, lacing_pattern.LEFT])
+        self.assertTrue(all(bar.layer == lacing_pattern.OVER for bar in alternate[1::3]))
+        self.assertTrue(all(bar.layer == lacing_pattern.UNDER for bar in alternate[2::3]))
+
+    def test_unknown_segment(self):
+        with self.assertRaises(TypeError):
+            lacing_pattern.compile_pattern((0, False), [object()], 4)
+
+
+class TestCurvePoints(unittest.TestCase):
+    def create_curve_points(self, method, width, height):
+        mesh = grids.create_mesh(width, height)
+        vertices2d = grids.get_vertices2d(mesh)
+        lacing = lacing_list.ShoeLacingMethods[method](mesh, vertices2d, grids.Settings(is_simple_curve=False))
+        return lacing.create_curve_points(), mesh, vertices2d
+
+    def test_display(self):
+        (points, cyclic), mesh, vertices2d = self.create_curve_points("DisplayShoeLacing", 4, 5)
+        width, height = vertices2d.shape
+        self.assertTrue(cyclic)
+        self.assertTrue(numpy.all(numpy.isfinite(points["co"])))
+
+        # 穴の制御点はグリッドの両端の列の頂点の位置 (一番上の行の左右を含む)
+        side = points[points["type"] == core.POINT_TYPES['SIDE']]
+        self.assertEqual(len(side), len(DisplayShoeLacing.get_compiled_pattern(width, height).side_y) * 2 + 2)
+        co = mesh.get_coordinates()
+        holes = co[vertices2d[[0, -1]].ravel()]
+        distance = numpy.linalg.norm(side["co"][:, None] - holes[None], axis=2).min(axis=1)
+        numpy.testing.assert_allclose(distance, 0.0, atol=1e-12)
+
+    def test_bow_tie(self):
+        for height in (4, 5):
+            with self.subTest(height=height):
+                (points, cyclic), mesh, vertices2d = self.create_curve_points("BowTieShoeLacing", 4, height)
+                width, height = vertices2d.shape
+                pattern = BowTieShoeLacing.get_compiled_pattern(width, height)
+                side = points[points["type"] == core.POINT_TYPES['SIDE']]
+                self.assertEqual(len(side), len(pattern.side_y) * 2 + 2)
+                self.assertTrue(numpy.all(numpy.isfinite(points["co"])))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# lib/mesh_grid.py のグリッドの判定と2次元配列への変換
+import unittest
+
+import numpy
+
+import grids
+from lib import mesh_adapter, mesh_grid
+
+
+class TestCheckCornerVertices(unittest.TestCase):
+    def test_grid(self):
+        mesh = grids.create_mesh(4, 3)
+        err, corners = mesh_grid.check_corner_vertices(mesh.get_vertex_face_count())
+        self.assertIsNone(err)
+        self.assertEqual(sorted(corners), [0, 3, 8, 11])
+
+    # 5枚の三角形が集まる頂点がある
+    def test_triangle_fan(self):
+        angle = numpy.arange(5) * (2.0 * numpy.pi / 5)
+        co = numpy.stack((numpy.cos(angle), numpy.sin(angle), numpy.zeros(5)), axis=1)
+        mesh = mesh_adapter.ArrayMesh(
+            numpy.concatenate((co, [(0.0, 0.0, 0.0)])), [(i, (i + 1) % 5, 5) for i in range(5)])
+        err, message = mesh_grid.check_corner_vertices(mesh.get_vertex_face_count())
+        self.assertTrue(err)
+        self.assertEqual(message, "不正な入力メッシュ")
+
+    def test_two_grids(self):
+        co, faces = grids.create_grid(4, 3)
+        mesh = mesh_adapter.ArrayMesh(
+            numpy.concatenate((co, co + (1.0, 0.0, 0.0))), numpy.concatenate((faces, faces + len(co))))
+        err, message = mesh_grid.check_corner_vertices(mesh.get_vertex_face_count())
+        self.assertTrue(err)
+        self.assertEqual(message, "カドの頂点が4以外です")
+
+
+class TestToArray2d(unittest.TestCase):
+    # vertices2d の隣り合う要素が、元のグリッドで縦か横に1つ隣の頂点になっていること
+    def assertGrid(self, vertices2d, order, width, height):
+        self.assertEqual(sorted(vertices2d.shape), sorted((width, height)))
+        self.assertEqual(sorted(order[vertices2d.ravel()].tolist()), list(range(width * height)))
+
+        original = order[vertices2d]
+        position = numpy.stack((original % width, original // width), axis=2)
+        step_x = numpy.diff(position, axis=0)
+        step_y = numpy.diff(position, axis=1)
+        self.assertTrue(numpy.all(step_x == step_x[0, 0]))
+        self.assertTrue(numpy.all(step_y == step_y[0, 0]))
+        self.assertEqual(numpy.abs(step_x[0, 0]).sum(), 1)
+        self.assertEqual(numpy.abs(step_y[0, 0]).sum(), 1)
+        self.assertEqual(numpy.dot(step_x[0, 0], step_y[0, 0]), 0)
+
+    def test_grid(self):
+        mesh = grids.create_mesh(5, 3)
+        vertices2d = grids.get_vertices2d(mesh)
+        self.assertGrid(vertices2d, numpy.arange(15), 5, 3)
+
+    def test_shuffled(self):
+        for seed in range(8):
+            with self.subTest(seed=seed):
+                co, faces, order = grids.shuffle_grid(*grids.create_grid(6, 4), seed=seed)
+                mesh = mesh_adapter.ArrayMesh(co, faces)
+                self.assertGrid(grids.get_vertices2d(mesh), order, 6, 4)
+
+    def test_offset(self):
+        co, faces, order = grids.shuffle_grid(*grids.create_grid(6, 4), seed=1)
+        mesh = mesh_adapter.ArrayMesh(co, faces)
+        shapes = [grids.get_vertices2d(mesh, offset).shape for offset in range(4)]
+        self.assertEqual(shapes[0], shapes[2])
+        self.assertEqual(shapes[1], shapes[3])
+        self.assertEqual(shapes[0], shapes[1][::-1])
+        for offset in range(4):
+            self.assertGrid(grids.get_vertices2d(mesh, offset), order, 6, 4)
+
+    def test_two_grids(self):
+        co, faces = grids.create_grid(4, 3)
+        mesh = mesh_adapter.ArrayMesh(
+            numpy.concatenate((co, co + (1.0, 0.0, 0.0))), numpy.concatenate((faces, faces + len(co))))
+        with self.assertRaises(ValueError):
+            mesh.get_topology().to_array2d([0, 3, 8, 11])
+
+    # 内側の四角形を三角形2つに分けると、対角線の辺で次の列の頂点が決まらない
+    def test_diagonal(self):
+        co, faces = grids.create_grid(4, 4)
+        faces = faces.tolist()
+        a, b, c, d = faces.pop(4)
+        mesh = mesh_adapter.ArrayMesh(co, faces + [[a, b, c], [a, c, d]])
+        with self.assertRaises(ValueError):
+            mesh.get_topology().to_array2d([0, 3, 12, 15])
+
+    def test_boundary_vertices(self):
+        topology = grids.create_mesh(4, 3).get_topology()
+        self.assertEqual(topology.get_boundary_vertices().tolist(), [0, 1, 2, 3, 4, 7, 8, 9, 10, 11])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+# lib/sweep.py の分割数の割り当てと平行移動フレーム
+import math
+import unittest
+
+import numpy
+
+import grids  # noqa: F401 (lib を import できるようにする)
+from lib import sweep
+
+
+class TestAllocateResolution(unittest.TestCase):
+    def test_budget(self):
+        weights = numpy.array([1.0, 3.0, 0.0, 6.0])
+        resolution = sweep.allocate_resolution(weights, 24)
+        self.assertEqual(resolution.sum(), 24)
+        self.assertTrue(numpy.all(resolution >= 1))
+        # 重みの大きい区間ほど多く分割する
+        self.assertGreater(resolution[3], resolution[1])
+        self.assertGreater(resolution[1], resolution[0])
+        self.assertEqual(resolution[2], 1)
+
+    def test_small_budget(self):
+        resolution = sweep.allocate_resolution(numpy.array([1.0, 2.0, 3.0]), 1)
+        self.assertEqual(resolution.tolist(), [1, 1, 1])
+
+    def test_zero_weights(self):
+        resolution = sweep.allocate_resolution(numpy.zeros(4), 12)
+        self.assertEqual(resolution.tolist(), [3, 3, 3, 3])
+
+    def test_adaptive(self):
+        # 直線の区間と、ハンドルで大きく曲がる区間
+        co = numpy.array([(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (1.0, 1.0, 0.0)])
+        handle_left = numpy.array([(-0.1, 0.0, 0.0), (0.9, 0.0, 0.0), (1.5, 0.5, 0.0)])
+        handle_right = numpy.array([(0.1, 0.0, 0.0), (1.5, -0.5, 0.0), (1.0, 1.1, 0.0)])
+        arrays = {"co": co, "handle_left": handle_left, "handle_right": handle_right}
+
+        resolution = sweep.calc_adaptive_resolution(arrays, False, 20)
+        self.assertEqual(resolution.sum(), 20)
+        self.assertGreater(resolution[1], resolution[0])
+
+        points = sweep.evaluate_bezier(co, handle_left, handle_right, False, resolution)
+        self.assertEqual(len(points), 21)
+        numpy.testing.assert_allclose(points[[0, -1]], co[[0, -1]])
+
+
+class TestCalcFrames(unittest.TestCase):
+    def assertOrthonormal(self, tangents, normals, binormals):
+        for vectors in (tangents, normals, binormals):
+            numpy.testing.assert_allclose(numpy.linalg.norm(vectors, axis=1), 1.0, atol=1e-9)
+        numpy.testing.assert_allclose(numpy.einsum('ij,ij->i', tangents, normals), 0.0, atol=1e-9)
+        numpy.testing.assert_allclose(numpy.cross(tangents, normals), binormals, atol=1e-9)
+
+    def test_line(self):
+        points = numpy.stack((numpy.linspace(0.0, 1.0, 10), numpy.zeros(10), numpy.zeros(10)), axis=1)
+        tangents, normals, binormals = sweep.calc_frames(points, False)
+        self.assertOrthonormal(tangents, normals, binormals)
+        numpy.testing.assert_allclose(tangents, numpy.tile((1.0, 0.0, 0.0), (10, 1)), atol=1e-9)
+        # 直線ではねじれない
+        numpy.testing.assert_allclose(normals, numpy.tile(normals[0], (10, 1)), atol=1e-9)
+
+    def test_helix(self):
+        t = numpy.linspace(0.0, 4.0 * math.pi, 200)
+        points = numpy.stack((numpy.cos(t), numpy.sin(t), t * 0.2), axis=1)
+        tangents, normals, binormals = sweep.calc_frames(points, False)
+        self.assertOrthonormal(tangents, normals, binormals)
+        # 隣り合う点の法線は滑らかにつながる
+        self.assertGreater(numpy.einsum('ij,ij->i', normals[:-1], normals[1:]).min(), 0.99)
+
+    # 閉じたカーブは一周したときの法線のずれを分配するので、最後の点から最初の点へも滑らかにつながる
+    def test_cyclic(self):
+        t = numpy.linspace(0.0, 2.0 * math.pi, 100, endpoint=False)
+        points = numpy.stack((numpy.cos(t), numpy.sin(t), numpy.sin(2.0 * t) * 0.3), axis=1)
+        tangents, normals, binormals = sweep.calc_frames(points, True)
+        self.assertOrthonormal(tangents, normals, binormals)
+        steps = numpy.einsum('ij,ij->i', normals, numpy.roll(normals, -1, axis=0))
+        self.assertGreater(steps.min(), 0.99)
+
+
+if __name__ == "__main__":
+    unittest.main()